@@ -3,6 +3,7 @@ Ejemplo simple de servidor MCP con FastMCP.
 Este servidor expone una herramienta básica para convertir temperaturas.
 """
 
+import sys
 from fastmcp import FastMCP
 
 # Crear instancia del servidor MCP
@@ -49,4 +50,5 @@ def celsius_to_kelvin(celsius: float) -> float:
 
 if __name__ == "__main__":
     # Usa stdio para comunicación directa entre procesos (recomendado para desarrollo local)
-    app.run()
+    # Lanzado por un cliente (stdin no es una terminal) se omite el banner, que consulta PyPI al arrancar
+    app.run(show_banner=sys.stdin.isatty())
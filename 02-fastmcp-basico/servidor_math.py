@@ -3,6 +3,7 @@ Servidor MCP con operaciones matemáticas básicas.
 Implementa suma, resta, multiplicación y división con manejo de errores.
 """
 
+import sys
 from typing import Union
 from fastmcp import FastMCP
 
@@ -71,4 +72,5 @@ def divide(a: Union[int, float], b: Union[int, float]) -> float:
 
 if __name__ == "__main__":
     # Este modo permite comunicación directa entre procesos sin HTTP
-    app.run()
+    # Lanzado por un cliente (stdin no es una terminal) se omite el banner, que consulta PyPI al arrancar
+    app.run(show_banner=sys.stdin.isatty())
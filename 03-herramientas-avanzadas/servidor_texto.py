@@ -3,6 +3,7 @@ Servidor MCP con herramientas de procesamiento de texto.
 Incluye análisis, transformación y búsqueda en textos.
 """
 
+import sys
 from typing import Dict, List, Optional
 from fastmcp import FastMCP
 import re
@@ -143,4 +144,5 @@ def extraer_palabras_unicas(texto: str, min_longitud: int = 1) -> List[str]:
 
 if __name__ == "__main__":
     # Usa stdio para comunicación directa entre procesos
-    app.run()
+    # Lanzado por un cliente (stdin no es una terminal) se omite el banner, que consulta PyPI al arrancar
+    app.run(show_banner=sys.stdin.isatty())
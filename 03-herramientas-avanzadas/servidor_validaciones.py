@@ -3,6 +3,7 @@ Servidor MCP con herramientas de validación de datos.
 Incluye validación de emails, passwords, URLs y números de teléfono.
 """
 
+import sys
 from typing import Dict, Any
 from fastmcp import FastMCP
 import re
@@ -196,4 +197,5 @@ def validar_rango_numerico(
 
 if __name__ == "__main__":
     # Usa stdio para comunicación directa entre procesos
-    app.run()
+    # Lanzado por un cliente (stdin no es una terminal) se omite el banner, que consulta PyPI al arrancar
+    app.run(show_banner=sys.stdin.isatty())
@@ -3,6 +3,7 @@ Servidor MCP con prompts reutilizables.
 Demuestra cómo exponer plantillas de prompts parametrizadas.
 """
 
+import sys
 from fastmcp import FastMCP
 
 app = FastMCP("Prompts Server")
@@ -176,4 +177,5 @@ Mantén la funcionalidad original mientras mejoras el código según el objetivo
 
 if __name__ == "__main__":
     # Usa stdio para comunicación directa entre procesos
-    app.run()
+    # Lanzado por un cliente (stdin no es una terminal) se omite el banner, que consulta PyPI al arrancar
+    app.run(show_banner=sys.stdin.isatty())
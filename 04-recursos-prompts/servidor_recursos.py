@@ -3,6 +3,7 @@ Servidor MCP con recursos (resources).
 Demuestra cómo exponer datos estáticos y dinámicos via resources.
 """
 
+import sys
 from fastmcp import FastMCP
 from datetime import datetime
 import json
@@ -90,4 +91,5 @@ def get_current_status():
 
 if __name__ == "__main__":
     # Usa stdio para comunicación directa entre procesos
-    app.run()
+    # Lanzado por un cliente (stdin no es una terminal) se omite el banner, que consulta PyPI al arrancar
+    app.run(show_banner=sys.stdin.isatty())
@@ -3,15 +3,66 @@ Servidor MCP con base de datos SQLite.
 Expone herramientas para consultar y manipular productos y clientes.
 """
 
+import asyncio
+import functools
 import sqlite3
 import os
-from typing import List, Dict, Any, Optional
+import re
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 from fastmcp import FastMCP
 
 app = FastMCP("Database Server")
 
 DB_PATH = os.path.join(os.path.dirname(__file__), "tienda.db")
 
+# IDs máximos por llamada en las búsquedas por lote
+MAXIMO_IDS = 100
+
+# Columnas que se pueden pedir con el argumento `campos` de cada herramienta
+CAMPOS_PRODUCTO = ("id", "nombre", "precio", "categoria", "stock")
+CAMPOS_CLIENTE = ("id", "nombre", "email", "ciudad")
+
+# Hilos dedicados a SQLite y consultas que pueden esperar turno antes de rechazar nuevas
+HILOS_BD = 4
+COLA_BD = 50
+
+ejecutor_bd = ThreadPoolExecutor(max_workers=HILOS_BD, thread_name_prefix="bd")
+cupos_bd = threading.BoundedSemaphore(HILOS_BD + COLA_BD)
+
+def _en_hilo_bd(func):
+    """
+    Convierte una herramienta síncrona en asíncrona que consulta SQLite en `ejecutor_bd`.
+    
+    Así una consulta lenta no bloquea el event loop ni las demás peticiones en curso.
+    
+    Raises:
+        RuntimeError: Si ya hay HILOS_BD + COLA_BD consultas pendientes
+    """
+    @functools.wraps(func)
+    async def envoltura(*args, **kwargs):
+        if not cupos_bd.acquire(blocking=False):
+            raise RuntimeError("Servidor saturado, reintenta más tarde")
+        
+        def tarea():
+            try:
+                return func(*args, **kwargs)
+            finally:
+                cupos_bd.release()
+        
+        def al_terminar(futuro):
+            # Cancelada en cola (cliente desconectado): tarea() no llega a ejecutarse ni a liberar el cupo
+            if futuro.cancelled():
+                cupos_bd.release()
+        
+        futuro = ejecutor_bd.submit(tarea)
+        futuro.add_done_callback(al_terminar)
+        return await asyncio.wrap_future(futuro)
+    
+    return envoltura
+
 def init_database():
     """Inicializa la base de datos con estructura y datos de ejemplo"""
     conn = sqlite3.connect(DB_PATH)
@@ -36,6 +87,45 @@ def init_database():
         )
     """)
     
+    # Índice de texto completo sobre productos, sincronizado con triggers
+    cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'productos_fts'")
+    fts_nuevo = cursor.fetchone()[0] == 0
+    
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS productos_fts USING fts5(
+            nombre, categoria,
+            content='productos', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS productos_fts_ai AFTER INSERT ON productos BEGIN
+            INSERT INTO productos_fts (rowid, nombre, categoria)
+            VALUES (new.id, new.nombre, new.categoria);
+        END
+    """)
+    
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS productos_fts_ad AFTER DELETE ON productos BEGIN
+            INSERT INTO productos_fts (productos_fts, rowid, nombre, categoria)
+            VALUES ('delete', old.id, old.nombre, old.categoria);
+        END
+    """)
+    
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS productos_fts_au AFTER UPDATE OF nombre, categoria ON productos BEGIN
+            INSERT INTO productos_fts (productos_fts, rowid, nombre, categoria)
+            VALUES ('delete', old.id, old.nombre, old.categoria);
+            INSERT INTO productos_fts (rowid, nombre, categoria)
+            VALUES (new.id, new.nombre, new.categoria);
+        END
+    """)
+    
+    if fts_nuevo:
+        # Indexa los productos que existían antes de crear la tabla FTS
+        cursor.execute("INSERT INTO productos_fts (productos_fts) VALUES ('rebuild')")
+    
     cursor.execute("SELECT COUNT(*) FROM productos")
     if cursor.fetchone()[0] == 0:
         productos = [
@@ -66,186 +156,307 @@ def init_database():
     conn.commit()
     conn.close()
 
+def _validar_ids(ids: List[int]) -> List[int]:
+    """Elimina IDs repetidos conservando el orden y verifica que haya entre 1 y MAXIMO_IDS"""
+    unicos = list(dict.fromkeys(ids))
+    if not 1 <= len(unicos) <= MAXIMO_IDS:
+        raise ValueError(f"Se deben indicar entre 1 y {MAXIMO_IDS} IDs distintos")
+    return unicos
+
+def _columnas(
+    campos: Optional[List[str]], disponibles: Tuple[str, ...], obligatorios: Sequence[str] = ()
+) -> List[str]:
+    """
+    Valida los campos pedidos y devuelve las columnas a seleccionar, en el orden de `disponibles`.
+    
+    Raises:
+        ValueError: Si `campos` está vacío o contiene columnas desconocidas
+    """
+    if campos is None:
+        return list(disponibles)
+    if not campos:
+        raise ValueError("`campos` debe contener al menos un campo")
+    desconocidos = [campo for campo in campos if campo not in disponibles]
+    if desconocidos:
+        raise ValueError(f"Campos desconocidos {desconocidos}; opciones: {list(disponibles)}")
+    elegidos = set(campos) | set(obligatorios)
+    return [columna for columna in disponibles if columna in elegidos]
+
 @app.tool
-def obtener_todos_productos() -> List[Dict[str, Any]]:
-    """Obtiene la lista completa de productos"""
+@_en_hilo_bd
+def obtener_todos_productos(campos: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Obtiene la lista completa de productos.
+    
+    Args:
+        campos: Columnas a devolver (id, nombre, precio, categoria, stock); omitir para todas
+    """
+    columnas = _columnas(campos, CAMPOS_PRODUCTO)
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
-    cursor.execute("SELECT id, nombre, precio, categoria, stock FROM productos")
+    cursor.execute(f"SELECT {', '.join(columnas)} FROM productos")
     rows = cursor.fetchall()
     
-    productos = []
-    for row in rows:
-        productos.append({
-            "id": row[0],
-            "nombre": row[1],
-            "precio": row[2],
-            "categoria": row[3],
-            "stock": row[4]
-        })
+    productos = [dict(zip(columnas, row)) for row in rows]
     
     conn.close()
     return productos
 
 @app.tool
-def buscar_producto_por_id(producto_id: int) -> Optional[Dict[str, Any]]:
+@_en_hilo_bd
+def buscar_producto_por_id(producto_id: int, campos: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
     """
     Busca un producto específico por su ID.
     
     Args:
         producto_id: ID del producto a buscar
+        campos: Columnas a devolver (id, nombre, precio, categoria, stock); omitir para todas
         
     Returns:
         Diccionario con datos del producto o None si no existe
     """
+    columnas = _columnas(campos, CAMPOS_PRODUCTO)
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
     cursor.execute(
-        "SELECT id, nombre, precio, categoria, stock FROM productos WHERE id = ?",
+        f"SELECT {', '.join(columnas)} FROM productos WHERE id = ?",
         (producto_id,)
     )
     row = cursor.fetchone()
     
-    if row:
-        producto = {
-            "id": row[0],
-            "nombre": row[1],
-            "precio": row[2],
-            "categoria": row[3],
-            "stock": row[4]
-        }
-    else:
-        producto = None
+    producto = dict(zip(columnas, row)) if row else None
     
     conn.close()
     return producto
 
 @app.tool
-def buscar_productos_por_categoria(categoria: str) -> List[Dict[str, Any]]:
+@_en_hilo_bd
+def buscar_productos_por_ids(producto_ids: List[int], campos: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Busca varios productos por ID en una sola consulta.
+    
+    Args:
+        producto_ids: IDs de los productos a buscar (hasta 100)
+        campos: Columnas a devolver (id, nombre, precio, categoria, stock); omitir para todas (id se incluye siempre)
+        
+    Returns:
+        Diccionario con "resultados" (productos indexados por ID) y "no_encontrados" (IDs inexistentes)
+    """
+    ids = _validar_ids(producto_ids)
+    columnas = _columnas(campos, CAMPOS_PRODUCTO, obligatorios=("id",))
+    
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    cursor.execute(f"""
+        SELECT {', '.join('p.' + columna for columna in columnas)}
+        FROM json_each(?) ids
+        CROSS JOIN productos p ON p.id = ids.value
+    """, (json.dumps(ids),))
+    rows = cursor.fetchall()
+    
+    productos = [dict(zip(columnas, row)) for row in rows]
+    productos = {producto["id"]: producto for producto in productos}
+    
+    conn.close()
+    return {
+        "resultados": {str(i): productos[i] for i in ids if i in productos},
+        "no_encontrados": [i for i in ids if i not in productos]
+    }
+
+@app.tool
+@_en_hilo_bd
+def buscar_productos_por_categoria(categoria: str, campos: Optional[List[str]] = None) -> List[Dict[str, Any]]:
     """
     Busca productos por categoría.
     
     Args:
         categoria: Nombre de la categoría
+        campos: Columnas a devolver (id, nombre, precio, categoria, stock); omitir para todas
         
     Returns:
         Lista de productos en esa categoría
     """
+    columnas = _columnas(campos, CAMPOS_PRODUCTO)
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
     cursor.execute(
-        "SELECT id, nombre, precio, categoria, stock FROM productos WHERE categoria LIKE ?",
+        f"SELECT {', '.join(columnas)} FROM productos WHERE categoria LIKE ?",
         (f"%{categoria}%",)
     )
     rows = cursor.fetchall()
     
-    productos = [
-        {
-            "id": r[0],
-            "nombre": r[1],
-            "precio": r[2],
-            "categoria": r[3],
-            "stock": r[4]
-        }
-        for r in rows
-    ]
+    productos = [dict(zip(columnas, row)) for row in rows]
+    
+    conn.close()
+    return productos
+
+@app.tool
+@_en_hilo_bd
+def buscar_productos_texto(
+    texto: str, limite: int = 10, campos: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Búsqueda de texto libre sobre nombre y categoría de los productos.
+    
+    Usa el índice FTS5: cada palabra se busca como prefijo, sin distinguir tildes,
+    y los resultados se ordenan por relevancia (bm25).
+    
+    Args:
+        texto: Palabras a buscar, por ejemplo "silla oficina" o "electronica"
+        limite: Número máximo de resultados (entre 1 y 100)
+        campos: Columnas a devolver (id, nombre, precio, categoria, stock); omitir para todas
+        
+    Returns:
+        Lista de productos ordenada de mayor a menor relevancia
+        
+    Raises:
+        ValueError: Si el texto no contiene palabras, el límite está fuera de rango o algún campo no existe
+    """
+    columnas = _columnas(campos, CAMPOS_PRODUCTO)
+    palabras = re.findall(r"\w+", texto)
+    if not palabras:
+        raise ValueError("La búsqueda debe contener al menos una palabra")
+    if not 1 <= limite <= 100:
+        raise ValueError("El límite debe estar entre 1 y 100")
+    consulta = " ".join(f'"{palabra}"*' for palabra in palabras)
+    
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    cursor.execute(f"""
+        SELECT {', '.join('p.' + columna for columna in columnas)}
+        FROM productos_fts
+        JOIN productos p ON p.id = productos_fts.rowid
+        WHERE productos_fts MATCH ?
+        ORDER BY productos_fts.rank
+        LIMIT ?
+    """, (consulta, limite))
+    rows = cursor.fetchall()
+    
+    productos = [dict(zip(columnas, row)) for row in rows]
     
     conn.close()
     return productos
 
 @app.tool
-def buscar_productos_por_precio(precio_min: float, precio_max: float) -> List[Dict[str, Any]]:
+@_en_hilo_bd
+def buscar_productos_por_precio(
+    precio_min: float, precio_max: float, campos: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
     """
     Busca productos dentro de un rango de precios.
     
     Args:
         precio_min: Precio mínimo
         precio_max: Precio máximo
+        campos: Columnas a devolver (id, nombre, precio, categoria, stock); omitir para todas
         
     Returns:
         Lista de productos en ese rango de precios
     """
+    columnas = _columnas(campos, CAMPOS_PRODUCTO)
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
     cursor.execute(
-        "SELECT id, nombre, precio, categoria, stock FROM productos WHERE precio BETWEEN ? AND ?",
+        f"SELECT {', '.join(columnas)} FROM productos WHERE precio BETWEEN ? AND ?",
         (precio_min, precio_max)
     )
     rows = cursor.fetchall()
     
-    productos = [
-        {
-            "id": r[0],
-            "nombre": r[1],
-            "precio": r[2],
-            "categoria": r[3],
-            "stock": r[4]
-        }
-        for r in rows
-    ]
+    productos = [dict(zip(columnas, row)) for row in rows]
     
     conn.close()
     return productos
 
 @app.tool
-def obtener_todos_clientes() -> List[Dict[str, Any]]:
-    """Obtiene la lista completa de clientes"""
+@_en_hilo_bd
+def obtener_todos_clientes(campos: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Obtiene la lista completa de clientes.
+    
+    Args:
+        campos: Columnas a devolver (id, nombre, email, ciudad); omitir para todas
+    """
+    columnas = _columnas(campos, CAMPOS_CLIENTE)
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
-    cursor.execute("SELECT id, nombre, email, ciudad FROM clientes")
+    cursor.execute(f"SELECT {', '.join(columnas)} FROM clientes")
     rows = cursor.fetchall()
     
-    clientes = [
-        {
-            "id": r[0],
-            "nombre": r[1],
-            "email": r[2],
-            "ciudad": r[3]
-        }
-        for r in rows
-    ]
+    clientes = [dict(zip(columnas, row)) for row in rows]
     
     conn.close()
     return clientes
 
 @app.tool
-def buscar_cliente_por_id(cliente_id: int) -> Optional[Dict[str, Any]]:
+@_en_hilo_bd
+def buscar_cliente_por_id(cliente_id: int, campos: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
     """
     Busca un cliente específico por su ID.
     
     Args:
         cliente_id: ID del cliente a buscar
+        campos: Columnas a devolver (id, nombre, email, ciudad); omitir para todas
         
     Returns:
         Diccionario con datos del cliente o None si no existe
     """
+    columnas = _columnas(campos, CAMPOS_CLIENTE)
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
     cursor.execute(
-        "SELECT id, nombre, email, ciudad FROM clientes WHERE id = ?",
+        f"SELECT {', '.join(columnas)} FROM clientes WHERE id = ?",
         (cliente_id,)
     )
     row = cursor.fetchone()
     
-    if row:
-        cliente = {
-            "id": row[0],
-            "nombre": row[1],
-            "email": row[2],
-            "ciudad": row[3]
-        }
-    else:
-        cliente = None
+    cliente = dict(zip(columnas, row)) if row else None
     
     conn.close()
     return cliente
 
+@app.tool
+@_en_hilo_bd
+def buscar_clientes_por_ids(cliente_ids: List[int], campos: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Busca varios clientes por ID en una sola consulta.
+    
+    Args:
+        cliente_ids: IDs de los clientes a buscar (hasta 100)
+        campos: Columnas a devolver (id, nombre, email, ciudad); omitir para todas (id se incluye siempre)
+        
+    Returns:
+        Diccionario con "resultados" (clientes indexados por ID) y "no_encontrados" (IDs inexistentes)
+    """
+    ids = _validar_ids(cliente_ids)
+    columnas = _columnas(campos, CAMPOS_CLIENTE, obligatorios=("id",))
+    
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    cursor.execute(f"""
+        SELECT {', '.join('c.' + columna for columna in columnas)}
+        FROM json_each(?) ids
+        CROSS JOIN clientes c ON c.id = ids.value
+    """, (json.dumps(ids),))
+    rows = cursor.fetchall()
+    
+    clientes = [dict(zip(columnas, row)) for row in rows]
+    clientes = {cliente["id"]: cliente for cliente in clientes}
+    
+    conn.close()
+    return {
+        "resultados": {str(i): clientes[i] for i in ids if i in clientes},
+        "no_encontrados": [i for i in ids if i not in clientes]
+    }
+
 if __name__ == "__main__":
     print("Inicializando base de datos...")
     init_database()
@@ -258,10 +469,13 @@ if __name__ == "__main__":
     print("\n📋 Herramientas disponibles:")
     print("   • obtener_todos_productos")
     print("   • buscar_producto_por_id")
+    print("   • buscar_productos_por_ids")
     print("   • buscar_productos_por_categoria")
+    print("   • buscar_productos_texto")
     print("   • buscar_productos_por_precio")
     print("   • obtener_todos_clientes")
     print("   • buscar_cliente_por_id")
+    print("   • buscar_clientes_por_ids")
     print("\n💡 Presiona Ctrl+C para detener el servidor\n")
     print("=" * 60 + "\n")
     
@@ -4,16 +4,78 @@ Demuestra la integración completa de MCP con LangGraph.
 """
 
 import asyncio
+import operator
 import os
-from langchain_core.messages import HumanMessage, SystemMessage
+import time
+from typing import Annotated, Any, Dict, List, Optional
+from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.graph import StateGraph, START, MessagesState
 from langgraph.prebuilt import tools_condition, ToolNode
+from langgraph.types import Command
 from langchain_mcp_adapters.client import MultiServerMCPClient
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Llamadas a herramientas simultáneas como máximo y segundos máximos por llamada
+MAX_CONCURRENCIA = 4
+TIMEOUT_HERRAMIENTA = 10.0
+
+
+class EstadoAgente(MessagesState):
+    """Mensajes más el tiempo de cada llamada a herramienta"""
+    tiempos_herramientas: Annotated[List[Dict[str, Any]], operator.add]
+
+
+def crear_limitador(max_concurrencia: int = MAX_CONCURRENCIA, timeout: float = TIMEOUT_HERRAMIENTA):
+    """
+    Crea la envoltura `awrap_tool_call` del ToolNode.
+    
+    ToolNode lanza a la vez todas las llamadas que el modelo pide en un turno; la envoltura
+    deja correr `max_concurrencia` como máximo por `thread_id` (las invocaciones sin
+    `thread_id` comparten un mismo límite), corta las que superan `timeout` y anota la
+    duración de cada llamada y cómo terminó en `tiempos_herramientas`.
+    """
+    # thread_id -> [semáforo, llamadas que lo usan]; la entrada se borra al quedar sin uso
+    semaforos: Dict[Optional[str], List[Any]] = {}
+    
+    async def limitar(request, execute):
+        llamada = request.tool_call
+        config = getattr(request.runtime, "config", None) or {}
+        hilo = config.get("configurable", {}).get("thread_id")
+        entrada = semaforos.setdefault(hilo, [asyncio.Semaphore(max_concurrencia), 0])
+        entrada[1] += 1
+        inicio = time.perf_counter()
+        
+        async def con_plaza():
+            async with entrada[0]:
+                return await execute(request)
+        
+        # El tiempo límite incluye la espera por una plaza
+        try:
+            resultado = await asyncio.wait_for(con_plaza(), timeout)
+            # Una herramienta que falla devuelve un ToolMessage con status="error"
+            estado = "error" if getattr(resultado, "status", None) == "error" else "ok"
+        except asyncio.TimeoutError:
+            resultado = ToolMessage(
+                content=f"Error: {llamada['name']} no respondió en {timeout:g} s",
+                name=llamada["name"], tool_call_id=llamada["id"], status="error",
+            )
+            estado = "timeout"
+        finally:
+            entrada[1] -= 1
+            if entrada[1] == 0:
+                del semaforos[hilo]
+        tiempo = {
+            "herramienta": llamada["name"],
+            "duracion_ms": round((time.perf_counter() - inicio) * 1000, 1),
+            "estado": estado,
+        }
+        return Command(update={"messages": [resultado], "tiempos_herramientas": [tiempo]})
+    
+    return limitar
+
 async def crear_agente_matematico():
     """Crea un agente que puede realizar operaciones matemáticas via MCP"""
     
@@ -53,17 +115,19 @@ INSTRUCCIONES:
 - Usa las herramientas disponibles para los cálculos
 - Explica el resultado de forma clara
 - Si te piden operaciones complejas, descompónlas en pasos simples
+- Pide en el mismo turno las operaciones que no dependen entre sí: se ejecutan en paralelo
 """
     )
     
-    def assistant_node(state: MessagesState):
+    def assistant_node(state: EstadoAgente):
         messages = [system_message] + state["messages"]
         response = llm_with_tools.invoke(messages)
         return {"messages": [response]}
     
-    builder = StateGraph(MessagesState)
+    builder = StateGraph(EstadoAgente)
     builder.add_node("assistant", assistant_node)
-    builder.add_node("tools", ToolNode(tools))
+    # Las operaciones independientes de un mismo turno se ejecutan en paralelo
+    builder.add_node("tools", ToolNode(tools, awrap_tool_call=crear_limitador()))
     
     builder.add_edge(START, "assistant")
     builder.add_conditional_edges("assistant", tools_condition)
@@ -106,6 +170,8 @@ async def probar_agente(graph):
             
             if respuesta:
                 print(f"\n🤖 Respuesta: {respuesta}")
+                for tiempo in result.get("tiempos_herramientas", []):
+                    print(f"   🔧 {tiempo['herramienta']}: {tiempo['duracion_ms']:.0f} ms ({tiempo['estado']})")
             else:
                 print("\n⚠️  No se obtuvo respuesta")
                 
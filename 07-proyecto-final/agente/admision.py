@@ -0,0 +1,191 @@
+"""
+Control de admisión de la API REST.
+Limita cuántos turnos del agente corren a la vez, encola los demás con un tiempo máximo de espera
+y rechaza con 429/503 y `Retry-After` cuando la API está saturada. Los turnos de un mismo
+`thread_id` se ejecutan de uno en uno.
+"""
+
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+
+class SinCapacidad(Exception):
+    """La petición no se admite: cola llena (429) o espera agotada (503)"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class Permiso:
+    """Turno admitido; `ControlAdmision.salir()` lo libera una sola vez aunque se llame varias"""
+
+    def __init__(self, thread_id: str, candado: asyncio.Lock, inicio: float):
+        self.thread_id = thread_id
+        self.candado = candado
+        self.inicio = inicio
+        self.liberado = False
+
+
+class ControlAdmision:
+    """
+    Controlador de admisión para los endpoints que ejecutan el grafo del agente.
+
+    Cada petición espera primero a que termine el turno anterior de su `thread_id` (dos turnos
+    del mismo hilo a la vez leerían el mismo checkpoint y uno pisaría al otro) y después a una de
+    las `max_en_curso` plazas. Si ya hay `max_cola` peticiones esperando se rechaza al momento
+    con 429; si la espera supera `espera_maxima` segundos, con 503. Ambos rechazos llevan un
+    `retry_after` estimado con la duración media reciente de los turnos.
+    """
+
+    def __init__(self, max_en_curso: int = 8, max_cola: int = 32, espera_maxima: float = 10.0):
+        """
+        Args:
+            max_en_curso: Turnos del agente ejecutándose a la vez como máximo
+            max_cola: Peticiones esperando como máximo; las siguientes se rechazan con 429
+            espera_maxima: Segundos que una petición puede esperar antes de rechazarse con 503 (0 sin límite)
+        """
+        if max_en_curso < 1 or max_cola < 0 or espera_maxima < 0:
+            raise ValueError("max_en_curso debe ser al menos 1; max_cola y espera_maxima no pueden ser negativos")
+
+        self.max_en_curso = max_en_curso
+        self.max_cola = max_cola
+        self.espera_maxima = espera_maxima
+        self.en_curso = 0
+        self.en_cola = 0
+        self._plazas: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # thread_id -> [candado, peticiones que lo usan]; la entrada se borra al quedar sin uso
+        self._hilos: Dict[str, List[Any]] = {}
+        self._duracion_media = 0.0
+        self._metricas = {
+            "admitidas": 0,
+            "rechazadas_cola_llena": 0,
+            "rechazadas_espera": 0,
+            "espera_total_ms": 0.0,
+        }
+
+    def _plazas_actuales(self) -> asyncio.Semaphore:
+        """Semáforo del event loop en curso"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._plazas = asyncio.Semaphore(self.max_en_curso)
+            self._hilos = {}
+            self._loop = loop
+        return self._plazas
+
+    def retry_after(self) -> int:
+        """Segundos estimados hasta que la cola actual se vacíe (al menos 1)"""
+        turnos = (self.en_cola + 1) / self.max_en_curso
+        return max(1, math.ceil(turnos * (self._duracion_media or 1.0)))
+
+    def _rechazar(self, status_code: int, detail: str, metrica: str) -> SinCapacidad:
+        self._metricas[metrica] += 1
+        return SinCapacidad(status_code, detail, self.retry_after())
+
+    def _soltar_hilo(self, thread_id: str):
+        entrada = self._hilos[thread_id]
+        entrada[1] -= 1
+        if entrada[1] == 0:
+            del self._hilos[thread_id]
+
+    @staticmethod
+    async def _adquirir(candado: asyncio.Lock, plazas: asyncio.Semaphore):
+        """Toma el turno del hilo y después una plaza; si se cancela a medias, suelta el turno"""
+        await candado.acquire()
+        try:
+            await plazas.acquire()
+        except BaseException:
+            candado.release()
+            raise
+
+    async def entrar(self, thread_id: str) -> Permiso:
+        """
+        Espera turno para ejecutar el agente en un hilo.
+
+        Args:
+            thread_id: ID del hilo de conversación
+
+        Returns:
+            Permiso que hay que devolver con `salir()` al terminar
+
+        Raises:
+            SinCapacidad: 429 si la cola está llena, 503 si se agota la espera
+        """
+        plazas = self._plazas_actuales()
+        if self.en_cola >= self.max_cola and (plazas.locked() or thread_id in self._hilos):
+            raise self._rechazar(429, "Demasiadas peticiones en espera; reintenta más tarde", "rechazadas_cola_llena")
+
+        entrada = self._hilos.setdefault(thread_id, [asyncio.Lock(), 0])
+        entrada[1] += 1
+        candado = entrada[0]
+        encolada = time.perf_counter()
+        self.en_cola += 1
+        try:
+            if candado.locked() or plazas.locked():
+                await asyncio.wait_for(self._adquirir(candado, plazas), self.espera_maxima or None)
+            else:
+                # Ambos libres: se toman sin ceder el loop, antes de que entre la siguiente petición
+                await self._adquirir(candado, plazas)
+        except asyncio.TimeoutError:
+            self._soltar_hilo(thread_id)
+            raise self._rechazar(
+                503, f"Sin capacidad tras esperar {self.espera_maxima:g} s; reintenta más tarde", "rechazadas_espera"
+            )
+        except BaseException:
+            self._soltar_hilo(thread_id)
+            raise
+        finally:
+            self.en_cola -= 1
+
+        inicio = time.perf_counter()
+        self._metricas["admitidas"] += 1
+        self._metricas["espera_total_ms"] += (inicio - encolada) * 1000
+        self.en_curso += 1
+        return Permiso(thread_id, candado, inicio)
+
+    def salir(self, permiso: Permiso):
+        """Libera la plaza y el hilo de un permiso; las llamadas repetidas no hacen nada"""
+        if permiso.liberado:
+            return
+        permiso.liberado = True
+        duracion = time.perf_counter() - permiso.inicio
+        # Media móvil exponencial: responde a cambios de carga sin guardar historial
+        self._duracion_media = duracion if not self._duracion_media else 0.8 * self._duracion_media + 0.2 * duracion
+        self.en_curso -= 1
+        self._plazas.release()
+        permiso.candado.release()
+        self._soltar_hilo(permiso.thread_id)
+
+    @asynccontextmanager
+    async def admitir(self, thread_id: str) -> AsyncIterator[Permiso]:
+        """Ejecuta el bloque `async with` con turno admitido en el hilo"""
+        permiso = await self.entrar(thread_id)
+        try:
+            yield permiso
+        finally:
+            self.salir(permiso)
+
+    def metricas(self) -> Dict[str, Any]:
+        """
+        Devuelve la ocupación y los contadores del controlador.
+
+        Returns:
+            Diccionario con turnos en curso y en cola, límites, admitidas, rechazos por cola llena
+            y por espera agotada, espera media y duración media reciente de los turnos
+        """
+        metricas = dict(self._metricas)
+        metricas["en_curso"] = self.en_curso
+        metricas["en_cola"] = self.en_cola
+        metricas["max_en_curso"] = self.max_en_curso
+        metricas["max_cola"] = self.max_cola
+        metricas["espera_promedio_ms"] = (
+            metricas.pop("espera_total_ms") / metricas["admitidas"] if metricas["admitidas"] else 0.0
+        )
+        metricas["duracion_media_ms"] = round(self._duracion_media * 1000, 1)
+        return metricas
@@ -4,23 +4,106 @@ Utiliza langchain-mcp-adapters para conectarse al servidor y responder consultas
 """
 
 import os
-from typing import List, Dict, Any
+import time
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_mcp_adapters.client import MultiServerMCPClient
-from langgraph.graph import StateGraph, MessagesState
+from langgraph.graph import StateGraph
 from langgraph.prebuilt import ToolNode, tools_condition
 from langgraph.checkpoint.memory import MemorySaver
+from cache_herramientas import CacheHerramientas
+from herramientas_paralelas import EstadoAgente, LimitadorHerramientas, reiniciar_tiempos, tiempos_del_turno
+from memoria_sqlite import MemoriaSQLite
+from pool_sesiones import PoolSesionesMCP
 
 load_dotenv()
 
+# Herramientas de escritura del servidor que el asistente de consultas no debe poder invocar
+HERRAMIENTAS_EXCLUIDAS = {"ingerir_polizas"}
+
+# Herramientas de solo lectura y respuesta acotada cuyo resultado el agente reutiliza entre turnos e
+# hilos. Quedan fuera los listados completos y la exportación, que pueden ser enormes
+HERRAMIENTAS_CACHEABLES = {
+    "buscar_poliza_por_id", "buscar_polizas_por_ids", "buscar_polizas_por_cliente", "polizas_por_vencer",
+    "obtener_polizas_paginadas", "obtener_clientes_paginados", "buscar_cliente_por_id", "buscar_clientes_por_ids",
+    "buscar_clientes_texto", "obtener_productos_seguros", "buscar_producto_seguro", "buscar_productos_por_ids",
+    "buscar_productos_texto", "resumen_cartera",
+}
+# El catálogo de productos casi no cambia: sus resultados viven más que AGENTE_CACHE_TTL
+TTLS_CACHE = {
+    "obtener_productos_seguros": 600.0, "buscar_producto_seguro": 600.0,
+    "buscar_productos_por_ids": 600.0, "buscar_productos_texto": 600.0,
+}
+
+# Sesiones MCP que el agente mantiene abiertas y reutiliza (0: una sesión nueva por llamada)
+SESIONES_MCP = int(os.getenv("AGENTE_MCP_SESIONES", "4"))
+
+# Llamadas a herramientas de un mismo turno que corren a la vez y tiempo límite de cada una
+MAX_HERRAMIENTAS_CONCURRENTES = int(os.getenv("AGENTE_HERRAMIENTAS_CONCURRENCIA", "4"))
+TIMEOUT_HERRAMIENTAS = float(os.getenv("AGENTE_HERRAMIENTAS_TIMEOUT", "30"))
+# Herramientas que necesitan más margen que TIMEOUT_HERRAMIENTAS
+TIMEOUTS_POR_HERRAMIENTA = {"exportar_polizas": 120.0, "obtener_todas_polizas": 60.0, "obtener_todos_clientes": 60.0}
+
+# Con AGENTE_MEMORIA_DB las conversaciones se guardan en SQLite: sobreviven a reinicios y las
+# comparten los procesos de la API. Sin ella se guardan en memoria del proceso y sin límite
+MEMORIA_DB = os.getenv("AGENTE_MEMORIA_DB") or None
+
+
+def crear_memoria(db_path: Optional[str] = MEMORIA_DB):
+    """
+    Crea el checkpointer de las conversaciones.
+
+    Args:
+        db_path: Archivo SQLite; None usa MemorySaver
+
+    Returns:
+        MemoriaSQLite con la retención de AGENTE_MEMORIA_TTL, AGENTE_MEMORIA_MAX_HILOS y
+        AGENTE_MEMORIA_CHECKPOINTS, o MemorySaver
+    """
+    if db_path is None:
+        return MemorySaver()
+    return MemoriaSQLite(
+        db_path,
+        ttl=float(os.getenv("AGENTE_MEMORIA_TTL", str(7 * 24 * 3600))),
+        max_hilos=int(os.getenv("AGENTE_MEMORIA_MAX_HILOS", "10000")),
+        checkpoints_por_hilo=int(os.getenv("AGENTE_MEMORIA_CHECKPOINTS", "10")),
+    )
+
+
+def texto_mensaje(mensaje: Any) -> str:
+    """
+    Extrae el texto de un mensaje o fragmento del modelo.
+    
+    Gemini puede devolver el contenido como lista de partes; solo se conservan las de texto.
+    """
+    contenido = mensaje.content
+    if isinstance(contenido, str):
+        return contenido
+    return "".join(
+        parte if isinstance(parte, str) else parte.get("text", "")
+        for parte in contenido
+        if isinstance(parte, str) or parte.get("type") == "text"
+    )
+
+
 class AgenteSeguro:
-    def __init__(self, mcp_server_url: str = "http://localhost:8200/mcp"):
+    def __init__(self, mcp_server_url: str = "http://localhost:8200/mcp", memoria_db: Optional[str] = MEMORIA_DB):
         """
         Args:
             mcp_server_url: URL del servidor MCP de seguros
+            memoria_db: Archivo SQLite de las conversaciones (None las guarda en memoria)
         """
         self.mcp_server_url = mcp_server_url
+        self.memoria_db = memoria_db
+        self.memoria = None
+        self.pool_sesiones = None
+        self.cache = CacheHerramientas(
+            HERRAMIENTAS_CACHEABLES,
+            capacidad=int(os.getenv("AGENTE_CACHE_CAPACIDAD", "512")),
+            ttl=float(os.getenv("AGENTE_CACHE_TTL", "60")),
+            ttls=TTLS_CACHE,
+        )
         self.llm = None
         self.graph = None
         self.tools = None
@@ -35,11 +118,17 @@ class AgenteSeguro:
     
     async def _setup_client(self):
         """Configura el cliente MCP y el modelo LLM con las herramientas"""
+        conexiones = {"aseguradora": {"url": self.mcp_server_url, "transport": "streamable_http"}}
+        # Con el pool, las herramientas llaman sobre sesiones persistentes en lugar de abrir una por llamada
+        if SESIONES_MCP:
+            self.pool_sesiones = PoolSesionesMCP(conexiones, tamano=SESIONES_MCP)
         self.client = MultiServerMCPClient(
-            {"aseguradora": {"url": self.mcp_server_url, "transport": "streamable_http"}}
+            conexiones, tool_interceptors=[self.pool_sesiones] if self.pool_sesiones else None
         )
         
-        self.tools = await self.client.get_tools()
+        self.tools = self.cache.envolver(
+            [t for t in await self.client.get_tools() if t.name not in HERRAMIENTAS_EXCLUIDAS]
+        )
         
         self.llm = ChatGoogleGenerativeAI(
             model="gemini-2.5-flash",
@@ -49,9 +138,18 @@ class AgenteSeguro:
     
     async def _setup_graph(self):
         """Configura el grafo de LangGraph con el agente y las herramientas"""
-        tool_node = ToolNode(tools=self.tools)
+        # ToolNode lanza a la vez las llamadas de un mismo turno; el limitador acota cuántas
+        # corren en paralelo, corta las que tardan demasiado y guarda sus tiempos en el estado
+        tool_node = ToolNode(
+            tools=self.tools,
+            awrap_tool_call=LimitadorHerramientas(
+                max_concurrencia=MAX_HERRAMIENTAS_CONCURRENTES,
+                timeout=TIMEOUT_HERRAMIENTAS,
+                timeouts=TIMEOUTS_POR_HERRAMIENTA,
+            ),
+        )
         
-        def call_model(state: MessagesState) -> Dict[str, Any]:
+        async def call_model(state: EstadoAgente) -> Dict[str, Any]:
             messages = state["messages"]
             system_message = {
                 "role": "system",
@@ -60,12 +158,20 @@ a consultar información sobre sus pólizas, productos de seguros disponibles y
 
 Capacidades:
 - Consultar todas las pólizas activas
+- Recorrer pólizas y clientes por páginas (pasa `siguiente_cursor` como `cursor` para continuar)
 - Buscar pólizas específicas por ID
+- Consultar varias pólizas, clientes o productos a la vez con las búsquedas `*_por_ids` (una sola llamada en lugar de una por ID)
 - Ver todas las pólizas de un cliente
+- Listar las pólizas que vencen en un rango de fechas con `polizas_por_vencer`
 - Filtrar pólizas por tipo de seguro (Vida, Auto, Hogar, Salud, Accidentes)
 - Consultar productos de seguros disponibles con sus coberturas
 - Ver información de clientes asegurados
 - Buscar clientes por ciudad
+- Buscar clientes y productos por texto libre (nombre, email, ciudad, descripción)
+- Calcular conteos, totales y promedios de primas y coberturas con `resumen_cartera` (nunca sumes pólizas a mano)
+
+Cuando necesites varias consultas que no dependen entre sí (por ejemplo, los datos de un cliente y sus
+pólizas), pídelas todas en el mismo turno: se ejecutan en paralelo.
 
 Siempre sé profesional, claro y conciso. Cuando presentes información de pólizas, incluye:
 - Número de póliza
@@ -77,10 +183,12 @@ Siempre sé profesional, claro y conciso. Cuando presentes información de póli
 
 Si no encuentras información, sugiere alternativas de búsqueda."""
             }
-            response = self.llm.invoke([system_message] + messages)
-            return {"messages": [response]}
+            # ainvoke emite los tokens como eventos cuando el turno se consume con astream_events
+            response = await self.llm.ainvoke([system_message] + messages)
+            # Los tiempos de herramientas del turno anterior no se arrastran en los checkpoints
+            return {"messages": [response], **reiniciar_tiempos(state)}
         
-        workflow = StateGraph(MessagesState)
+        workflow = StateGraph(EstadoAgente)
         workflow.add_node("agent", call_model)
         workflow.add_node("tools", tool_node)
         
@@ -88,8 +196,8 @@ Si no encuentras información, sugiere alternativas de búsqueda."""
         workflow.add_conditional_edges("agent", tools_condition)
         workflow.add_edge("tools", "agent")
         
-        memory = MemorySaver()
-        self.graph = workflow.compile(checkpointer=memory)
+        self.memoria = crear_memoria(self.memoria_db)
+        self.graph = workflow.compile(checkpointer=self.memoria)
     
     async def chat(self, message: str, thread_id: str = "default") -> str:
         """
@@ -102,6 +210,20 @@ Si no encuentras información, sugiere alternativas de búsqueda."""
         Returns:
             Respuesta del agente
         """
+        respuesta, _ = await self.chat_con_herramientas(message, thread_id)
+        return respuesta
+    
+    async def chat_con_herramientas(self, message: str, thread_id: str = "default") -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        Envía un mensaje al agente y devuelve también las herramientas que usó en el turno.
+        
+        Args:
+            message: Mensaje del usuario
+            thread_id: ID del hilo de conversación para mantener contexto
+            
+        Returns:
+            Respuesta del agente y, por cada llamada a herramienta, su nombre, espera, duración y estado
+        """
         if not self._initialized:
             await self.initialize()
             
@@ -109,7 +231,70 @@ Si no encuentras información, sugiere alternativas de búsqueda."""
             {"messages": [{"role": "user", "content": message}]},
             config={"configurable": {"thread_id": thread_id}}
         )
-        return response["messages"][-1].content
+        return response["messages"][-1].content, tiempos_del_turno(response)
+    
+    async def chat_stream(self, message: str, thread_id: str = "default") -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Envía un mensaje al agente y emite el turno a medida que ocurre.
+        
+        Args:
+            message: Mensaje del usuario
+            thread_id: ID del hilo de conversación para mantener contexto
+            
+        Yields:
+            Tuplas (evento, datos):
+            - ("token", {"text"}): texto generado por el modelo
+            - ("tool_start", {"name", "run_id", "input"}): el agente llama a una herramienta
+            - ("tool_end", {"name", "run_id", "duration_ms", "status"}): la herramienta terminó
+            - ("end", {"response", "tools_used", "usage", "first_token_ms", "duration_ms"}): fin del turno
+        """
+        if not self._initialized:
+            await self.initialize()
+        
+        config = {"configurable": {"thread_id": thread_id}}
+        inicio = time.perf_counter()
+        primer_token_ms = None
+        inicios_herramientas: Dict[str, float] = {}
+        uso = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+        
+        async for evento in self.graph.astream_events(
+            {"messages": [{"role": "user", "content": message}]}, config=config, version="v2"
+        ):
+            tipo = evento["event"]
+            if tipo == "on_chat_model_stream":
+                texto = texto_mensaje(evento["data"]["chunk"])
+                if texto:
+                    if primer_token_ms is None:
+                        primer_token_ms = round((time.perf_counter() - inicio) * 1000, 1)
+                    yield "token", {"text": texto}
+            elif tipo == "on_chat_model_end":
+                for clave, valor in (getattr(evento["data"]["output"], "usage_metadata", None) or {}).items():
+                    if clave in uso:
+                        uso[clave] += valor
+            elif tipo == "on_tool_start":
+                inicios_herramientas[evento["run_id"]] = time.perf_counter()
+                yield "tool_start", {
+                    "name": evento["name"],
+                    "run_id": evento["run_id"],
+                    "input": evento["data"].get("input"),
+                }
+            elif tipo == "on_tool_end":
+                comienzo = inicios_herramientas.pop(evento["run_id"], time.perf_counter())
+                yield "tool_end", {
+                    "name": evento["name"],
+                    "run_id": evento["run_id"],
+                    "duration_ms": round((time.perf_counter() - comienzo) * 1000, 1),
+                    "status": getattr(evento["data"].get("output"), "status", "success"),
+                }
+        
+        estado = (await self.graph.aget_state(config)).values
+        yield "end", {
+            "response": texto_mensaje(estado["messages"][-1]),
+            "tools_used": tiempos_del_turno(estado),
+            "usage": uso,
+            "first_token_ms": primer_token_ms,
+            "duration_ms": round((time.perf_counter() - inicio) * 1000, 1),
+        }
     
     def get_history(self, thread_id: str = "default") -> List[Dict[str, str]]:
         """
@@ -132,3 +317,10 @@ Si no encuentras información, sugiere alternativas de búsqueda."""
                 for msg in state.values["messages"]
             ]
         return []
+    
+    async def cerrar(self):
+        """Cierra las sesiones MCP del pool y la memoria de conversaciones si está en disco"""
+        if self.pool_sesiones is not None:
+            await self.pool_sesiones.cerrar()
+        if isinstance(self.memoria, MemoriaSQLite):
+            self.memoria.cerrar()
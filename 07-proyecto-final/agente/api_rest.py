@@ -5,9 +5,14 @@ Permite interacción con el agente via HTTP requests.
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from typing import AsyncIterator, Optional, List, Dict, Any
+import json
+import os
 import uvicorn
+from admision import ControlAdmision, SinCapacidad
 from agente_seguros import AgenteSeguro
 
 app = FastAPI(
@@ -26,6 +31,13 @@ app.add_middleware(
 
 agente = None
 
+# Turnos del agente a la vez, peticiones en espera y segundos máximos de espera antes de rechazar
+admision = ControlAdmision(
+    max_en_curso=int(os.getenv("API_MAX_EN_CURSO", "8")),
+    max_cola=int(os.getenv("API_MAX_COLA", "32")),
+    espera_maxima=float(os.getenv("API_ESPERA_MAXIMA", "10")),
+)
+
 
 class ChatRequest(BaseModel):
     message: str
@@ -57,6 +69,13 @@ async def startup_event():
         raise
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Cierra las sesiones MCP y la memoria de conversaciones al detener la API"""
+    if agente is not None:
+        await agente.cerrar()
+
+
 @app.get("/")
 async def root():
     """Endpoint raíz con información de la API"""
@@ -65,6 +84,7 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "POST /chat": "Enviar mensaje al agente",
+            "POST /chat/stream": "Enviar mensaje y recibir la respuesta por Server-Sent Events",
             "GET /history/{thread_id}": "Obtener historial de conversación",
             "GET /health": "Verificar estado del sistema"
         }
@@ -85,15 +105,79 @@ async def chat(request: ChatRequest):
     if agente is None:
         raise HTTPException(status_code=503, detail="Agente no inicializado")
     
+    permiso = await admitir(request.thread_id)
     try:
-        respuesta = await agente.chat(request.message, request.thread_id)
+        respuesta, herramientas = await agente.chat_con_herramientas(request.message, request.thread_id)
         return ChatResponse(
             response=respuesta,
             thread_id=request.thread_id,
-            tools_used=[]
+            tools_used=herramientas
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al procesar mensaje: {str(e)}")
+    finally:
+        admision.salir(permiso)
+
+
+async def admitir(thread_id: str):
+    """
+    Espera turno en el control de admisión.
+    
+    Raises:
+        HTTPException: 429 o 503 con la cabecera Retry-After si la API está saturada
+    """
+    try:
+        return await admision.entrar(thread_id)
+    except SinCapacidad as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+
+
+def evento_sse(evento: str, datos: Dict[str, Any]) -> str:
+    """Formatea un evento de Server-Sent Events con sus datos en JSON"""
+    return f"event: {evento}\ndata: {json.dumps(datos, ensure_ascii=False, default=str)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Envía un mensaje al agente y devuelve el turno por Server-Sent Events.
+    
+    Eventos: `token` (texto del modelo a medida que se genera), `tool_start` y `tool_end` (cada
+    llamada a herramienta), `end` (respuesta completa, herramientas usadas, tokens consumidos y
+    tiempo hasta el primer token) y `error` si el turno falla a medias.
+    
+    Args:
+        request: Objeto con message y thread_id opcional
+        
+    Returns:
+        Respuesta `text/event-stream`
+    """
+    if agente is None:
+        raise HTTPException(status_code=503, detail="Agente no inicializado")
+    
+    # La admisión se decide antes de responder, para poder rechazar con 429/503 en lugar de 200
+    permiso = await admitir(request.thread_id)
+    
+    async def eventos() -> AsyncIterator[str]:
+        try:
+            async for evento, datos in agente.chat_stream(request.message, request.thread_id):
+                if evento == "end":
+                    datos = {"thread_id": request.thread_id, **datos}
+                yield evento_sse(evento, datos)
+        except Exception as e:
+            # La respuesta ya empezó con 200: el error llega como evento
+            yield evento_sse("error", {"detail": f"Error al procesar mensaje: {str(e)}"})
+        finally:
+            admision.salir(permiso)
+    
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        # Sin caché ni buffer de proxies (nginx), para que cada token salga en cuanto se genera
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Por si la respuesta no llega a empezar (cliente desconectado): salir() es idempotente
+        background=BackgroundTask(admision.salir, permiso),
+    )
 
 
 @app.get("/history/{thread_id}", response_model=HistoryResponse)
@@ -128,7 +212,8 @@ async def health_check():
     health_status = {
         "status": "healthy" if agente is not None else "unhealthy",
         "api": "online",
-        "agente": "initialized" if agente is not None else "not_initialized"
+        "agente": "initialized" if agente is not None else "not_initialized",
+        "admision": admision.metricas()
     }
     
     # Verificar conexión con servidor MCP
@@ -136,6 +221,9 @@ async def health_check():
         if agente and agente.tools:
             health_status["mcp_server"] = "connected"
             health_status["tools_available"] = len(agente.tools)
+            health_status["cache_herramientas"] = agente.cache.metricas()
+            if agente.pool_sesiones is not None:
+                health_status["sesiones_mcp"] = agente.pool_sesiones.metricas()
         else:
             health_status["mcp_server"] = "not_connected"
     except Exception:
@@ -152,6 +240,7 @@ if __name__ == "__main__":
     print("\n🚀 Iniciando servidor en http://localhost:8000")
     print("\n📋 Endpoints disponibles:")
     print("   • POST /chat                  - Enviar mensaje")
+    print("   • POST /chat/stream           - Enviar mensaje (respuesta por SSE)")
     print("   • GET /history/{thread_id}    - Ver historial")
     print("   • GET /health                 - Estado del sistema")
     print("\n📖 Documentación interactiva:")
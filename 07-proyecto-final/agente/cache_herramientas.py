@@ -0,0 +1,161 @@
+"""
+Caché del lado del agente para los resultados de las herramientas MCP.
+LRU con expiración (TTL), indexada por herramienta y argumentos: un acierto responde sin abrir
+una sesión MCP ni hacer la petición HTTP al servidor.
+"""
+
+import functools
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from langchain_core.tools import BaseTool
+
+Clave = Tuple[str, str]
+
+
+class CacheHerramientas:
+    """
+    Caché LRU thread-safe de resultados de herramientas de solo lectura.
+
+    Solo se cachean las herramientas de la lista `cacheables`; las demás (escrituras, listados
+    enormes, exportaciones con progreso) siempre llegan al servidor. Los errores no se cachean:
+    el adaptador MCP los lanza como excepción y la entrada no llega a guardarse.
+    """
+
+    def __init__(
+        self,
+        cacheables: Iterable[str],
+        capacidad: int = 512,
+        ttl: float = 60.0,
+        ttls: Optional[Dict[str, float]] = None,
+    ):
+        """
+        Args:
+            cacheables: Nombres de las herramientas cuyo resultado puede reutilizarse
+            capacidad: Número máximo de entradas; al superarlo se expulsa la menos usada
+            ttl: Segundos de validez de cada entrada (0 desactiva la caché)
+            ttls: Validez propia de algunas herramientas, por nombre
+        """
+        if capacidad < 0 or ttl < 0 or any(t < 0 for t in (ttls or {}).values()):
+            raise ValueError("capacidad y ttl no pueden ser negativos")
+
+        self.cacheables = set(cacheables)
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self.ttls = dict(ttls or {})
+        self._entradas: "OrderedDict[Clave, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._metricas = {
+            "aciertos": 0,
+            "fallos": 0,
+            "expulsiones": 0,
+            "expiradas": 0,
+        }
+        self._por_herramienta: Dict[str, Dict[str, int]] = {}
+
+    @property
+    def activa(self) -> bool:
+        return self.capacidad > 0 and self.ttl > 0
+
+    def _contar(self, herramienta: str, resultado: str):
+        """Suma un acierto o fallo global y de la herramienta (requiere el lock)"""
+        self._metricas[resultado] += 1
+        contadores = self._por_herramienta.setdefault(herramienta, {"aciertos": 0, "fallos": 0})
+        contadores[resultado] += 1
+
+    def obtener(self, clave: Clave) -> Tuple[bool, Any]:
+        """
+        Busca una entrada vigente.
+
+        Returns:
+            Tupla (encontrada, valor)
+        """
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada[0] < time.monotonic():
+                del self._entradas[clave]
+                self._metricas["expiradas"] += 1
+                entrada = None
+            if entrada is None:
+                self._contar(clave[0], "fallos")
+                return False, None
+            self._entradas.move_to_end(clave)
+            self._contar(clave[0], "aciertos")
+            return True, entrada[1]
+
+    def guardar(self, clave: Clave, valor: Any):
+        """Guarda un resultado con la validez de su herramienta"""
+        ttl = self.ttls.get(clave[0], self.ttl)
+        with self._lock:
+            self._entradas.pop(clave, None)
+            self._entradas[clave] = (time.monotonic() + ttl, valor)
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+                self._metricas["expulsiones"] += 1
+
+    def limpiar(self):
+        """Vacía la caché por completo"""
+        with self._lock:
+            self._entradas.clear()
+
+    def envolver(self, tools: List[BaseTool]) -> List[BaseTool]:
+        """
+        Devuelve las herramientas con las de la lista `cacheables` envueltas por la caché.
+
+        La clave combina el nombre con los argumentos serializados con claves ordenadas, de
+        modo que `{"a": 1, "b": 2}` y `{"b": 2, "a": 1}` comparten entrada. Con la caché
+        desactivada las herramientas se devuelven sin cambios.
+
+        Args:
+            tools: Herramientas de `MultiServerMCPClient.get_tools()`
+
+        Returns:
+            Lista con el mismo orden; las herramientas no cacheables son los mismos objetos
+        """
+        if not self.activa:
+            return list(tools)
+        return [
+            self._envolver(tool) if tool.name in self.cacheables and getattr(tool, "coroutine", None) else tool
+            for tool in tools
+        ]
+
+    def _envolver(self, tool: BaseTool) -> BaseTool:
+        """Copia de la herramienta cuya corrutina consulta la caché antes de llamar al servidor"""
+        original = tool.coroutine
+
+        @functools.wraps(original)
+        async def envoltura(*args, **kwargs):
+            # El runtime de LangGraph se inyecta en cada llamada y no forma parte de la clave
+            argumentos = {k: v for k, v in kwargs.items() if k != "runtime"}
+            clave = (tool.name, json.dumps(argumentos, sort_keys=True, default=str))
+            encontrada, valor = self.obtener(clave)
+            if encontrada:
+                return valor
+            valor = await original(*args, **kwargs)
+            self.guardar(clave, valor)
+            return valor
+
+        return tool.model_copy(update={"coroutine": envoltura})
+
+    def metricas(self) -> Dict[str, Any]:
+        """
+        Devuelve los contadores de uso de la caché.
+
+        Returns:
+            Diccionario con aciertos, fallos, expulsiones, expiradas, tamaño, tasa de aciertos
+            y aciertos y fallos por herramienta
+        """
+        with self._lock:
+            metricas = dict(self._metricas)
+            metricas["entradas"] = len(self._entradas)
+            metricas["por_herramienta"] = {
+                nombre: dict(contadores) for nombre, contadores in self._por_herramienta.items()
+            }
+        metricas["capacidad"] = self.capacidad
+        metricas["ttl_segundos"] = self.ttl
+        consultas = metricas["aciertos"] + metricas["fallos"]
+        metricas["tasa_aciertos"] = metricas["aciertos"] / consultas if consultas else 0.0
+        return metricas
@@ -0,0 +1,171 @@
+"""
+Ejecución concurrente y controlada de las llamadas a herramientas del agente.
+Se conecta al ToolNode de LangGraph como `awrap_tool_call`: limita cuántas llamadas corren a la
+vez, corta las que superan su tiempo límite y registra la duración de cada una en el estado.
+"""
+
+import asyncio
+import time
+from typing import Annotated, Any, Awaitable, Callable, Dict, List, Optional
+
+from langchain_core.messages import ToolMessage
+from langgraph.graph import MessagesState
+from langgraph.prebuilt.tool_node import ToolCallRequest
+from langgraph.types import Command
+
+
+def acumular_tiempos(
+    actuales: Optional[List[Dict[str, Any]]], nuevos: Optional[List[Dict[str, Any]]]
+) -> List[Dict[str, Any]]:
+    """
+    Reductor de `tiempos_herramientas`: añade los tiempos nuevos y vacía la lista al recibir None.
+
+    El estado se guarda en cada checkpoint del hilo; sin vaciarla, la lista crecería con toda la
+    conversación. El nodo del modelo envía None al empezar cada turno (`reiniciar_tiempos`).
+    """
+    if nuevos is None:
+        return []
+    return (actuales or []) + nuevos
+
+
+class EstadoAgente(MessagesState):
+    """Mensajes de la conversación más los tiempos de las llamadas a herramientas del turno en curso"""
+    tiempos_herramientas: Annotated[List[Dict[str, Any]], acumular_tiempos]
+
+
+def reiniciar_tiempos(estado: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Actualización que vacía `tiempos_herramientas` si el último mensaje es del usuario.
+
+    Args:
+        estado: Estado que recibe el nodo del modelo
+
+    Returns:
+        `{"tiempos_herramientas": None}` en la primera llamada al modelo de un turno; si no, vacío
+    """
+    mensajes = estado["messages"]
+    if mensajes and mensajes[-1].type == "human" and estado.get("tiempos_herramientas"):
+        return {"tiempos_herramientas": None}
+    return {}
+
+
+class LimitadorHerramientas:
+    """
+    Envoltura `awrap_tool_call` para ToolNode.
+
+    ToolNode lanza todas las llamadas de un turno a la vez; esta envoltura deja correr como
+    máximo `max_concurrencia` por turno y espera el resto. El límite se lleva por `thread_id`
+    (la API ejecuta un turno por hilo a la vez), así que los turnos de otros usuarios no le
+    quitan plazas. El tiempo límite de cada llamada cuenta desde que se encola: una llamada que
+    lo supera, esperando o ejecutándose, se cancela y el modelo recibe un ToolMessage de error
+    en lugar de bloquear el turno. Cada llamada añade a `tiempos_herramientas` su espera, su
+    duración y cómo terminó; la lista guarda solo el turno en curso (`reiniciar_tiempos`).
+    """
+
+    def __init__(
+        self,
+        max_concurrencia: int = 4,
+        timeout: float = 30.0,
+        timeouts: Optional[Dict[str, float]] = None,
+    ):
+        """
+        Args:
+            max_concurrencia: Llamadas a herramientas simultáneas por turno como máximo
+            timeout: Segundos máximos por llamada, espera incluida (0 sin límite)
+            timeouts: Tiempo límite propio de algunas herramientas, por nombre
+        """
+        if max_concurrencia < 1:
+            raise ValueError("max_concurrencia debe ser al menos 1")
+        if timeout < 0 or any(t < 0 for t in (timeouts or {}).values()):
+            raise ValueError("Los tiempos límite no pueden ser negativos")
+
+        self.max_concurrencia = max_concurrencia
+        self.timeout = timeout
+        self.timeouts = dict(timeouts or {})
+        # thread_id -> [semáforo, llamadas que lo usan]; la entrada se borra al quedar sin uso
+        self._semaforos: Dict[Optional[str], List[Any]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _tomar_semaforo(self, hilo: Optional[str]) -> asyncio.Semaphore:
+        """Semáforo del turno en el event loop en curso (cada asyncio.run tiene los suyos)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._semaforos = {}
+            self._loop = loop
+        entrada = self._semaforos.setdefault(hilo, [asyncio.Semaphore(self.max_concurrencia), 0])
+        entrada[1] += 1
+        return entrada[0]
+
+    def _soltar_semaforo(self, hilo: Optional[str]):
+        entrada = self._semaforos[hilo]
+        entrada[1] -= 1
+        if entrada[1] == 0:
+            del self._semaforos[hilo]
+
+    async def __call__(
+        self,
+        request: ToolCallRequest,
+        execute: Callable[[ToolCallRequest], Awaitable[Any]],
+    ) -> Any:
+        llamada = request.tool_call
+        timeout = self.timeouts.get(llamada["name"], self.timeout)
+        config = getattr(request.runtime, "config", None) or {}
+        hilo = config.get("configurable", {}).get("thread_id")
+        semaforo = self._tomar_semaforo(hilo)
+
+        encolada = time.perf_counter()
+        inicio = None
+
+        async def ejecutar_con_plaza():
+            nonlocal inicio
+            async with semaforo:
+                inicio = time.perf_counter()
+                return await execute(request)
+
+        try:
+            resultado = await asyncio.wait_for(ejecutar_con_plaza(), timeout or None)
+            estado = "error" if getattr(resultado, "status", "success") == "error" else "ok"
+        except asyncio.TimeoutError:
+            resultado = ToolMessage(
+                content=f"Error: {llamada['name']} no respondió en {timeout:g} s; reintenta o acota la consulta",
+                name=llamada["name"],
+                tool_call_id=llamada["id"],
+                status="error",
+            )
+            estado = "timeout"
+        finally:
+            self._soltar_semaforo(hilo)
+        fin = time.perf_counter()
+        # Si se agotó el tiempo en la cola, toda la llamada fue espera
+        inicio = inicio or fin
+
+        tiempo = {
+            "herramienta": llamada["name"],
+            "tool_call_id": llamada["id"],
+            "espera_ms": round((inicio - encolada) * 1000, 1),
+            "duracion_ms": round((fin - inicio) * 1000, 1),
+            "estado": estado,
+        }
+        # Las herramientas que ya devuelven un Command actualizan el estado por su cuenta
+        if not isinstance(resultado, ToolMessage):
+            return resultado
+        return Command(update={"messages": [resultado], "tiempos_herramientas": [tiempo]})
+
+
+def tiempos_del_turno(estado: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Devuelve los tiempos de las herramientas llamadas desde el último mensaje del usuario.
+
+    Args:
+        estado: Estado final del grafo tras un turno
+
+    Returns:
+        Lista de tiempos en el orden en que terminaron las llamadas
+    """
+    ids = set()
+    for mensaje in reversed(estado["messages"]):
+        if mensaje.type == "human":
+            break
+        if isinstance(mensaje, ToolMessage):
+            ids.add(mensaje.tool_call_id)
+    return [t for t in estado.get("tiempos_herramientas", []) if t["tool_call_id"] in ids]
@@ -0,0 +1,450 @@
+"""
+Checkpointer de LangGraph sobre SQLite para las conversaciones del agente.
+Guarda cada hilo en disco, de modo que el historial sobrevive a reinicios y lo comparten
+varios procesos de la API, y expulsa los hilos inactivos para que el archivo no crezca sin límite.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    tipo TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    tipo_metadata TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS escrituras (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    canal TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    valor BLOB NOT NULL,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+) WITHOUT ROWID;
+
+-- Última actividad de cada hilo: decide qué hilos expulsar por inactividad o por exceso
+CREATE TABLE IF NOT EXISTS hilos (
+    thread_id TEXT PRIMARY KEY,
+    actualizado REAL NOT NULL
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_hilos_actualizado ON hilos(actualizado);
+"""
+
+
+class MemoriaSQLite(BaseCheckpointSaver):
+    """
+    Guarda los checkpoints del grafo en un archivo SQLite en modo WAL.
+
+    Las claves primarias empiezan por `thread_id`, así que leer o borrar un hilo no recorre las
+    demás conversaciones. Cada hilo conserva sus `checkpoints_por_hilo` checkpoints más recientes.
+    Los hilos sin actividad durante `ttl` segundos, o los menos recientes cuando hay más de
+    `max_hilos`, se borran en la limpieza, que corre como mucho cada `intervalo_limpieza`
+    segundos al guardar un checkpoint.
+
+    El grafo del agente usa canales completos (`MessagesState`): cada checkpoint contiene todo el
+    historial, de modo que descartar los anteriores no pierde mensajes.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        ttl: float = 7 * 24 * 3600,
+        max_hilos: int = 10_000,
+        checkpoints_por_hilo: int = 10,
+        intervalo_limpieza: float = 60.0,
+        busy_timeout_ms: int = 5000,
+    ):
+        """
+        Args:
+            db_path: Ruta del archivo SQLite; varios procesos pueden abrir el mismo
+            ttl: Segundos sin actividad tras los que se borra un hilo (0 desactiva la expiración)
+            max_hilos: Hilos que se conservan como máximo (0 sin límite)
+            checkpoints_por_hilo: Checkpoints que se conservan por hilo (0 los conserva todos)
+            intervalo_limpieza: Segundos mínimos entre dos limpiezas automáticas
+            busy_timeout_ms: Espera máxima por el bloqueo de escritura de otro proceso
+        """
+        if ttl < 0 or max_hilos < 0 or checkpoints_por_hilo < 0 or intervalo_limpieza < 0:
+            raise ValueError("ttl, max_hilos, checkpoints_por_hilo e intervalo_limpieza no pueden ser negativos")
+        super().__init__()
+
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_hilos = max_hilos
+        self.checkpoints_por_hilo = checkpoints_por_hilo
+        self.intervalo_limpieza = intervalo_limpieza
+
+        directorio = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directorio, exist_ok=True)
+        # Autocommit: cada operación abre su propia transacción con BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(ESQUEMA)
+
+        self._lock = threading.Lock()
+        self._ultima_limpieza = 0.0
+        self._metricas = {
+            "checkpoints_guardados": 0,
+            "checkpoints_descartados": 0,
+            "hilos_expirados": 0,
+            "hilos_expulsados": 0,
+            "limpiezas": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    def _tupla(self, thread_id: str, checkpoint_ns: str, fila: Tuple) -> CheckpointTuple:
+        """Construye la CheckpointTuple de una fila de checkpoints con sus escrituras pendientes"""
+        checkpoint_id, parent_id, tipo, checkpoint, tipo_metadata, metadata = fila
+        escrituras = self._conn.execute(
+            """
+            SELECT task_id, canal, tipo, valor FROM escrituras
+            WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?
+            ORDER BY task_path, task_id, idx
+            """,
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={"configurable": {
+                "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id,
+            }},
+            checkpoint=self.serde.loads_typed((tipo, checkpoint)),
+            metadata=self.serde.loads_typed((tipo_metadata, metadata)),
+            parent_config=(
+                {"configurable": {
+                    "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_id,
+                }}
+                if parent_id else None
+            ),
+            pending_writes=[
+                (task_id, canal, self.serde.loads_typed((tipo_valor, valor)))
+                for task_id, canal, tipo_valor, valor in escrituras
+            ],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """
+        Devuelve el checkpoint pedido, o el más reciente del hilo si la configuración no indica uno.
+
+        Returns:
+            CheckpointTuple con sus escrituras pendientes, o None si no existe
+        """
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columnas = "checkpoint_id, parent_checkpoint_id, tipo, checkpoint, tipo_metadata, metadata"
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                fila = self._conn.execute(
+                    f"SELECT {columnas} FROM checkpoints "
+                    "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                # Los IDs de checkpoint crecen con el tiempo: el mayor es el más reciente
+                fila = self._conn.execute(
+                    f"SELECT {columnas} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            return self._tupla(thread_id, checkpoint_ns, fila) if fila else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """
+        Recorre los checkpoints del hilo (o de todos si `config` es None), del más reciente al más antiguo.
+
+        Args:
+            config: Configuración con thread_id y, opcionalmente, checkpoint_ns y checkpoint_id
+            filter: Pares clave-valor que deben coincidir con la metadata
+            before: Solo checkpoints anteriores a este
+            limit: Número máximo de checkpoints
+        """
+        condiciones: List[str] = []
+        parametros: List[Any] = []
+        if config:
+            condiciones.append("thread_id = ?")
+            parametros.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                condiciones.append("checkpoint_ns = ?")
+                parametros.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                condiciones.append("checkpoint_id = ?")
+                parametros.append(checkpoint_id)
+        if before and (antes_de := get_checkpoint_id(before)):
+            condiciones.append("checkpoint_id < ?")
+            parametros.append(antes_de)
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+
+        with self._lock:
+            filas = self._conn.execute(
+                "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, tipo, checkpoint, "
+                f"tipo_metadata, metadata FROM checkpoints {where} ORDER BY checkpoint_id DESC",
+                parametros,
+            ).fetchall()
+
+        devueltos = 0
+        for thread_id, checkpoint_ns, *fila in filas:
+            if limit is not None and devueltos >= limit:
+                return
+            if filter:
+                metadata = self.serde.loads_typed((fila[4], fila[5]))
+                if not all(metadata.get(clave) == valor for clave, valor in filter.items()):
+                    continue
+            with self._lock:
+                tupla = self._tupla(thread_id, checkpoint_ns, tuple(fila))
+            devueltos += 1
+            yield tupla
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """
+        Guarda un checkpoint, actualiza la actividad del hilo y descarta sus checkpoints más antiguos.
+
+        Returns:
+            Configuración que apunta al checkpoint guardado
+        """
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        tipo, datos = self.serde.dumps_typed(checkpoint)
+        tipo_metadata, datos_metadata = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                        tipo, datos, tipo_metadata, datos_metadata,
+                    ),
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO hilos (thread_id, actualizado) VALUES (?, ?)",
+                    (thread_id, time.time()),
+                )
+                descartados = self._descartar_antiguos(thread_id, checkpoint_ns) if self.checkpoints_por_hilo else 0
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._metricas["checkpoints_guardados"] += 1
+            self._metricas["checkpoints_descartados"] += descartados
+
+        if time.monotonic() - self._ultima_limpieza >= self.intervalo_limpieza:
+            self.limpiar()
+
+        return {"configurable": {
+            "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"],
+        }}
+
+    def _descartar_antiguos(self, thread_id: str, checkpoint_ns: str) -> int:
+        """Borra los checkpoints del hilo que exceden `checkpoints_por_hilo`, con sus escrituras"""
+        antiguos = self._conn.execute(
+            """
+            SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?
+            ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?
+            """,
+            (thread_id, checkpoint_ns, self.checkpoints_por_hilo),
+        ).fetchall()
+        for (checkpoint_id,) in antiguos:
+            for tabla in ("checkpoints", "escrituras"):
+                self._conn.execute(
+                    f"DELETE FROM {tabla} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                )
+        return len(antiguos)
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """
+        Guarda las escrituras pendientes de una tarea asociadas a un checkpoint.
+
+        Las escrituras especiales (errores, interrupciones) reemplazan a las anteriores; las
+        normales no se sobrescriben si la tarea ya las había guardado.
+        """
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        conflicto = "REPLACE" if all(canal in WRITES_IDX_MAP for canal, _ in writes) else "IGNORE"
+        filas = [
+            (
+                thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(canal, idx),
+                canal, *self.serde.dumps_typed(valor), task_path,
+            )
+            for idx, (canal, valor) in enumerate(writes)
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(f"INSERT OR {conflicto} INTO escrituras VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", filas)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Borra todos los checkpoints y escrituras de un hilo"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._borrar_hilos([thread_id])
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _borrar_hilos(self, thread_ids: Sequence[str]):
+        """Borra los hilos indicados dentro de la transacción en curso"""
+        for tabla in ("checkpoints", "escrituras", "hilos"):
+            self._conn.executemany(f"DELETE FROM {tabla} WHERE thread_id = ?", [(t,) for t in thread_ids])
+
+    # ------------------------------------------------------------------
+    # Retención
+    # ------------------------------------------------------------------
+
+    def limpiar(self) -> Dict[str, int]:
+        """
+        Borra los hilos inactivos durante más de `ttl` segundos y, si aún quedan más de
+        `max_hilos`, los de actividad más antigua.
+
+        Returns:
+            Diccionario con los hilos expirados y expulsados en esta limpieza
+        """
+        with self._lock:
+            self._ultima_limpieza = time.monotonic()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                expirados: List[str] = []
+                if self.ttl:
+                    expirados = [t for (t,) in self._conn.execute(
+                        "SELECT thread_id FROM hilos WHERE actualizado < ?", (time.time() - self.ttl,)
+                    )]
+                    self._borrar_hilos(expirados)
+                expulsados: List[str] = []
+                if self.max_hilos:
+                    expulsados = [t for (t,) in self._conn.execute(
+                        "SELECT thread_id FROM hilos ORDER BY actualizado DESC LIMIT -1 OFFSET ?", (self.max_hilos,)
+                    )]
+                    self._borrar_hilos(expulsados)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._metricas["hilos_expirados"] += len(expirados)
+            self._metricas["hilos_expulsados"] += len(expulsados)
+            self._metricas["limpiezas"] += 1
+        return {"expirados": len(expirados), "expulsados": len(expulsados)}
+
+    def metricas(self) -> Dict[str, Any]:
+        """
+        Devuelve el tamaño de la memoria y los contadores de este proceso.
+
+        Returns:
+            Diccionario con hilos y checkpoints guardados, tamaño del archivo y contadores de retención
+        """
+        with self._lock:
+            metricas = dict(self._metricas)
+            metricas["hilos"] = self._conn.execute("SELECT COUNT(*) FROM hilos").fetchone()[0]
+            metricas["checkpoints"] = self._conn.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0]
+        metricas["tamano_bytes"] = sum(
+            os.path.getsize(self.db_path + sufijo) for sufijo in ("", "-wal") if os.path.exists(self.db_path + sufijo)
+        )
+        return metricas
+
+    def cerrar(self):
+        """Cierra la conexión; la última conexión en cerrarse integra el WAL en el archivo principal"""
+        with self._lock:
+            self._conn.close()
+
+    # ------------------------------------------------------------------
+    # Versiones asíncronas: SQLite es bloqueante, así que corren en un hilo aparte
+    # ------------------------------------------------------------------
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        tuplas = await asyncio.to_thread(
+            lambda: [*self.list(config, filter=filter, before=before, limit=limit)]
+        )
+        for tupla in tuplas:
+            yield tupla
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
@@ -0,0 +1,262 @@
+"""
+Pool de sesiones MCP persistentes para las herramientas del agente.
+Sin él, cada llamada de `MultiServerMCPClient` abre una sesión nueva (conexión HTTP más el
+handshake `initialize`) y la cierra al terminar; el pool mantiene N sesiones abiertas por servidor
+y las reutiliza, reconectando las que se caen.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import anyio
+import httpx
+from langchain_mcp_adapters.interceptors import MCPToolCallRequest
+from langchain_mcp_adapters.sessions import Connection, create_session
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED
+
+# Errores de la conexión de una sesión: la sesión no sirve y la llamada se repite en otra
+ERRORES_TRANSPORTE = (httpx.TransportError, anyio.ClosedResourceError, anyio.BrokenResourceError, ConnectionError)
+
+# Códigos de McpError que genera el propio cliente cuando la sesión se pierde: 32600 "Session
+# terminated" (el servidor ya no la reconoce, por ejemplo tras reiniciarse) y "Connection closed"
+CODIGOS_SESION_PERDIDA = {32600, CONNECTION_CLOSED}
+
+
+def fallo_de_sesion(error: BaseException) -> bool:
+    """
+    Indica si un error se debe a la sesión o a su conexión y no a la llamada.
+
+    Los errores de protocolo y de la herramienta no cuentan: la sesión sigue sirviendo y repetir
+    la llamada podría ejecutar dos veces una herramienta que escribe (por ejemplo, una ingesta).
+    """
+    if isinstance(error, McpError):
+        return error.error.code in CODIGOS_SESION_PERDIDA
+    return isinstance(error, ERRORES_TRANSPORTE)
+
+
+class _Sesion:
+    """Sesión MCP que vive en su propia tarea: los contextos de anyio deben cerrarse donde se abrieron"""
+
+    def __init__(self):
+        self.session: Any = None
+        self.tarea: Optional[asyncio.Task] = None
+        self.cerrar = asyncio.Event()
+        self.llamadas = 0
+
+    @property
+    def viva(self) -> bool:
+        return self.tarea is not None and not self.tarea.done() and not self.cerrar.is_set()
+
+
+class PoolSesionesMCP:
+    """
+    Mantiene hasta `tamano` sesiones MCP abiertas por servidor y presta una a cada llamada.
+
+    Se conecta a `MultiServerMCPClient` como interceptor de herramientas: la llamada se hace sobre
+    una sesión del pool en lugar de abrir una nueva. Como mucho `tamano` llamadas por servidor
+    están en curso a la vez; las demás esperan una sesión libre. Si la sesión falla (servidor
+    reiniciado, conexión cortada; ver `fallo_de_sesion`) se descarta solo esa sesión y la llamada
+    se repite en una sesión recién abierta hasta `reintentos` veces. Los errores de protocolo y
+    de la herramienta no descartan nada ni se reintentan: llegan al modelo como siempre. Las
+    sesiones usan un cliente HTTP que mantiene la conexión abierta `keepalive` segundos entre
+    llamadas.
+
+    Las llamadas que cambian las cabeceras HTTP (por otro interceptor) siguen usando una sesión
+    propia, porque las cabeceras se fijan al abrir la sesión.
+    """
+
+    def __init__(
+        self,
+        conexiones: Dict[str, Connection],
+        tamano: int = 4,
+        reintentos: int = 1,
+        keepalive: float = 120.0,
+    ):
+        """
+        Args:
+            conexiones: Las mismas conexiones de `MultiServerMCPClient`, por nombre de servidor
+            tamano: Sesiones abiertas como máximo por servidor
+            reintentos: Veces que se repite una llamada con una sesión nueva si la sesión falla
+            keepalive: Segundos que el cliente HTTP mantiene abierta una conexión sin uso
+        """
+        if tamano < 1 or reintentos < 0 or keepalive < 0:
+            raise ValueError("tamano debe ser al menos 1; reintentos y keepalive no pueden ser negativos")
+
+        self.tamano = tamano
+        self.reintentos = reintentos
+        self.keepalive = keepalive
+        self.conexiones = {nombre: self._con_keepalive(conexion) for nombre, conexion in conexiones.items()}
+        self._libres: Dict[str, List[_Sesion]] = {nombre: [] for nombre in conexiones}
+        self._abiertas: Dict[str, List[_Sesion]] = {nombre: [] for nombre in conexiones}
+        self._cupos: Dict[str, asyncio.Semaphore] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._metricas = {
+            "llamadas": 0,
+            "sesiones_abiertas_total": 0,
+            "reconexiones": 0,
+            "fallos_sesion": 0,
+            "espera_total_ms": 0.0,
+        }
+
+    def _con_keepalive(self, conexion: Connection) -> Connection:
+        """Añade a las conexiones HTTP un cliente que conserva la conexión TCP entre llamadas"""
+        if conexion.get("transport") not in ("streamable_http", "http", "sse") or conexion.get("httpx_client_factory"):
+            return conexion
+
+        def cliente_http(headers=None, timeout=None, auth=None) -> httpx.AsyncClient:
+            return httpx.AsyncClient(
+                headers=headers,
+                timeout=timeout or httpx.Timeout(30.0, read=300.0),
+                auth=auth,
+                limits=httpx.Limits(keepalive_expiry=self.keepalive),
+            )
+
+        return {**conexion, "httpx_client_factory": cliente_http}
+
+    def _cupo(self, servidor: str) -> asyncio.Semaphore:
+        """Semáforo del servidor en el event loop en curso"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._cupos = {nombre: asyncio.Semaphore(self.tamano) for nombre in self.conexiones}
+            self._libres = {nombre: [] for nombre in self.conexiones}
+            self._abiertas = {nombre: [] for nombre in self.conexiones}
+            self._loop = loop
+        return self._cupos[servidor]
+
+    async def _mantener(self, servidor: str, sesion: _Sesion, preparada: asyncio.Future):
+        """Cuerpo de la tarea de cada sesión: la abre, avisa y la mantiene hasta que se pida cerrarla"""
+        try:
+            async with create_session(self.conexiones[servidor]) as session:
+                await session.initialize()
+                sesion.session = session
+                preparada.set_result(None)
+                await sesion.cerrar.wait()
+        except Exception as error:
+            # Antes del handshake el error es de quien abre la sesión; después, la sesión muere
+            # y la siguiente llamada que la use reconecta
+            if not preparada.done():
+                preparada.set_exception(error)
+        finally:
+            sesion.cerrar.set()
+            if not preparada.done():
+                preparada.cancel()
+
+    async def _abrir(self, servidor: str) -> _Sesion:
+        """Abre una sesión nueva y espera al handshake"""
+        sesion = _Sesion()
+        preparada = asyncio.get_running_loop().create_future()
+        sesion.tarea = asyncio.create_task(self._mantener(servidor, sesion, preparada), name=f"mcp-{servidor}")
+        await preparada
+        self._abiertas[servidor].append(sesion)
+        self._metricas["sesiones_abiertas_total"] += 1
+        return sesion
+
+    def _descartar(self, servidor: str, sesion: _Sesion):
+        """Cierra una sesión y la saca del pool"""
+        sesion.cerrar.set()
+        if sesion in self._abiertas[servidor]:
+            self._abiertas[servidor].remove(sesion)
+
+    @asynccontextmanager
+    async def _prestar(self, servidor: str, nueva: bool = False) -> AsyncIterator[_Sesion]:
+        """
+        Presta una sesión del servidor durante el bloque `async with`.
+
+        Reutiliza una sesión libre y viva o, si no hay o se pide `nueva`, abre otra; con `tamano`
+        sesiones en uso espera a que se libere alguna.
+        """
+        if servidor not in self.conexiones:
+            raise KeyError(f"Servidor MCP desconocido: {servidor!r}")
+        cupo = self._cupo(servidor)
+        inicio = time.perf_counter()
+        async with cupo:
+            self._metricas["espera_total_ms"] += (time.perf_counter() - inicio) * 1000
+            sesion = None
+            while self._libres[servidor] and not nueva:
+                candidata = self._libres[servidor].pop()
+                if candidata.viva:
+                    sesion = candidata
+                    break
+                self._descartar(servidor, candidata)
+            if sesion is None:
+                sesion = await self._abrir(servidor)
+            try:
+                yield sesion
+            finally:
+                if sesion.viva and len(self._libres[servidor]) < self.tamano:
+                    self._libres[servidor].append(sesion)
+                else:
+                    self._descartar(servidor, sesion)
+
+    async def llamar(self, servidor: str, herramienta: str, argumentos: Dict[str, Any]) -> Any:
+        """
+        Llama a una herramienta sobre una sesión del pool, reconectando si la sesión falla.
+
+        Returns:
+            CallToolResult del servidor
+
+        Raises:
+            Exception: El error de la llamada si no es un fallo de sesión, o el de la última
+                sesión si fallan todos los intentos
+        """
+        self._metricas["llamadas"] += 1
+        for intento in range(self.reintentos + 1):
+            # Los reintentos usan una sesión nueva: las libres pueden estar igual de muertas
+            async with self._prestar(servidor, nueva=intento > 0) as sesion:
+                try:
+                    resultado = await sesion.session.call_tool(herramienta, argumentos)
+                    sesion.llamadas += 1
+                    return resultado
+                except Exception as error:
+                    if not fallo_de_sesion(error):
+                        raise
+                    self._metricas["fallos_sesion"] += 1
+                    self._descartar(servidor, sesion)
+                    if intento == self.reintentos:
+                        raise
+            self._metricas["reconexiones"] += 1
+
+    async def __call__(
+        self,
+        request: MCPToolCallRequest,
+        handler: Callable[[MCPToolCallRequest], Awaitable[Any]],
+    ) -> Any:
+        """Interceptor de `MultiServerMCPClient`: ejecuta la llamada sobre una sesión del pool"""
+        if request.headers is not None or request.server_name not in self.conexiones:
+            return await handler(request)
+        return await self.llamar(request.server_name, request.name, request.args)
+
+    async def cerrar(self):
+        """Cierra todas las sesiones y espera a que terminen sus tareas"""
+        tareas = []
+        for servidor, sesiones in self._abiertas.items():
+            for sesion in list(sesiones):
+                self._descartar(servidor, sesion)
+                tareas.append(sesion.tarea)
+            self._libres[servidor] = []
+        await asyncio.gather(*tareas, return_exceptions=True)
+
+    def metricas(self) -> Dict[str, Any]:
+        """
+        Devuelve el estado del pool y sus contadores.
+
+        Returns:
+            Diccionario con sesiones abiertas y libres por servidor, llamadas, sesiones abiertas
+            en total, reconexiones, fallos de sesión y espera media por una sesión libre
+        """
+        metricas = dict(self._metricas)
+        metricas["tamano"] = self.tamano
+        metricas["servidores"] = {
+            servidor: {
+                "abiertas": sum(1 for s in self._abiertas[servidor] if s.viva),
+                "libres": sum(1 for s in self._libres[servidor] if s.viva),
+            }
+            for servidor in self.conexiones
+        }
+        metricas["espera_promedio_ms"] = (
+            metricas["espera_total_ms"] / metricas["llamadas"] if metricas["llamadas"] else 0.0
+        )
+        return metricas
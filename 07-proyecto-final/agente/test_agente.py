@@ -4,8 +4,30 @@ Verifica servidor MCP, agente LangGraph y API REST.
 """
 
 import asyncio
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
 import httpx
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+from langchain_core.tools import StructuredTool, ToolException, tool
+from langgraph.graph import StateGraph, MessagesState
+from langgraph.prebuilt import ToolNode, tools_condition
+from mcp.shared.exceptions import McpError
+from mcp.types import ErrorData
+import api_rest
+from admision import ControlAdmision, SinCapacidad
 from agente_seguros import AgenteSeguro
+from cache_herramientas import CacheHerramientas
+from herramientas_paralelas import EstadoAgente, LimitadorHerramientas, reiniciar_tiempos, tiempos_del_turno
+from memoria_sqlite import MemoriaSQLite
+from pool_sesiones import PoolSesionesMCP
 
 
 async def test_servidor_mcp():
@@ -151,6 +173,614 @@ async def test_api_rest():
         return False
 
 
+async def test_memoria_sqlite():
+    """Test 5: Memoria de conversaciones en SQLite (no necesita servidor ni LLM)"""
+    print("\n" + "=" * 60)
+    print("Test 5: Memoria de Conversaciones en SQLite")
+    print("=" * 60)
+    
+    def eco(state: MessagesState):
+        return {"messages": [AIMessage(content=f"eco: {state['messages'][-1].content}")]}
+    
+    workflow = StateGraph(MessagesState)
+    workflow.add_node("agent", eco)
+    workflow.set_entry_point("agent")
+    
+    def config(thread_id: str):
+        return {"configurable": {"thread_id": thread_id}}
+    
+    exito = True
+    with tempfile.TemporaryDirectory() as directorio:
+        db_path = os.path.join(directorio, "memoria.db")
+        memoria = MemoriaSQLite(db_path, checkpoints_por_hilo=2)
+        graph = workflow.compile(checkpointer=memoria)
+        for mensaje in ("hola", "¿sigues ahí?", "adiós"):
+            await graph.ainvoke({"messages": [{"role": "user", "content": mensaje}]}, config("a"))
+        memoria.cerrar()
+        
+        # Un proceso nuevo (o otro trabajador de la API) abre el mismo archivo
+        memoria = MemoriaSQLite(db_path, checkpoints_por_hilo=2, max_hilos=2)
+        graph = workflow.compile(checkpointer=memoria)
+        mensajes = graph.get_state(config("a")).values["messages"]
+        if [m.content for m in mensajes[-2:]] == ["adiós", "eco: adiós"] and len(mensajes) == 6:
+            print("✅ El historial sobrevive al reinicio (6 mensajes)")
+        else:
+            print(f"❌ Historial inesperado tras reabrir: {[m.content for m in mensajes]}")
+            exito = False
+        
+        checkpoints = len(list(memoria.list(config("a"))))
+        if checkpoints == 2:
+            print("✅ Solo se conservan los 2 checkpoints más recientes del hilo")
+        else:
+            print(f"❌ Se esperaban 2 checkpoints, hay {checkpoints}")
+            exito = False
+        
+        conn = sqlite3.connect(db_path)
+        modo = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        plan = " ".join(fila[-1] for fila in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM checkpoints WHERE thread_id = 'a' AND checkpoint_ns = '' "
+            "ORDER BY checkpoint_id DESC LIMIT 1"
+        ))
+        conn.close()
+        if modo == "wal" and "USING PRIMARY KEY" in plan and "TEMP B-TREE" not in plan:
+            print("✅ WAL activo y lectura del último checkpoint por índice de thread_id")
+        else:
+            print(f"❌ journal_mode={modo}, plan: {plan}")
+            exito = False
+        
+        # Con max_hilos=2, el tercer hilo desplaza al de actividad más antigua
+        for thread_id in ("b", "c"):
+            time.sleep(0.01)
+            await graph.ainvoke({"messages": [{"role": "user", "content": "hola"}]}, config(thread_id))
+        limpieza = memoria.limpiar()
+        if limpieza["expulsados"] == 1 and graph.get_state(config("a")).values == {}:
+            print("✅ max_hilos expulsa el hilo con actividad más antigua")
+        else:
+            print(f"❌ Expulsión inesperada: {limpieza}")
+            exito = False
+        
+        memoria.ttl = 0.05
+        time.sleep(0.1)
+        limpieza = memoria.limpiar()
+        metricas = memoria.metricas()
+        if limpieza["expirados"] == 2 and metricas["hilos"] == 0 and metricas["checkpoints"] == 0:
+            print("✅ Los hilos inactivos más allá del TTL se borran con sus checkpoints")
+        else:
+            print(f"❌ Expiración inesperada: {limpieza}, {metricas}")
+            exito = False
+        memoria.cerrar()
+    
+    return exito
+
+
+async def test_herramientas_paralelas():
+    """Test 6: Llamadas a herramientas en paralelo con límite y tiempo máximo (no necesita servidor ni LLM)"""
+    print("\n" + "=" * 60)
+    print("Test 6: Herramientas en Paralelo")
+    print("=" * 60)
+    
+    @tool
+    async def consulta_lenta(segundos: float) -> str:
+        """Simula una consulta al servidor MCP que tarda `segundos`"""
+        await asyncio.sleep(segundos)
+        return f"listo en {segundos}"
+    
+    def turno(*segundos: float):
+        llamadas = [
+            {"name": "consulta_lenta", "args": {"segundos": s}, "id": f"llamada-{i}"}
+            for i, s in enumerate(segundos)
+        ]
+        return {"messages": [{"role": "user", "content": "consulta"}, AIMessage(content="", tool_calls=llamadas)]}
+    
+    async def ejecutar(limitador: LimitadorHerramientas, *segundos: float, hilo: str = "hilo-1"):
+        workflow = StateGraph(EstadoAgente)
+        workflow.add_node("tools", ToolNode([consulta_lenta], awrap_tool_call=limitador))
+        workflow.set_entry_point("tools")
+        inicio = time.perf_counter()
+        estado = await workflow.compile().ainvoke(turno(*segundos), config={"configurable": {"thread_id": hilo}})
+        return estado, time.perf_counter() - inicio
+    
+    exito = True
+    
+    # Tres llamadas de 0.3 s: en paralelo cuestan lo que la más lenta, no la suma
+    estado, duracion = await ejecutar(LimitadorHerramientas(max_concurrencia=4), 0.3, 0.3, 0.3)
+    tiempos = tiempos_del_turno(estado)
+    if duracion < 0.5 and len(tiempos) == 3 and all(t["estado"] == "ok" for t in tiempos):
+        print(f"✅ 3 llamadas de 0.3 s en {duracion:.2f} s, con su tiempo en el estado")
+    else:
+        print(f"❌ Las llamadas no corrieron en paralelo ({duracion:.2f} s): {tiempos}")
+        exito = False
+    
+    # Con concurrencia 2, la tercera espera a que termine una de las dos primeras
+    estado, duracion = await ejecutar(LimitadorHerramientas(max_concurrencia=2), 0.3, 0.3, 0.3)
+    esperas = sorted(t["espera_ms"] for t in estado["tiempos_herramientas"])
+    if 0.55 < duracion < 0.85 and esperas[-1] >= 250:
+        print(f"✅ max_concurrencia=2 deja esperando a la tercera llamada ({esperas[-1]:.0f} ms)")
+    else:
+        print(f"❌ El límite de concurrencia no se respetó ({duracion:.2f} s, esperas {esperas})")
+        exito = False
+    
+    # Una llamada colgada se corta al llegar a su tiempo límite y no retrasa el turno
+    limitador = LimitadorHerramientas(timeout=5, timeouts={"consulta_lenta": 0.2})
+    estado, duracion = await ejecutar(limitador, 0.05, 10)
+    por_id = {t["tool_call_id"]: t for t in estado["tiempos_herramientas"]}
+    mensaje = next(m for m in estado["messages"] if getattr(m, "tool_call_id", None) == "llamada-1")
+    if (
+        duracion < 1 and por_id["llamada-0"]["estado"] == "ok" and por_id["llamada-1"]["estado"] == "timeout"
+        and mensaje.status == "error"
+    ):
+        print(f"✅ La llamada que supera su tiempo límite devuelve un error al modelo ({duracion:.2f} s)")
+    else:
+        print(f"❌ Tiempo límite no aplicado ({duracion:.2f} s): {por_id}")
+        exito = False
+    
+    # El límite es por turno: dos hilos a la vez no se quitan plazas entre sí
+    limitador = LimitadorHerramientas(max_concurrencia=2)
+    inicio = time.perf_counter()
+    await asyncio.gather(ejecutar(limitador, 0.3, 0.3, hilo="a"), ejecutar(limitador, 0.3, 0.3, hilo="b"))
+    duracion = time.perf_counter() - inicio
+    if duracion < 0.5 and not limitador._semaforos:
+        print(f"✅ max_concurrencia se aplica por turno: dos hilos con 2 llamadas cada uno en {duracion:.2f} s")
+    else:
+        print(f"❌ Los turnos de hilos distintos compartieron el límite ({duracion:.2f} s)")
+        exito = False
+    
+    # El tiempo límite incluye la espera en cola: con una plaza, la segunda llamada no llega a tiempo
+    limitador = LimitadorHerramientas(max_concurrencia=1, timeouts={"consulta_lenta": 0.25})
+    estado, duracion = await ejecutar(limitador, 0.2, 0.2)
+    por_id = {t["tool_call_id"]: t for t in estado["tiempos_herramientas"]}
+    segunda = por_id["llamada-1"]
+    if duracion < 0.35 and segunda["estado"] == "timeout" and segunda["espera_ms"] >= 150:
+        print(f"✅ El tiempo límite cuenta la espera en cola ({segunda['espera_ms']:.0f} ms esperando)")
+    else:
+        print(f"❌ La espera en cola no contó para el tiempo límite ({duracion:.2f} s): {por_id}")
+        exito = False
+    
+    # Con checkpoints, `tiempos_herramientas` guarda solo el turno en curso y no crece con la conversación
+    def modelo(estado: EstadoAgente):
+        if estado["messages"][-1].type == "human":
+            turno_id = len(estado["messages"])
+            llamadas = [
+                {"name": "consulta_lenta", "args": {"segundos": 0.01}, "id": f"t{turno_id}-{i}"} for i in range(2)
+            ]
+            respuesta = AIMessage(content="", tool_calls=llamadas)
+        else:
+            respuesta = AIMessage(content="listo")
+        return {"messages": [respuesta], **reiniciar_tiempos(estado)}
+    
+    workflow = StateGraph(EstadoAgente)
+    workflow.add_node("agent", modelo)
+    workflow.add_node("tools", ToolNode([consulta_lenta], awrap_tool_call=LimitadorHerramientas()))
+    workflow.set_entry_point("agent")
+    workflow.add_conditional_edges("agent", tools_condition)
+    workflow.add_edge("tools", "agent")
+    with tempfile.TemporaryDirectory() as directorio:
+        memoria = MemoriaSQLite(os.path.join(directorio, "memoria.db"))
+        graph = workflow.compile(checkpointer=memoria)
+        for _ in range(3):
+            estado = await graph.ainvoke(
+                {"messages": [{"role": "user", "content": "consulta"}]}, {"configurable": {"thread_id": "t"}}
+            )
+        memoria.cerrar()
+    guardados = estado["tiempos_herramientas"]
+    if len(guardados) == 2 and guardados == tiempos_del_turno(estado):
+        print("✅ Tras 3 turnos el estado guarda solo los 2 tiempos del último")
+    else:
+        print(f"❌ tiempos_herramientas acumula turnos anteriores: {len(guardados)} registros")
+        exito = False
+    
+    return exito
+
+
+async def test_cache_herramientas():
+    """Test 7: Caché de resultados de herramientas en el agente (no necesita servidor ni LLM)"""
+    print("\n" + "=" * 60)
+    print("Test 7: Caché de Herramientas")
+    print("=" * 60)
+    
+    llamadas = []
+    
+    def herramienta_mcp(nombre: str) -> StructuredTool:
+        """Herramienta con la misma forma que las de MultiServerMCPClient.get_tools()"""
+        async def call_tool(runtime=None, **argumentos):
+            llamadas.append((nombre, argumentos))
+            await asyncio.sleep(0.02)  # ida y vuelta HTTP al servidor
+            if argumentos.get("poliza_id") == -1:
+                raise ToolException("Póliza no encontrada")
+            return [{"type": "text", "text": f"{nombre} {argumentos}"}], None
+        
+        return StructuredTool(
+            name=nombre,
+            description=f"Herramienta MCP {nombre}",
+            args_schema={"type": "object", "properties": {"poliza_id": {"type": "integer"}}},
+            coroutine=call_tool,
+            response_format="content_and_artifact",
+            handle_tool_error=True,
+        )
+    
+    cache = CacheHerramientas({"buscar_poliza_por_id"}, capacidad=2, ttl=0.3)
+    buscar, exportar = cache.envolver([herramienta_mcp("buscar_poliza_por_id"), herramienta_mcp("exportar_polizas")])
+    exito = True
+    
+    primera = await buscar.ainvoke({"poliza_id": 1})
+    inicio = time.perf_counter()
+    segunda = await buscar.ainvoke({"poliza_id": 1})
+    acierto_ms = (time.perf_counter() - inicio) * 1000
+    if len(llamadas) == 1 and primera == segunda and acierto_ms < 15:
+        print(f"✅ La llamada repetida sale de la caché ({acierto_ms:.2f} ms frente a 20 ms del servidor)")
+    else:
+        print(f"❌ La llamada repetida llegó al servidor ({len(llamadas)} llamadas, {acierto_ms:.2f} ms)")
+        exito = False
+    
+    await exportar.ainvoke({"poliza_id": 1})
+    await exportar.ainvoke({"poliza_id": 1})
+    if len(llamadas) == 3:
+        print("✅ Las herramientas fuera de la lista de cacheables siempre llegan al servidor")
+    else:
+        print(f"❌ Una herramienta no cacheable se cacheó ({len(llamadas)} llamadas)")
+        exito = False
+    
+    await buscar.ainvoke({"poliza_id": -1})
+    await buscar.ainvoke({"poliza_id": -1})
+    if len(llamadas) == 5:
+        print("✅ Los errores no se cachean")
+    else:
+        print(f"❌ Se cacheó un error ({len(llamadas)} llamadas)")
+        exito = False
+    
+    # Capacidad 2: la póliza 1 (la menos usada) sale al entrar la 2 y la 3
+    for poliza_id in (2, 3, 1):
+        await buscar.ainvoke({"poliza_id": poliza_id})
+    metricas = cache.metricas()
+    if len(llamadas) == 8 and metricas["expulsiones"] >= 1 and metricas["entradas"] == 2:
+        print("✅ Al superar la capacidad se expulsa la entrada menos usada")
+    else:
+        print(f"❌ Expulsión inesperada ({len(llamadas)} llamadas): {metricas}")
+        exito = False
+    
+    await asyncio.sleep(0.35)
+    await buscar.ainvoke({"poliza_id": 1})
+    metricas = cache.metricas()
+    if len(llamadas) == 9 and metricas["expiradas"] == 1:
+        print("✅ Las entradas caducan al cumplir el TTL")
+    else:
+        print(f"❌ Una entrada caducada se reutilizó ({len(llamadas)} llamadas): {metricas}")
+        exito = False
+    
+    por_herramienta = metricas["por_herramienta"]["buscar_poliza_por_id"]
+    if por_herramienta == {"aciertos": 1, "fallos": 7} and abs(metricas["tasa_aciertos"] - 1 / 8) < 1e-9:
+        print(f"✅ Métricas de aciertos por herramienta ({metricas['tasa_aciertos']:.0%} de aciertos)")
+    else:
+        print(f"❌ Métricas inesperadas: {metricas}")
+        exito = False
+    
+    return exito
+
+
+def iniciar_servidor_prueba(db_path, puerto):
+    """Lanza servidor_seguros.py en un puerto propio y espera a que acepte conexiones"""
+    directorio = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "servidor")
+    proceso = subprocess.Popen(
+        [sys.executable, "servidor_seguros.py", "--puerto", str(puerto)],
+        cwd=directorio,
+        env={**os.environ, "SEGUROS_DB_PATH": db_path},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    limite = time.monotonic() + 30
+    while time.monotonic() < limite:
+        try:
+            with socket.create_connection(("127.0.0.1", puerto), timeout=0.5):
+                return proceso
+        except OSError:
+            if proceso.poll() is not None:
+                break
+            time.sleep(0.2)
+    proceso.kill()
+    raise RuntimeError(f"El servidor de prueba no arrancó en el puerto {puerto}")
+
+
+async def test_pool_sesiones():
+    """Test 8: Pool de sesiones MCP persistentes (lanza su propio servidor, no necesita LLM)"""
+    print("\n" + "=" * 60)
+    print("Test 8: Pool de Sesiones MCP")
+    print("=" * 60)
+    
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        puerto = s.getsockname()[1]
+    directorio = tempfile.mkdtemp(prefix="test_pool_")
+    db_path = os.path.join(directorio, "seguros.db")
+    conexiones = {"seguros": {"url": f"http://127.0.0.1:{puerto}/mcp", "transport": "streamable_http"}}
+    pool = PoolSesionesMCP(conexiones, tamano=2)
+    servidor = None
+    exito = True
+    
+    try:
+        servidor = iniciar_servidor_prueba(db_path, puerto)
+        
+        resultados = await asyncio.gather(
+            *(pool.llamar("seguros", "buscar_poliza_por_id", {"poliza_id": i % 5 + 1}) for i in range(20))
+        )
+        metricas = pool.metricas()
+        if all(not r.isError for r in resultados) and metricas["sesiones_abiertas_total"] <= 2:
+            print(f"✅ 20 llamadas concurrentes reutilizan {metricas['sesiones_abiertas_total']} sesiones")
+        else:
+            print(f"❌ Se abrieron más sesiones que el tamaño del pool: {metricas}")
+            exito = False
+        
+        if metricas["servidores"]["seguros"]["abiertas"] <= 2 and metricas["espera_promedio_ms"] > 0:
+            print(f"✅ Como mucho 2 llamadas en curso; el resto espera ({metricas['espera_promedio_ms']:.1f} ms de media)")
+        else:
+            print(f"❌ El pool no limitó las llamadas simultáneas: {metricas}")
+            exito = False
+        
+        # Reiniciar el servidor invalida las sesiones abiertas: la llamada debe reconectar sola
+        servidor.terminate()
+        servidor.wait()
+        servidor = iniciar_servidor_prueba(db_path, puerto)
+        # Cada sesión muerta se descarta al fallar y su llamada se repite en una sesión nueva
+        resultados = [await pool.llamar("seguros", "buscar_poliza_por_id", {"poliza_id": i}) for i in (1, 2)]
+        metricas = pool.metricas()
+        if all(not r.isError for r in resultados) and metricas["reconexiones"] >= 1:
+            print(f"✅ Tras reiniciar el servidor las llamadas reconectan ({metricas['reconexiones']} reconexiones)")
+        else:
+            print(f"❌ Las llamadas no se recuperaron del reinicio: {metricas}")
+            exito = False
+        
+        # Un error de protocolo o de la herramienta no se reintenta (podría ejecutarla dos veces)
+        # ni vacía el pool; un error de transporte descarta solo la sesión que falló
+        libres = list(pool._libres["seguros"])
+        intentos = []
+        
+        def fallar_con(error):
+            async def call_tool(*args, **kwargs):
+                intentos.append(error)
+                raise error
+            return call_tool
+        
+        for sesion in libres:
+            sesion.session.call_tool = fallar_con(McpError(ErrorData(code=-32602, message="Argumentos inválidos")))
+        try:
+            await pool.llamar("seguros", "ingerir_polizas", {"contenido": ""})
+            rechazada = False
+        except McpError:
+            rechazada = True
+        for sesion in libres:
+            del sesion.session.call_tool
+        if rechazada and len(intentos) == 1 and pool._libres["seguros"] == libres:
+            print("✅ Un McpError de la llamada se propaga sin reintentar ni descartar sesiones")
+        else:
+            print(f"❌ McpError reintentado o sesiones descartadas: {len(intentos)} intentos, {pool.metricas()}")
+            exito = False
+        
+        rota = pool._libres["seguros"][-1]
+        rota.session.call_tool = fallar_con(httpx.ConnectError("conexión rechazada"))
+        resultado = await pool.llamar("seguros", "buscar_poliza_por_id", {"poliza_id": 3})
+        intactas = all(s.viva for s in libres if s is not rota)
+        if not resultado.isError and rota not in pool._libres["seguros"] and intactas:
+            print("✅ Un error de transporte descarta solo su sesión y la llamada se repite en otra")
+        else:
+            print(f"❌ Error de transporte mal gestionado: {pool.metricas()}")
+            exito = False
+        
+        await pool.cerrar()
+        if pool.metricas()["servidores"]["seguros"]["abiertas"] == 0:
+            print("✅ cerrar() termina todas las sesiones")
+        else:
+            print(f"❌ Quedaron sesiones abiertas tras cerrar(): {pool.metricas()}")
+            exito = False
+    
+    except Exception as e:
+        print(f"❌ Error en el pool de sesiones: {e}")
+        exito = False
+    
+    finally:
+        await pool.cerrar()
+        if servidor is not None:
+            servidor.terminate()
+            servidor.wait()
+    
+    return exito
+
+
+class ModeloFalso(GenericFakeChatModel):
+    """Modelo de chat con respuestas fijas que emite por fragmentos también las llamadas a herramientas"""
+    
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        mensaje = self._generate(messages, stop=stop).generations[0].message
+        if mensaje.tool_calls:
+            fragmentos = [AIMessageChunk(
+                content="",
+                tool_call_chunks=[
+                    {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+                    for i, c in enumerate(mensaje.tool_calls)
+                ],
+            )]
+        else:
+            fragmentos = [AIMessageChunk(content=palabra) for palabra in mensaje.content.split(" ")]
+            for fragmento in fragmentos[:-1]:
+                fragmento.content += " "
+        # Como Gemini, el uso de tokens llega en el último fragmento
+        fragmentos[-1].usage_metadata = mensaje.usage_metadata
+        for fragmento in fragmentos:
+            fragmento.id = mensaje.id
+            yield ChatGenerationChunk(message=fragmento)
+
+
+async def test_chat_stream():
+    """Test 9: Respuesta por streaming con eventos de tokens y herramientas (no necesita servidor ni LLM)"""
+    print("\n" + "=" * 60)
+    print("Test 9: Chat por Streaming (SSE)")
+    print("=" * 60)
+    
+    @tool
+    async def buscar_poliza_por_id(poliza_id: int) -> str:
+        """Busca una póliza por su ID"""
+        await asyncio.sleep(0.05)
+        return f"Póliza {poliza_id}: Vida, activa"
+    
+    def respuestas():
+        uso = {"input_tokens": 100, "output_tokens": 10, "total_tokens": 110}
+        return iter([
+            AIMessage(
+                content="",
+                tool_calls=[{"name": "buscar_poliza_por_id", "args": {"poliza_id": 7}, "id": "llamada-1"}],
+                usage_metadata=uso,
+            ),
+            AIMessage(content="La póliza 7 es de Vida y está activa.", usage_metadata=uso),
+        ])
+    
+    agente = AgenteSeguro(memoria_db=None)
+    agente.tools = [buscar_poliza_por_id]
+    agente.llm = ModeloFalso(messages=respuestas())
+    await agente._setup_graph()
+    agente._initialized = True
+    exito = True
+    
+    eventos = [e async for e in agente.chat_stream("¿Qué es la póliza 7?", "test_stream")]
+    tipos = [tipo for tipo, _ in eventos]
+    fin = eventos[-1][1]
+    tokens = "".join(datos["text"] for tipo, datos in eventos if tipo == "token")
+    if (
+        tipos.index("tool_start") < tipos.index("tool_end") < tipos.index("token")
+        and tipos[-1] == "end" and tokens == fin["response"] == "La póliza 7 es de Vida y está activa."
+    ):
+        print(f"✅ Eventos en orden: herramienta, {tipos.count('token')} tokens y fin")
+    else:
+        print(f"❌ Eventos inesperados: {tipos}")
+        exito = False
+    
+    if (
+        fin["usage"] == {"input_tokens": 200, "output_tokens": 20, "total_tokens": 220}
+        and fin["first_token_ms"] is not None and fin["first_token_ms"] <= fin["duration_ms"]
+        and [t["herramienta"] for t in fin["tools_used"]] == ["buscar_poliza_por_id"]
+    ):
+        print(f"✅ El evento final suma el uso de tokens del turno (primer token a los {fin['first_token_ms']} ms)")
+    else:
+        print(f"❌ Evento final inesperado: {fin}")
+        exito = False
+    
+    # El endpoint SSE sobre el mismo agente, sin arrancar uvicorn
+    agente.llm = ModeloFalso(messages=respuestas())
+    await agente._setup_graph()
+    api_rest.agente = agente
+    try:
+        transporte = httpx.ASGITransport(app=api_rest.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://api") as client:
+            async with client.stream(
+                "POST", "/chat/stream", json={"message": "¿Qué es la póliza 7?", "thread_id": "test_sse"}
+            ) as response:
+                cuerpo = "".join([texto async for texto in response.aiter_text()])
+        sse = [bloque.split("\n") for bloque in cuerpo.strip().split("\n\n")]
+        nombres = [lineas[0].removeprefix("event: ") for lineas in sse]
+        final = json.loads(sse[-1][1].removeprefix("data: "))
+        if (
+            response.headers["content-type"].startswith("text/event-stream")
+            and nombres[0] == "tool_start" and nombres[-1] == "end"
+            and final["thread_id"] == "test_sse" and final["response"] == tokens
+        ):
+            print(f"✅ POST /chat/stream emite {len(sse)} eventos SSE")
+        else:
+            print(f"❌ Respuesta SSE inesperada: {nombres}")
+            exito = False
+    finally:
+        api_rest.agente = None
+    
+    return exito
+
+
+async def test_control_admision():
+    """Test 10: Control de admisión de la API: límite, cola, rechazos y un turno por hilo (no necesita servidor ni LLM)"""
+    print("\n" + "=" * 60)
+    print("Test 10: Control de Admisión")
+    print("=" * 60)
+    
+    en_curso = []
+    maximo = 0
+    
+    async def turno(control, thread_id, segundos=0.2):
+        nonlocal maximo
+        async with control.admitir(thread_id):
+            en_curso.append(thread_id)
+            maximo = max(maximo, len(en_curso))
+            await asyncio.sleep(segundos)
+            en_curso.remove(thread_id)
+        return "ok"
+    
+    async def intentar(control, thread_id, segundos=0.2):
+        try:
+            return await turno(control, thread_id, segundos)
+        except SinCapacidad as e:
+            return e
+    
+    exito = True
+    
+    # 2 plazas y 2 en cola: de 6 peticiones simultáneas, 4 se atienden y 2 se rechazan con 429
+    control = ControlAdmision(max_en_curso=2, max_cola=2, espera_maxima=5)
+    resultados = await asyncio.gather(*(intentar(control, f"hilo-{i}") for i in range(6)))
+    rechazos = [r for r in resultados if isinstance(r, SinCapacidad)]
+    if (
+        resultados.count("ok") == 4 and maximo == 2 and len(rechazos) == 2
+        and all(r.status_code == 429 and r.retry_after >= 1 for r in rechazos)
+    ):
+        print(f"✅ Como mucho 2 turnos a la vez; con la cola llena, 429 con Retry-After {rechazos[0].retry_after} s")
+    else:
+        print(f"❌ Admisión inesperada (máximo {maximo} a la vez): {resultados}")
+        exito = False
+    
+    # La espera máxima corta la cola con 503
+    control = ControlAdmision(max_en_curso=1, max_cola=5, espera_maxima=0.1)
+    resultados = await asyncio.gather(intentar(control, "lento", 0.5), intentar(control, "otro"))
+    if resultados[0] == "ok" and isinstance(resultados[1], SinCapacidad) and resultados[1].status_code == 503:
+        print("✅ Una petición que espera más de espera_maxima se rechaza con 503")
+    else:
+        print(f"❌ La espera máxima no se aplicó: {resultados}")
+        exito = False
+    
+    # Dos turnos del mismo hilo no se solapan aunque haya plazas libres
+    control = ControlAdmision(max_en_curso=4, max_cola=4, espera_maxima=5)
+    maximo = 0
+    inicio = time.perf_counter()
+    await asyncio.gather(turno(control, "mismo"), turno(control, "mismo"), turno(control, "distinto"))
+    duracion = time.perf_counter() - inicio
+    metricas = control.metricas()
+    if 0.35 < duracion < 0.6 and maximo == 2 and metricas["en_curso"] == 0 and not control._hilos:
+        print(f"✅ Los turnos de un mismo thread_id se ejecutan de uno en uno ({duracion:.2f} s)")
+    else:
+        print(f"❌ Turnos del mismo hilo solapados ({duracion:.2f} s, máximo {maximo}): {metricas}")
+        exito = False
+    
+    # La API traduce los rechazos en códigos HTTP con Retry-After
+    class AgenteLento:
+        async def chat_con_herramientas(self, message, thread_id):
+            await asyncio.sleep(0.3)
+            return "respuesta", []
+    
+    admision_original = api_rest.admision
+    api_rest.agente = AgenteLento()
+    api_rest.admision = ControlAdmision(max_en_curso=1, max_cola=0, espera_maxima=5)
+    try:
+        transporte = httpx.ASGITransport(app=api_rest.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://api") as client:
+            respuestas = await asyncio.gather(
+                client.post("/chat", json={"message": "hola", "thread_id": "a"}),
+                client.post("/chat", json={"message": "hola", "thread_id": "b"}),
+            )
+        codigos = sorted(r.status_code for r in respuestas)
+        rechazada = next((r for r in respuestas if r.status_code == 429), None)
+        if codigos == [200, 429] and rechazada.headers.get("retry-after"):
+            print(f"✅ POST /chat saturado responde 429 con Retry-After: {rechazada.headers['retry-after']}")
+        else:
+            print(f"❌ Respuestas inesperadas de la API saturada: {codigos}")
+            exito = False
+    finally:
+        api_rest.agente = None
+        api_rest.admision = admision_original
+    
+    return exito
+
+
 async def run_all_tests():
     """Ejecuta todos los tests"""
     print("\n" + "=" * 60)
@@ -166,9 +796,23 @@ async def run_all_tests():
         "servidor_mcp": False,
         "agente_init": False,
         "agente_queries": False,
-        "api_rest": False
+        "api_rest": False,
+        "memoria_sqlite": False,
+        "herramientas_paralelas": False,
+        "cache_herramientas": False,
+        "pool_sesiones": False,
+        "chat_stream": False,
+        "control_admision": False
     }
     
+    # Tests 5 a 10: no dependen de los servidores
+    resultados["memoria_sqlite"] = await test_memoria_sqlite()
+    resultados["herramientas_paralelas"] = await test_herramientas_paralelas()
+    resultados["cache_herramientas"] = await test_cache_herramientas()
+    resultados["pool_sesiones"] = await test_pool_sesiones()
+    resultados["chat_stream"] = await test_chat_stream()
+    resultados["control_admision"] = await test_control_admision()
+    
     # Test 1: Servidor MCP
     resultados["servidor_mcp"] = await test_servidor_mcp()
     
@@ -0,0 +1,190 @@
+"""
+Benchmark de lectores concurrentes con un escritor activo sobre seguros.db.
+Compara el throughput de lectura de cada perfil de almacenamiento (rollback journal vs WAL) y,
+con `--lecturas`, leyendo el original o una réplica (copia en archivo o en memoria).
+
+Uso:
+    python bench_almacenamiento.py --lectores 4 --duracion 5 --perfiles clasico wal rendimiento
+    python bench_almacenamiento.py --perfiles clasico wal --lecturas directo archivo memoria --intervalo 1
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "servidor"))
+
+from almacenamiento import PERFILES, PerfilAlmacenamiento  # noqa: E402
+from pool_conexiones import PoolConexiones  # noqa: E402
+from replica_lectura import MODOS_REPLICA, ReplicaLectura  # noqa: E402
+from generar_datos import generar  # noqa: E402
+
+CONSULTA_LECTURA = """
+    SELECT p.id, p.numero_poliza, c.nombre, c.email, ps.nombre, ps.tipo,
+           p.prima_mensual, p.monto_cobertura, p.estado
+    FROM polizas p
+    JOIN clientes c ON p.cliente_id = c.id
+    JOIN productos_seguros ps ON p.producto_id = ps.id
+    WHERE p.id = ?
+"""
+
+INSERT_POLIZA = """
+    INSERT INTO polizas (numero_poliza, cliente_id, producto_id, fecha_inicio,
+                         fecha_vencimiento, prima_mensual, monto_cobertura, estado)
+    VALUES (?, ?, ?, '2024-01-01', '2025-01-01', ?, ?, 'Activa')
+"""
+
+
+def ejecutar_perfil(
+    perfil: PerfilAlmacenamiento,
+    lectores: int,
+    duracion: float,
+    polizas: int,
+    lectura: str = "directo",
+    intervalo: float = 1.0,
+) -> Dict[str, Any]:
+    """
+    Mide lecturas por segundo con `lectores` hilos mientras un hilo escribe sin pausa.
+
+    Con `lectura` "archivo" o "memoria" los lectores usan una ReplicaLectura renovada cada
+    `intervalo` segundos y se registra el desfase máximo observado.
+    """
+    directorio = tempfile.mkdtemp(prefix="bench_seguros_")
+    db_path = os.path.join(directorio, "seguros.db")
+    generar(db_path, clientes=polizas // 10, polizas=polizas)
+
+    conn_escritura = sqlite3.connect(db_path, check_same_thread=False)
+    perfil.aplicar(conn_escritura)
+    max_id = conn_escritura.execute("SELECT MAX(id) FROM polizas").fetchone()[0]
+
+    if lectura == "directo":
+        pool = PoolConexiones(db_path, tamano=lectores, pragmas=perfil.pragmas_conexion())
+    else:
+        pool = ReplicaLectura(
+            db_path, modo=lectura, intervalo=intervalo, tamano=lectores, pragmas=perfil.pragmas_conexion()
+        )
+        pool.refrescar()
+    detener = threading.Event()
+    desfase_max = [0.0]
+    latencias_ms = [[] for _ in range(lectores)]
+    errores = [0] * lectores
+    commits = [0]
+
+    def escritor():
+        secuencia = 0
+        while not detener.is_set():
+            try:
+                conn_escritura.executemany(
+                    INSERT_POLIZA,
+                    [
+                        (f"W-{secuencia}-{i}", random.randint(1, 6), random.randint(1, 8), 90.0, 40000.0)
+                        for i in range(50)
+                    ],
+                )
+                conn_escritura.commit()
+                commits[0] += 1
+            except sqlite3.OperationalError:
+                conn_escritura.rollback()
+            secuencia += 1
+
+    def lector(indice: int):
+        rng = random.Random(indice)
+        while not detener.is_set():
+            inicio = time.perf_counter()
+            try:
+                with pool.conexion() as conn:
+                    conn.execute(CONSULTA_LECTURA, (rng.randint(1, max_id),)).fetchone()
+                latencias_ms[indice].append((time.perf_counter() - inicio) * 1000)
+            except sqlite3.OperationalError:
+                errores[indice] += 1
+
+    def vigilar_desfase():
+        while not detener.wait(0.05):
+            desfase_max[0] = max(desfase_max[0], pool.metricas_replica()["desfase_s"])
+
+    hilos = [threading.Thread(target=escritor)]
+    hilos += [threading.Thread(target=lector, args=(i,)) for i in range(lectores)]
+    if lectura != "directo":
+        hilos.append(threading.Thread(target=vigilar_desfase))
+    for hilo in hilos:
+        hilo.start()
+    time.sleep(duracion)
+    detener.set()
+    for hilo in hilos:
+        hilo.join()
+
+    copias = pool.metricas_replica()["copias"] if lectura != "directo" else 0
+    pool.cerrar()
+    conn_escritura.close()
+    shutil.rmtree(directorio, ignore_errors=True)
+
+    todas = sorted(l for lista in latencias_ms for l in lista)
+    return {
+        "perfil": perfil.nombre,
+        "journal_mode": perfil.journal_mode,
+        "lectura": lectura,
+        "lecturas": len(todas),
+        "lecturas_por_segundo": len(todas) / duracion,
+        "p50_ms": statistics.median(todas) if todas else None,
+        "p99_ms": todas[int(len(todas) * 0.99) - 1] if todas else None,
+        "errores_lectura": sum(errores),
+        "commits_escritor": commits[0],
+        "copias_replica": copias,
+        "desfase_max_s": round(desfase_max[0], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--perfiles", nargs="+", default=list(PERFILES), choices=list(PERFILES))
+    parser.add_argument(
+        "--lecturas", nargs="+", default=["directo"], choices=["directo", *MODOS_REPLICA],
+        help="Leer el original o una réplica en archivo o en memoria",
+    )
+    parser.add_argument("--intervalo", type=float, default=1.0, help="Segundos entre renovaciones de la réplica")
+    parser.add_argument("--lectores", type=int, default=4)
+    parser.add_argument("--duracion", type=float, default=5.0, help="Segundos por perfil")
+    parser.add_argument("--polizas", type=int, default=50000, help="Pólizas sintéticas iniciales")
+    parser.add_argument("--json", help="Ruta donde guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Benchmark - Lectores concurrentes con un escritor activo")
+    print("=" * 60 + "\n")
+
+    resultados = []
+    for nombre in args.perfiles:
+        for lectura in args.lecturas:
+            resultado = ejecutar_perfil(
+                PERFILES[nombre], args.lectores, args.duracion, args.polizas, lectura, args.intervalo
+            )
+            resultados.append(resultado)
+
+    print(
+        f"\n{'Perfil':<12} {'Lectura':<8} {'Lect/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'Errores':>8} "
+        f"{'Commits':>8} {'Copias':>7} {'Desfase':>8}"
+    )
+    for r in resultados:
+        print(
+            f"{r['perfil']:<12} {r['lectura']:<8} {r['lecturas_por_segundo']:>10.0f} {r['p50_ms'] or 0:>8.3f} "
+            f"{r['p99_ms'] or 0:>8.3f} {r['errores_lectura']:>8} {r['commits_escritor']:>8} "
+            f"{r['copias_replica']:>7} {r['desfase_max_s']:>7.2f}s"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2)
+        print(f"\n📁 Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Benchmark de arranque en frío de los servidores MCP del curso.
+Lanza cada servidor por stdio, como lo hace un agente en cada sesión, y mide desde que se crea
+el proceso hasta la respuesta a `initialize`, a `tools/list` y a la primera llamada. Con
+`--perfil` añade el desglose del tiempo de importación por paquete (`python -X importtime`).
+
+Uso:
+    python bench_arranque.py --repeticiones 5 --perfil
+    python bench_arranque.py --servidores servidor_seguros servidor_seguros_diferido --sin-cache-version
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from bench_herramientas import DIR_SERVIDOR
+
+RAIZ = os.path.abspath(os.path.join(DIR_SERVIDOR, "..", ".."))
+
+# Nombre -> directorio, argumentos del script, variables de entorno y primera petición (método, parámetros)
+SERVIDORES: Dict[str, Dict[str, Any]] = {
+    "ejemplo_simple": {
+        "directorio": "01-fundamentos",
+        "argumentos": ["ejemplo_simple.py"],
+        "primera": ("tools/call", {"name": "celsius_to_fahrenheit", "arguments": {"celsius": 21.5}}),
+    },
+    "servidor_math": {
+        "directorio": "02-fastmcp-basico",
+        "argumentos": ["servidor_math.py"],
+        "primera": ("tools/call", {"name": "add", "arguments": {"a": 1, "b": 2}}),
+    },
+    "servidor_texto": {
+        "directorio": "03-herramientas-avanzadas",
+        "argumentos": ["servidor_texto.py"],
+        "primera": ("tools/call", {"name": "analizar_texto", "arguments": {"texto": "Hola mundo. Adiós."}}),
+    },
+    "servidor_validaciones": {
+        "directorio": "03-herramientas-avanzadas",
+        "argumentos": ["servidor_validaciones.py"],
+        "primera": ("tools/call", {"name": "validar_email", "arguments": {"email": "ana@example.com"}}),
+    },
+    "servidor_recursos": {
+        "directorio": "04-recursos-prompts",
+        "argumentos": ["servidor_recursos.py"],
+        "primera": ("resources/read", {"uri": "info://version"}),
+    },
+    "servidor_prompts": {
+        "directorio": "04-recursos-prompts",
+        "argumentos": ["servidor_prompts.py"],
+        "primera": ("prompts/get", {"name": "explicar_codigo", "arguments": {"codigo": "print(1)"}}),
+    },
+    "servidor_seguros": {
+        "directorio": "07-proyecto-final/servidor",
+        "argumentos": ["servidor_seguros.py", "--transporte", "stdio"],
+        "primera": ("tools/call", {"name": "buscar_poliza_por_id", "arguments": {"poliza_id": 1}}),
+    },
+    "servidor_seguros_diferido": {
+        "directorio": "07-proyecto-final/servidor",
+        "argumentos": ["servidor_seguros.py", "--transporte", "stdio"],
+        "entorno": {"SEGUROS_INICIO_DIFERIDO": "1"},
+        "primera": ("tools/call", {"name": "buscar_poliza_por_id", "arguments": {"poliza_id": 1}}),
+    },
+}
+
+# Servidores que solo sirven por HTTP: se incluyen en el perfil de importación, no en el arranque por stdio
+SOLO_PERFIL = {
+    "servidor_db": "05-base-datos",
+    "servidor_math_http": "06-langchain-integration",
+}
+
+FASES = ("initialize_ms", "tools_list_ms", "primera_llamada_ms")
+
+
+async def _respuesta(proceso: asyncio.subprocess.Process, identificador: int) -> Dict[str, Any]:
+    """Lee mensajes hasta la respuesta con ese id; las notificaciones intermedias se descartan"""
+    while True:
+        linea = await proceso.stdout.readline()
+        if not linea:
+            raise RuntimeError("El servidor cerró stdout antes de responder")
+        mensaje = json.loads(linea)
+        if mensaje.get("id") == identificador:
+            if "error" in mensaje:
+                raise RuntimeError(f"Error del servidor: {mensaje['error']}")
+            return mensaje
+
+
+async def medir_arranque(servidor: Dict[str, Any], entorno: Dict[str, str]) -> Dict[str, float]:
+    """Lanza el servidor por stdio y mide cada fase desde la creación del proceso"""
+    def enviar(mensaje: Dict[str, Any]):
+        proceso.stdin.write((json.dumps(mensaje) + "\n").encode())
+
+    inicio = time.perf_counter()
+    proceso = await asyncio.create_subprocess_exec(
+        sys.executable, *servidor["argumentos"],
+        cwd=os.path.join(RAIZ, servidor["directorio"]),
+        env={**entorno, **servidor.get("entorno", {})},
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    tiempos: Dict[str, float] = {}
+    try:
+        metodo, parametros = servidor["primera"]
+        peticiones: List[Tuple[str, str, Optional[Dict[str, Any]]]] = [
+            ("initialize_ms", "initialize", {
+                "protocolVersion": "2025-06-18",
+                "capabilities": {},
+                "clientInfo": {"name": "bench_arranque", "version": "1.0"},
+            }),
+            ("tools_list_ms", "tools/list", None),
+            ("primera_llamada_ms", metodo, parametros),
+        ]
+        for identificador, (fase, metodo, parametros) in enumerate(peticiones, 1):
+            mensaje: Dict[str, Any] = {"jsonrpc": "2.0", "id": identificador, "method": metodo}
+            if parametros is not None:
+                mensaje["params"] = parametros
+            enviar(mensaje)
+            await proceso.stdin.drain()
+            await _respuesta(proceso, identificador)
+            tiempos[fase] = (time.perf_counter() - inicio) * 1000
+            if metodo == "initialize":
+                enviar({"jsonrpc": "2.0", "method": "notifications/initialized"})
+    finally:
+        proceso.stdin.close()
+        try:
+            await asyncio.wait_for(proceso.wait(), timeout=10)
+        except asyncio.TimeoutError:
+            proceso.kill()
+            await proceso.wait()
+    return tiempos
+
+
+def perfil_importacion(directorio: str, modulo: str, entorno: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Desglosa el tiempo de importación de un módulo por paquete de primer nivel.
+
+    Returns:
+        Diccionario con total_ms, proyecto_ms (módulos del propio directorio) y paquetes (ms por paquete)
+    """
+    ruta = os.path.join(RAIZ, directorio)
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=ruta, env=entorno, capture_output=True, text=True, check=True,
+    )
+    locales = {nombre[:-3] for nombre in os.listdir(ruta) if nombre.endswith(".py")}
+    paquetes: Dict[str, float] = defaultdict(float)
+    total_ms = 0.0
+    for linea in resultado.stderr.splitlines():
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        propio, acumulado, nombre = (parte.strip() for parte in linea[len("import time:"):].split("|"))
+        paquete = nombre.split(".")[0]
+        paquetes["(proyecto)" if paquete in locales else paquete] += int(propio) / 1000
+        # Las líneas sin sangría son importaciones de primer nivel: su acumulado suma el total
+        if not linea.split("|")[2].startswith("  "):
+            total_ms += int(acumulado) / 1000
+    ordenados = dict(sorted(paquetes.items(), key=lambda par: par[1], reverse=True))
+    return {
+        "total_ms": round(total_ms, 1),
+        "proyecto_ms": round(paquetes.get("(proyecto)", 0.0), 1),
+        "paquetes": {nombre: round(ms, 1) for nombre, ms in ordenados.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--servidores", nargs="+", choices=list(SERVIDORES), default=list(SERVIDORES))
+    parser.add_argument("--repeticiones", type=int, default=5, help="Arranques por servidor (se informa la mediana)")
+    parser.add_argument("--perfil", action="store_true", help="Incluye el desglose de importación por paquete")
+    parser.add_argument("--paquetes", type=int, default=8, help="Paquetes a mostrar en el perfil")
+    parser.add_argument(
+        "--sin-cache-version", action="store_true",
+        help="Cada arranque usa un FASTMCP_HOME vacío, como un contenedor nuevo: el banner consulta PyPI",
+    )
+    parser.add_argument("--json", help="Ruta donde guardar los resultados")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Benchmark - Arranque en Frío de los Servidores MCP")
+    print("=" * 60)
+    print(f"\n📊 {args.repeticiones} arranques por servidor, mediana por fase\n")
+
+    resultados: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory(prefix="bench_arranque_") as directorio:
+        # Base de datos de ejemplo ya inicializada: el arranque habitual, sin migraciones pendientes
+        db_path = os.path.join(directorio, "seguros.db")
+        entorno = {**os.environ, "SEGUROS_DB_PATH": db_path, "SEGUROS_CACHE_TTL": "0"}
+        subprocess.run(
+            [sys.executable, "-c", "from servidor_seguros import init_database; init_database()"],
+            cwd=DIR_SERVIDOR, env=entorno, stdout=subprocess.DEVNULL, check=True,
+        )
+
+        for nombre in args.servidores:
+            medidas: Dict[str, List[float]] = defaultdict(list)
+            for _ in range(args.repeticiones):
+                entorno_arranque = dict(entorno)
+                if args.sin_cache_version:
+                    entorno_arranque["FASTMCP_HOME"] = tempfile.mkdtemp(dir=directorio)
+                for fase, ms in asyncio.run(medir_arranque(SERVIDORES[nombre], entorno_arranque)).items():
+                    medidas[fase].append(ms)
+                if args.sin_cache_version:
+                    shutil.rmtree(entorno_arranque["FASTMCP_HOME"], ignore_errors=True)
+            resultados[nombre] = {fase: round(statistics.median(medidas[fase]), 1) for fase in FASES}
+            print(f"   {nombre}: {resultados[nombre]}")
+
+        print(f"\n{'Servidor':<26} {'initialize':>11} {'tools/list':>11} {'1ª llamada':>11}")
+        for nombre, medida in resultados.items():
+            print(
+                f"{nombre:<26} {medida['initialize_ms']:>9.0f}ms {medida['tools_list_ms']:>9.0f}ms "
+                f"{medida['primera_llamada_ms']:>9.0f}ms"
+            )
+
+        if args.perfil:
+            print("\n📋 Tiempo de importación por paquete (python -X importtime)\n")
+            modulos = [
+                (nombre, SERVIDORES[nombre]["directorio"], SERVIDORES[nombre]["argumentos"][0][:-3])
+                for nombre in args.servidores
+            ]
+            modulos += [(nombre, carpeta, nombre) for nombre, carpeta in SOLO_PERFIL.items()]
+            vistos = set()
+            for nombre, carpeta, modulo in modulos:
+                # Las variantes de un mismo servidor (por ejemplo, el modo diferido) importan lo mismo
+                if modulo in vistos:
+                    continue
+                vistos.add(modulo)
+                perfil = perfil_importacion(carpeta, modulo, entorno)
+                resultados.setdefault(nombre, {})["importacion"] = perfil
+                principales = ", ".join(
+                    f"{paquete} {ms:.0f}ms" for paquete, ms in list(perfil["paquetes"].items())[: args.paquetes]
+                )
+                print(f"   {modulo}: {perfil['total_ms']:.0f}ms (proyecto {perfil['proyecto_ms']:.0f}ms)")
+                print(f"      {principales}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"sin_cache_version": args.sin_cache_version, "resultados": resultados}, f, indent=2)
+        print(f"\n📁 Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Prueba de carga: latencia de consultas rápidas mientras otras consultas lentas están en curso.
+Arranca el servidor sobre streamable-http en modo bloqueante (SEGUROS_HILOS_BD=0, SQLite en el
+event loop) y con el ejecutor de base de datos, y compara cómo escala con clientes concurrentes.
+
+Uso:
+    python bench_concurrencia.py --concurrencias 1 4 16 --lentas 4 --duracion 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from bench_herramientas import DIR_SERVIDOR, iniciar_servidor_http, percentil, puerto_libre
+
+from fastmcp import Client
+
+# Consulta rápida (búsqueda por clave primaria) y consulta lenta (ranking FTS5 de un prefijo muy común)
+HERRAMIENTA_RAPIDA = "buscar_cliente_por_id"
+HERRAMIENTA_LENTA = "buscar_clientes_texto"
+ARGUMENTOS_LENTA = {"texto": "a", "limite": 20}
+
+
+async def medir(url: str, concurrencia: int, lentas: int, duracion: float, clientes: int) -> Dict[str, Any]:
+    """Lanza `concurrencia` clientes rápidos y `lentas` clientes lentos durante `duracion` segundos"""
+    latencias_ms: List[float] = []
+    completadas_lentas = 0
+    errores = 0
+    fin = time.monotonic() + duracion
+
+    async def cliente_rapido(indice: int):
+        nonlocal errores
+        rng = random.Random(indice)
+        async with Client(url) as client:
+            while time.monotonic() < fin:
+                inicio = time.perf_counter()
+                try:
+                    await client.call_tool(HERRAMIENTA_RAPIDA, {"cliente_id": rng.randint(1, clientes)})
+                    latencias_ms.append((time.perf_counter() - inicio) * 1000)
+                except Exception:
+                    errores += 1
+
+    async def cliente_lento():
+        nonlocal completadas_lentas, errores
+        async with Client(url) as client:
+            while time.monotonic() < fin:
+                try:
+                    await client.call_tool(HERRAMIENTA_LENTA, ARGUMENTOS_LENTA)
+                    completadas_lentas += 1
+                except Exception:
+                    errores += 1
+
+    await asyncio.gather(
+        *(cliente_rapido(i) for i in range(concurrencia)),
+        *(cliente_lento() for _ in range(lentas)),
+    )
+    return {
+        "rapidas_rps": round(len(latencias_ms) / duracion, 1),
+        "lentas_rps": round(completadas_lentas / duracion, 1),
+        "p50_ms": round(percentil(latencias_ms, 50), 3),
+        "p95_ms": round(percentil(latencias_ms, 95), 3),
+        "errores": errores,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrencias", type=int, nargs="+", default=[1, 4, 16], help="Clientes rápidos simultáneos")
+    parser.add_argument("--lentas", type=int, default=4, help="Clientes lanzando consultas lentas a la vez")
+    parser.add_argument("--duracion", type=float, default=5.0, help="Segundos por medición")
+    parser.add_argument("--hilos", type=int, default=5, help="Hilos del ejecutor de base de datos")
+    parser.add_argument("--clientes", type=int, default=20_000, help="Clientes del dataset sintético")
+    parser.add_argument("--polizas", type=int, default=100_000, help="Pólizas del dataset sintético")
+    parser.add_argument("--json", help="Ruta donde guardar los resultados")
+    args = parser.parse_args()
+
+    sys.path.insert(0, DIR_SERVIDOR)
+    from generar_datos import generar
+
+    print("=" * 60)
+    print("Prueba de Carga - Consultas Concurrentes")
+    print("=" * 60 + "\n")
+
+    modos = {"bloqueante": 0, "ejecutor": args.hilos}
+    resultados: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory(prefix="bench_concurrencia_") as directorio:
+        db_path = os.path.join(directorio, "seguros.db")
+        generar(db_path, args.clientes, args.polizas)
+
+        print(f"\n{HERRAMIENTA_RAPIDA} con {args.lentas} clientes lanzando {HERRAMIENTA_LENTA} en paralelo\n")
+        print(f"{'Modo':<12} {'Clientes':>8} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'lentas/s':>9} {'errores':>8}")
+        for modo, hilos in modos.items():
+            puerto = puerto_libre()
+            # Sin caché, para que cada llamada llegue a SQLite
+            proceso = iniciar_servidor_http(
+                db_path, puerto, {"SEGUROS_HILOS_BD": str(hilos), "SEGUROS_CACHE_TTL": "0"}
+            )
+            try:
+                resultados[modo] = {}
+                for concurrencia in args.concurrencias:
+                    medida = await medir(
+                        f"http://127.0.0.1:{puerto}/mcp", concurrencia, args.lentas, args.duracion, args.clientes
+                    )
+                    resultados[modo][str(concurrencia)] = medida
+                    print(
+                        f"{modo:<12} {concurrencia:>8} {medida['rapidas_rps']:>8.1f} {medida['p50_ms']:>9.2f} "
+                        f"{medida['p95_ms']:>9.2f} {medida['lentas_rps']:>9.1f} {medida['errores']:>8}"
+                    )
+            finally:
+                proceso.terminate()
+                proceso.wait(timeout=10)
+
+    mayor = str(max(args.concurrencias))
+    base, nuevo = resultados["bloqueante"][mayor], resultados["ejecutor"][mayor]
+    if base["p95_ms"]:
+        print(
+            f"\n📊 Con {mayor} clientes: p95 {base['p95_ms']:.1f}ms → {nuevo['p95_ms']:.1f}ms, "
+            f"{base['rapidas_rps']:.0f} → {nuevo['rapidas_rps']:.0f} rps"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"lentas": args.lentas, "duracion": args.duracion, "resultados": resultados}, f, indent=2)
+        print(f"\n📁 Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+"""
+Benchmark de `exportar_polizas` sobre streamable-http con carteras de distinto tamaño.
+Mide el tiempo hasta la primera fila en el cliente, la duración total y el pico de memoria
+residente del proceso servidor, transmitiendo por notificaciones de progreso y, como
+referencia, devolviendo todos los lotes en una sola respuesta.
+
+Uso:
+    python bench_exportacion.py --polizas 10000 100000 1000000 --lote 500
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict
+
+from bench_herramientas import DIR_SERVIDOR, iniciar_servidor_http, puerto_libre
+
+from fastmcp import Client
+
+
+def pico_memoria_mb(pid: int) -> float:
+    """Pico de memoria residente (VmHWM) de un proceso, en MB; solo Linux"""
+    with open(f"/proc/{pid}/status", encoding="ascii") as f:
+        for linea in f:
+            if linea.startswith("VmHWM:"):
+                return int(linea.split()[1]) / 1024
+    return 0.0
+
+
+async def medir(url: str, lote: int, transmitir: bool) -> Dict[str, Any]:
+    """Exporta todas las pólizas y mide la primera fila vista por el cliente y el total"""
+    primera_fila_ms = None
+    inicio = time.perf_counter()
+
+    async def recibir_lote(progreso: float, total: Any, mensaje: str):
+        nonlocal primera_fila_ms
+        if primera_fila_ms is None:
+            primera_fila_ms = (time.perf_counter() - inicio) * 1000
+
+    async with Client(url, progress_handler=recibir_lote) as client:
+        inicio = time.perf_counter()
+        if transmitir:
+            resumen = (await client.call_tool("exportar_polizas", {"lote": lote})).data
+        else:
+            # Sin progressToken el servidor acumula los lotes en la respuesta
+            respuesta = await client.session.call_tool("exportar_polizas", {"lote": lote})
+            primera_fila_ms = (time.perf_counter() - inicio) * 1000
+            resumen = json.loads(respuesta.content[-1].text)
+        total_ms = (time.perf_counter() - inicio) * 1000
+
+    return {
+        "filas": resumen["filas"],
+        "primera_fila_ms": round(primera_fila_ms or 0.0, 1),
+        "primera_fila_servidor_ms": round(resumen["primera_fila_ms"] or 0.0, 1),
+        "total_ms": round(total_ms, 1),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--polizas", type=int, nargs="+", default=[10_000, 100_000], help="Tamaños de cartera")
+    parser.add_argument("--lote", type=int, default=500, help="Pólizas por notificación")
+    parser.add_argument("--perfil", default="wal", help="Perfil de almacenamiento del servidor (la caché y mmap de SQLite cuentan en su memoria)")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--json", help="Ruta donde guardar los resultados")
+    args = parser.parse_args()
+
+    sys.path.insert(0, DIR_SERVIDOR)
+    from generar_datos import generar
+
+    print("=" * 60)
+    print("Benchmark - Exportación de Pólizas")
+    print("=" * 60 + "\n")
+
+    resultados: Dict[str, Dict[str, Any]] = {}
+    for polizas in args.polizas:
+        with tempfile.TemporaryDirectory(prefix="bench_exportacion_") as directorio:
+            db_path = os.path.join(directorio, "seguros.db")
+            generar(db_path, max(polizas // 10, 1), polizas, args.semilla)
+
+            resultados[str(polizas)] = {}
+            for modo, transmitir in (("progreso", True), ("respuesta", False)):
+                # Un proceso por medición para que el pico de memoria sea solo de esa exportación
+                puerto = puerto_libre()
+                proceso = iniciar_servidor_http(db_path, puerto, {"SEGUROS_CACHE_TTL": "0", "SEGUROS_PERFIL": args.perfil})
+                try:
+                    medida = await medir(f"http://127.0.0.1:{puerto}/mcp", args.lote, transmitir)
+                    medida["pico_servidor_mb"] = round(pico_memoria_mb(proceso.pid), 1)
+                finally:
+                    proceso.terminate()
+                    proceso.wait(timeout=10)
+                resultados[str(polizas)][modo] = medida
+
+    print(f"\n{'Pólizas':>10} {'Modo':<10} {'1ª fila':>10} {'1ª fila BD':>11} {'Total':>10} {'Pico servidor':>14}")
+    for polizas, modos in resultados.items():
+        for modo, medida in modos.items():
+            print(
+                f"{int(polizas):>10,} {modo:<10} {medida['primera_fila_ms']:>8.1f}ms "
+                f"{medida['primera_fila_servidor_ms']:>9.1f}ms "
+                f"{medida['total_ms']:>8.1f}ms {medida['pico_servidor_mb']:>11.1f} MB"
+            )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"lote": args.lote, "perfil": args.perfil, "resultados": resultados}, f, indent=2)
+        print(f"\n📁 Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,150 @@
+"""
+Micro-benchmark de la conversión de filas SQLite en la respuesta de una herramienta.
+Compara, para resultados de 10 mil y 100 mil filas, el diccionario escrito a mano por índice,
+`dict(zip(...))`, `sqlite3.Row`, `consultas.filas` y el JSON generado en SQLite
+por `consultas.json_filas` frente a construir diccionarios y serializarlos con `json.dumps`.
+
+Uso:
+    python bench_filas.py --filas 10000 100000 --repeticiones 5
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Dict
+
+# bench_herramientas añade el directorio del servidor al path
+import bench_herramientas  # noqa: F401
+from consultas import filas, json_filas
+
+# Misma forma que el listado de pólizas del servidor
+CONSULTA = """
+    SELECT p.id, p.numero_poliza, c.nombre AS cliente, ps.nombre AS producto,
+           ps.tipo, p.fecha_inicio, p.fecha_vencimiento, p.prima_mensual,
+           p.monto_cobertura, p.estado
+    FROM polizas p
+    JOIN clientes c ON p.cliente_id = c.id
+    JOIN productos_seguros ps ON p.producto_id = ps.id
+    ORDER BY p.numero_poliza
+    LIMIT ?
+"""
+
+
+def a_mano(conn: sqlite3.Connection, limite: int):
+    """Diccionarios construidos por índice, como hacían las herramientas"""
+    return [
+        {
+            "id": r[0],
+            "numero_poliza": r[1],
+            "cliente": r[2],
+            "producto": r[3],
+            "tipo": r[4],
+            "fecha_inicio": r[5],
+            "fecha_vencimiento": r[6],
+            "prima_mensual": r[7],
+            "monto_cobertura": r[8],
+            "estado": r[9]
+        }
+        for r in conn.execute(CONSULTA, (limite,)).fetchall()
+    ]
+
+
+def con_zip(conn: sqlite3.Connection, limite: int):
+    cursor = conn.execute(CONSULTA, (limite,))
+    nombres = [d[0] for d in cursor.description]
+    return [dict(zip(nombres, r)) for r in cursor.fetchall()]
+
+
+def con_row(conn: sqlite3.Connection, limite: int):
+    conn.row_factory = sqlite3.Row
+    try:
+        return [dict(r) for r in conn.execute(CONSULTA, (limite,)).fetchall()]
+    finally:
+        conn.row_factory = None
+
+
+def con_filas(conn: sqlite3.Connection, limite: int):
+    return filas(conn.execute(CONSULTA, (limite,)))
+
+
+def json_dumps(conn: sqlite3.Connection, limite: int):
+    """Lo que hace FastMCP con una lista de diccionarios: construirla y serializarla"""
+    return json.dumps(filas(conn.execute(CONSULTA, (limite,))), ensure_ascii=False)
+
+
+def json_sqlite(conn: sqlite3.Connection, limite: int):
+    return json_filas(conn, CONSULTA, (limite,))
+
+
+VARIANTES: Dict[str, Callable[[sqlite3.Connection, int], Any]] = {
+    "solo fetchall": lambda conn, limite: conn.execute(CONSULTA, (limite,)).fetchall(),
+    "a mano por índice": a_mano,
+    "dict(zip)": con_zip,
+    "sqlite3.Row": con_row,
+    "consultas.filas": con_filas,
+    "filas + json.dumps": json_dumps,
+    "consultas.json_filas": json_sqlite,
+}
+
+
+def medir(conn: sqlite3.Connection, funcion: Callable, limite: int, repeticiones: int) -> float:
+    """Mediana en ms de `repeticiones` ejecuciones, tras una de calentamiento"""
+    funcion(conn, limite)
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(conn, limite)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, nargs="+", default=[10_000, 100_000], help="Filas por resultado")
+    parser.add_argument("--repeticiones", type=int, default=5, help="Ejecuciones medidas por variante")
+    parser.add_argument("--json", help="Ruta donde guardar los resultados")
+    args = parser.parse_args()
+
+    from generar_datos import generar
+
+    print("=" * 60)
+    print("Micro-benchmark - Conversión de Filas")
+    print("=" * 60 + "\n")
+
+    resultados: Dict[str, Dict[str, float]] = {}
+    with tempfile.TemporaryDirectory(prefix="bench_filas_") as directorio:
+        db_path = os.path.join(directorio, "seguros.db")
+        mayor = max(args.filas)
+        generar(db_path, max(mayor // 10, 1), mayor)
+        conn = sqlite3.connect(db_path)
+
+        for limite in args.filas:
+            resultados[str(limite)] = {
+                nombre: round(medir(conn, funcion, limite, args.repeticiones), 2)
+                for nombre, funcion in VARIANTES.items()
+            }
+        conn.close()
+
+    print(f"\n{'Variante':<24}" + "".join(f"{int(n):>12,}" for n in resultados))
+    for nombre in VARIANTES:
+        print(f"{nombre:<24}" + "".join(f"{medida[nombre]:>10.1f}ms" for medida in resultados.values()))
+
+    for limite, medida in resultados.items():
+        print(
+            f"\n📊 {int(limite):,} filas: a mano {medida['a mano por índice']:.1f}ms → "
+            f"filas {medida['consultas.filas']:.1f}ms; "
+            f"json.dumps {medida['filas + json.dumps']:.1f}ms → json_filas {medida['consultas.json_filas']:.1f}ms"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"repeticiones": args.repeticiones, "resultados": resultados}, f, indent=2)
+        print(f"\n📁 Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Benchmark de latencia y throughput de cada herramienta del servidor MCP de seguros.
+Ejecuta el servidor en memoria (cliente FastMCP in-process) y/o sobre streamable-http,
+guarda los resultados en JSON y los compara con una línea base para detectar regresiones.
+
+Uso:
+    python bench_herramientas.py --transporte ambos --concurrencia 8 --llamadas 200
+    python bench_herramientas.py --json resultados.json --linea-base linea_base.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+DIR_SERVIDOR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "servidor")
+sys.path.insert(0, DIR_SERVIDOR)
+
+from fastmcp import Client  # noqa: E402
+
+def _polizas_jsonl(rng: random.Random, n: Dict[str, int], filas: int = 100) -> str:
+    """Pólizas nuevas en JSONL con números aleatorios para que cada llamada inserte filas distintas"""
+    inicio = date(2025, 1, 1) + timedelta(days=rng.randrange(365))
+    return "\n".join(
+        json.dumps({
+            "numero_poliza": f"POL-BENCH-{rng.getrandbits(64):016x}",
+            "cliente_id": rng.randint(1, n["clientes"]),
+            "producto_id": rng.randint(1, 8),
+            "fecha_inicio": inicio.isoformat(),
+            "fecha_vencimiento": (inicio + timedelta(days=365)).isoformat(),
+            "prima_mensual": round(rng.uniform(50, 600), 2),
+            "monto_cobertura": 100000.0,
+            "estado": "Activa",
+        })
+        for _ in range(filas)
+    )
+
+
+# Generadores de argumentos por herramienta: reciben (rng, tamaños del dataset)
+GENERADORES_ARGUMENTOS: Dict[str, Callable[[random.Random, Dict[str, int]], Dict[str, Any]]] = {
+    "obtener_todas_polizas": lambda rng, n: {},
+    "obtener_polizas_paginadas": lambda rng, n: {"limite": 50},
+    "exportar_polizas": lambda rng, n: {"tipo": "Accidentes", "estado": "Activa"},
+    "buscar_poliza_por_id": lambda rng, n: {"poliza_id": rng.randint(1, n["polizas"])},
+    "buscar_polizas_por_ids": lambda rng, n: {"poliza_ids": [rng.randint(1, n["polizas"]) for _ in range(20)]},
+    "buscar_polizas_por_cliente": lambda rng, n: {"cliente_id": rng.randint(1, n["clientes"])},
+    "buscar_polizas_por_tipo": lambda rng, n: {"tipo": rng.choice(["Vida", "Auto", "Hogar", "Salud", "Accidentes"])},
+    "polizas_por_vencer": lambda rng, n: {"limite": 50},
+    "obtener_productos_seguros": lambda rng, n: {},
+    "buscar_producto_seguro": lambda rng, n: {"producto_id": rng.randint(1, 8)},
+    "buscar_productos_por_ids": lambda rng, n: {"producto_ids": rng.sample(range(1, 9), 4)},
+    "obtener_todos_clientes": lambda rng, n: {},
+    "obtener_clientes_paginados": lambda rng, n: {"limite": 50},
+    "buscar_cliente_por_id": lambda rng, n: {"cliente_id": rng.randint(1, n["clientes"])},
+    "buscar_clientes_por_ids": lambda rng, n: {"cliente_ids": [rng.randint(1, n["clientes"]) for _ in range(20)]},
+    "buscar_clientes_por_ciudad": lambda rng, n: {"ciudad": rng.choice(["Bogotá", "Medellín", "Cali", "Pereira"])},
+    "buscar_clientes_texto": lambda rng, n: {"texto": rng.choice(["maria", "garcia bogota", "lopez cali"])},
+    "buscar_productos_texto": lambda rng, n: {"texto": rng.choice(["vida", "robo", "familia", "accidentes"])},
+    "resumen_cartera": lambda rng, n: {"agrupar_por": rng.choice([["tipo"], ["estado"], ["tipo", "ciudad"], ["mes"]])},
+    # Escribe en la base de datos del benchmark: 100 pólizas nuevas por llamada
+    "ingerir_polizas": lambda rng, n: {"contenido": _polizas_jsonl(rng, n), "formato": "jsonl"},
+}
+
+
+def percentil(valores: List[float], p: int) -> float:
+    """Percentil p (1-99) de una lista de valores"""
+    if len(valores) < 2:
+        return valores[0] if valores else 0.0
+    return statistics.quantiles(valores, n=100, method="inclusive")[p - 1]
+
+
+def puerto_libre() -> int:
+    """Pide al sistema operativo un puerto TCP libre"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def iniciar_servidor_http(db_path: str, puerto: int, variables: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    """Arranca servidor_seguros.py en un proceso aparte y espera a que acepte conexiones"""
+    entorno = {**os.environ, **(variables or {}), "SEGUROS_DB_PATH": db_path}
+    proceso = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "import servidor_seguros; "
+            f"servidor_seguros.app.run(transport='streamable-http', host='127.0.0.1', port={puerto})",
+        ],
+        cwd=DIR_SERVIDOR,
+        env=entorno,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    limite = time.monotonic() + 30
+    while time.monotonic() < limite:
+        try:
+            with socket.create_connection(("127.0.0.1", puerto), timeout=0.5):
+                return proceso
+        except OSError:
+            if proceso.poll() is not None:
+                raise RuntimeError("El servidor HTTP terminó antes de aceptar conexiones")
+            time.sleep(0.2)
+    proceso.terminate()
+    raise RuntimeError(f"El servidor HTTP no respondió en el puerto {puerto}")
+
+
+async def medir_herramienta(
+    crear_cliente: Callable[[], Client],
+    herramienta: str,
+    llamadas: int,
+    concurrencia: int,
+    tamanos: Dict[str, int],
+    semilla: int,
+) -> Dict[str, Any]:
+    """Lanza `llamadas` invocaciones repartidas entre `concurrencia` clientes"""
+    generador = GENERADORES_ARGUMENTOS[herramienta]
+    latencias_ms: List[float] = []
+    errores = 0
+    pendientes = iter(range(llamadas))
+
+    async def trabajador(indice: int):
+        nonlocal errores
+        rng = random.Random(semilla + indice)
+        async with crear_cliente() as client:
+            for _ in pendientes:
+                argumentos = generador(rng, tamanos)
+                inicio = time.perf_counter()
+                try:
+                    await client.call_tool(herramienta, argumentos)
+                    latencias_ms.append((time.perf_counter() - inicio) * 1000)
+                except Exception:
+                    errores += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador(i) for i in range(concurrencia)))
+    duracion = time.perf_counter() - inicio
+
+    return {
+        "llamadas": llamadas,
+        "errores": errores,
+        "p50_ms": round(percentil(latencias_ms, 50), 3),
+        "p95_ms": round(percentil(latencias_ms, 95), 3),
+        "p99_ms": round(percentil(latencias_ms, 99), 3),
+        "throughput_rps": round(len(latencias_ms) / duracion, 1),
+    }
+
+
+async def ejecutar_transporte(
+    transporte: str, db_path: str, herramientas: List[str], args: argparse.Namespace, tamanos: Dict[str, int]
+) -> Dict[str, Dict[str, Any]]:
+    """Mide todas las herramientas sobre un transporte concreto"""
+    proceso: Optional[subprocess.Popen] = None
+    if transporte == "memoria":
+        import servidor_seguros
+        from pool_conexiones import PoolConexiones
+
+        servidor_seguros.pool_lectura = PoolConexiones(
+            db_path,
+            tamano=servidor_seguros.pool_lectura.tamano,
+            pragmas=servidor_seguros.pool_lectura.pragmas,
+        )
+
+        def crear_cliente():
+            return Client(servidor_seguros.app)
+    else:
+        puerto = puerto_libre()
+        proceso = iniciar_servidor_http(db_path, puerto)
+
+        def crear_cliente():
+            return Client(f"http://127.0.0.1:{puerto}/mcp")
+
+    resultados = {}
+    try:
+        for herramienta in herramientas:
+            resultado = await medir_herramienta(
+                crear_cliente, herramienta, args.llamadas, args.concurrencia, tamanos, args.semilla
+            )
+            resultados[herramienta] = resultado
+            print(
+                f"   {transporte:<8} {herramienta:<30} p50={resultado['p50_ms']:>8.2f}ms "
+                f"p95={resultado['p95_ms']:>8.2f}ms p99={resultado['p99_ms']:>8.2f}ms "
+                f"{resultado['throughput_rps']:>8.1f} rps errores={resultado['errores']}"
+            )
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait(timeout=10)
+    return resultados
+
+
+def comparar(actual: Dict[str, Any], linea_base: Dict[str, Any], umbral: float) -> List[str]:
+    """
+    Compara cada herramienta con la línea base.
+
+    Returns:
+        Lista de regresiones encontradas (p95 más alto o throughput más bajo que el umbral)
+    """
+    regresiones = []
+    print(f"\n{'Transporte':<10} {'Herramienta':<30} {'p95 base':>10} {'p95 actual':>10} {'Δ p95':>8} {'Δ rps':>8}")
+    for transporte, herramientas in actual["resultados"].items():
+        for herramienta, medida in herramientas.items():
+            base = linea_base.get("resultados", {}).get(transporte, {}).get(herramienta)
+            if base is None:
+                print(f"{transporte:<10} {herramienta:<30} {'(sin línea base)':>22}")
+                continue
+            delta_p95 = (medida["p95_ms"] - base["p95_ms"]) / base["p95_ms"] if base["p95_ms"] else 0.0
+            delta_rps = (
+                (medida["throughput_rps"] - base["throughput_rps"]) / base["throughput_rps"]
+                if base["throughput_rps"]
+                else 0.0
+            )
+            empeora = delta_p95 > umbral or delta_rps < -umbral
+            icono = "⚠️ " if empeora else "✅"
+            print(
+                f"{transporte:<10} {herramienta:<30} {base['p95_ms']:>10.2f} {medida['p95_ms']:>10.2f} "
+                f"{delta_p95:>+8.0%} {delta_rps:>+8.0%} {icono}"
+            )
+            if empeora:
+                regresiones.append(f"{transporte}/{herramienta}")
+    return regresiones
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transporte", choices=["memoria", "http", "ambos"], default="ambos")
+    parser.add_argument("--concurrencia", type=int, default=8, help="Clientes simultáneos")
+    parser.add_argument("--llamadas", type=int, default=200, help="Llamadas por herramienta y transporte")
+    parser.add_argument("--clientes", type=int, default=10_000, help="Clientes del dataset sintético")
+    parser.add_argument("--polizas", type=int, default=100_000, help="Pólizas del dataset sintético")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--herramientas", nargs="+", help="Subconjunto de herramientas a medir")
+    parser.add_argument("--json", help="Ruta donde guardar los resultados")
+    parser.add_argument("--linea-base", help="Resultados previos con los que comparar")
+    parser.add_argument("--umbral", type=float, default=0.2, help="Variación tolerada antes de marcar regresión")
+    args = parser.parse_args()
+
+    from generar_datos import generar
+
+    print("=" * 60)
+    print("Benchmark - Herramientas del Servidor MCP de Seguros")
+    print("=" * 60 + "\n")
+
+    herramientas = args.herramientas or list(GENERADORES_ARGUMENTOS)
+    desconocidas = set(herramientas) - set(GENERADORES_ARGUMENTOS)
+    if desconocidas:
+        parser.error(f"Herramientas sin generador de argumentos: {', '.join(sorted(desconocidas))}")
+
+    transportes = ["memoria", "http"] if args.transporte == "ambos" else [args.transporte]
+    with tempfile.TemporaryDirectory(prefix="bench_herramientas_") as directorio:
+        db_path = os.path.join(directorio, "seguros.db")
+        generar(db_path, args.clientes, args.polizas, args.semilla)
+        tamanos = {"clientes": args.clientes, "polizas": args.polizas}
+
+        print(f"\nMidiendo {len(herramientas)} herramientas ({args.llamadas} llamadas, concurrencia {args.concurrencia})\n")
+        resultados = {}
+        for transporte in transportes:
+            resultados[transporte] = await ejecutar_transporte(transporte, db_path, herramientas, args, tamanos)
+
+    informe = {
+        "metadatos": {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "concurrencia": args.concurrencia,
+            "llamadas": args.llamadas,
+            "clientes": args.clientes,
+            "polizas": args.polizas,
+        },
+        "resultados": resultados,
+    }
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(informe, f, indent=2, ensure_ascii=False)
+        print(f"\n📁 Resultados guardados en {args.json}")
+
+    if args.linea_base:
+        with open(args.linea_base, encoding="utf-8") as f:
+            linea_base = json.load(f)
+        regresiones = comparar(informe, linea_base, args.umbral)
+        if regresiones:
+            print(f"\n⚠️  Regresiones detectadas: {', '.join(regresiones)}")
+            sys.exit(1)
+        print("\n✅ Sin regresiones respecto a la línea base")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,109 @@
+"""
+Benchmark de la ingesta de pólizas según el tamaño de lote.
+Genera un CSV sintético con una fracción de filas inválidas y lo ingiere con cada tamaño de
+lote sobre una copia de la misma base de datos. Cada lote es una transacción, así que con
+lotes pequeños domina el coste del commit y con lotes grandes el de validar e insertar.
+
+Uso:
+    python bench_ingesta.py --filas 100000 --lotes 1 100 1000 10000 --invalidas 0.05
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+from datetime import date, timedelta
+from typing import Any, Dict
+
+from bench_herramientas import DIR_SERVIDOR
+
+
+def generar_csv(filas: int, clientes: int, invalidas: float, semilla: int) -> str:
+    """CSV de pólizas nuevas; una fracción `invalidas` tiene un error de validación o de referencia"""
+    from ingesta import COLUMNAS
+
+    rng = random.Random(semilla)
+    salida = io.StringIO()
+    escritor = csv.writer(salida)
+    escritor.writerow(COLUMNAS)
+    base = date(2025, 1, 1)
+    for i in range(filas):
+        inicio = base + timedelta(days=rng.randrange(365))
+        fila = [
+            f"POL-ING-{i:010d}", rng.randint(1, clientes), rng.randint(1, 8), inicio.isoformat(),
+            (inicio + timedelta(days=365)).isoformat(), round(rng.uniform(50, 600), 2), 100000.0, "Activa",
+        ]
+        if rng.random() < invalidas:
+            # Un error distinto según la fila: cliente inexistente, fecha ilegible o estado desconocido
+            indice, valor = rng.choice(((1, clientes * 1000), (3, "2025-13-01"), (7, "Suspendida")))
+            fila[indice] = valor
+        escritor.writerow(fila)
+    return salida.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=100_000, help="Filas del CSV a ingerir")
+    parser.add_argument("--lotes", type=int, nargs="+", default=[1, 100, 1000, 10000], help="Tamaños de lote a probar")
+    parser.add_argument("--invalidas", type=float, default=0.05, help="Fracción de filas inválidas")
+    parser.add_argument("--clientes", type=int, default=10_000, help="Clientes de la base de datos inicial")
+    parser.add_argument("--polizas", type=int, default=100_000, help="Pólizas de la base de datos inicial")
+    parser.add_argument("--json", help="Ruta donde guardar los resultados")
+    args = parser.parse_args()
+
+    sys.path.insert(0, DIR_SERVIDOR)
+    from generar_datos import generar
+    from ingesta import abrir_conexion, ingerir, leer_registros
+    from servidor_seguros import PERFIL
+
+    print("=" * 60)
+    print("Benchmark - Ingesta de Pólizas")
+    print("=" * 60)
+    print(f"\n📊 {args.filas:,} filas ({args.invalidas:.0%} inválidas), perfil '{PERFIL.nombre}'\n")
+
+    contenido = generar_csv(args.filas, args.clientes, args.invalidas, semilla=42)
+    resultados: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory(prefix="bench_ingesta_") as directorio:
+        base = os.path.join(directorio, "base.db")
+        generar(base, args.clientes, args.polizas)
+
+        for lote in args.lotes:
+            db_path = os.path.join(directorio, f"lote-{lote}.db")
+            shutil.copy(base, db_path)
+            conn = abrir_conexion(db_path, PERFIL.pragmas_conexion())
+            try:
+                for resultado in ingerir(conn, leer_registros(io.StringIO(contenido), "csv"), lote):
+                    pass
+            finally:
+                conn.close()
+            os.remove(db_path)
+
+            resultados[str(lote)] = {
+                "insertadas": resultado["insertadas"],
+                "rechazadas": resultado["rechazadas"],
+                "lotes": resultado["lotes"],
+                "duracion_s": resultado["duracion_s"],
+                "filas_por_segundo": resultado["filas_por_segundo"],
+            }
+            print(f"   lote {lote}: {resultados[str(lote)]}")
+
+    print(f"\n{'Lote':>8} {'Insertadas':>11} {'Rechazadas':>11} {'Duración':>10} {'Filas/s':>10}")
+    for lote, medida in resultados.items():
+        print(
+            f"{int(lote):>8} {medida['insertadas']:>11,} {medida['rechazadas']:>11,} "
+            f"{medida['duracion_s']:>9.2f}s {medida['filas_por_segundo']:>10,.0f}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"perfil": PERFIL.nombre, "filas": args.filas, "resultados": resultados}, f, indent=2)
+        print(f"\n📁 Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
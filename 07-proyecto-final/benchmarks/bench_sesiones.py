@@ -0,0 +1,145 @@
+"""
+Benchmark del coste por llamada a herramienta desde el agente.
+Compara las dos formas en que el agente llega al servidor por HTTP: una sesión MCP nueva por
+llamada (lo que hace `MultiServerMCPClient` por defecto: conexión, `initialize` y cierre) y el
+pool de sesiones persistentes de `agente/pool_sesiones.py`. Las llamadas pasan por `tool.ainvoke`,
+igual que en el grafo del agente, en secuencia y con varias a la vez.
+
+Uso:
+    python bench_sesiones.py --llamadas 300 --concurrencia 8
+    python bench_sesiones.py --url http://127.0.0.1:8000/mcp --sesiones 4 --json sesiones.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from bench_herramientas import DIR_SERVIDOR, iniciar_servidor_http, percentil, puerto_libre
+
+sys.path.insert(0, os.path.join(DIR_SERVIDOR, "..", "agente"))
+
+from langchain_mcp_adapters.client import MultiServerMCPClient  # noqa: E402
+from pool_sesiones import PoolSesionesMCP  # noqa: E402
+
+HERRAMIENTA = "buscar_poliza_por_id"
+
+
+async def medir_modo(
+    url: str,
+    pool: Optional[PoolSesionesMCP],
+    llamadas: int,
+    concurrencia: int,
+    polizas: int,
+) -> Dict[str, Any]:
+    """Mide `llamadas` invocaciones de la herramienta con `concurrencia` clientes simultáneos"""
+    conexiones = {"seguros": {"url": url, "transport": "streamable_http"}}
+    cliente = MultiServerMCPClient(conexiones, tool_interceptors=[pool] if pool else None)
+    herramienta = next(t for t in await cliente.get_tools() if t.name == HERRAMIENTA)
+
+    # Calentamiento: importaciones perezosas y, con el pool, la apertura de las sesiones
+    await asyncio.gather(*(herramienta.ainvoke({"poliza_id": 1}) for _ in range(concurrencia)))
+
+    latencias: List[float] = []
+    siguiente = iter(range(llamadas))
+
+    async def trabajador():
+        for i in siguiente:
+            inicio = time.perf_counter()
+            await herramienta.ainvoke({"poliza_id": i % polizas + 1})
+            latencias.append((time.perf_counter() - inicio) * 1000)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+    total = time.perf_counter() - inicio
+
+    resultado = {
+        "llamadas": llamadas,
+        "concurrencia": concurrencia,
+        "p50_ms": round(percentil(latencias, 50), 2),
+        "p95_ms": round(percentil(latencias, 95), 2),
+        "p99_ms": round(percentil(latencias, 99), 2),
+        "media_ms": round(statistics.mean(latencias), 2),
+        "llamadas_por_s": round(llamadas / total, 1),
+    }
+    if pool:
+        metricas = pool.metricas()
+        resultado["sesiones_abiertas"] = metricas["sesiones_abiertas_total"]
+        resultado["espera_promedio_ms"] = round(metricas["espera_promedio_ms"], 2)
+        await pool.cerrar()
+    return resultado
+
+
+async def ejecutar(url: str, args) -> Dict[str, Dict[str, Any]]:
+    """Recorre modos y niveles de concurrencia"""
+    resultados: Dict[str, Dict[str, Any]] = {}
+    for concurrencia in sorted({1, args.concurrencia}):
+        for modo in ("por_llamada", "pool"):
+            pool = None
+            if modo == "pool":
+                pool = PoolSesionesMCP({"seguros": {"url": url, "transport": "streamable_http"}}, tamano=args.sesiones)
+            nombre = f"{modo}_c{concurrencia}"
+            resultados[nombre] = await medir_modo(url, pool, args.llamadas, concurrencia, args.polizas)
+            print(f"   {nombre}: {resultados[nombre]}")
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Servidor ya arrancado (por defecto se lanza uno con una base temporal)")
+    parser.add_argument("--llamadas", type=int, default=300, help="Llamadas por modo y nivel de concurrencia")
+    parser.add_argument("--concurrencia", type=int, default=8, help="Llamadas simultáneas en la segunda pasada")
+    parser.add_argument("--sesiones", type=int, default=4, help="Tamaño del pool por servidor")
+    parser.add_argument("--clientes", type=int, default=1_000, help="Clientes del dataset sintético")
+    parser.add_argument("--polizas", type=int, default=10_000, help="Pólizas del dataset sintético")
+    parser.add_argument("--json", help="Ruta donde guardar los resultados")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Benchmark - Sesiones MCP por Llamada vs Pool")
+    print("=" * 60)
+    print(f"\n📊 {args.llamadas} llamadas a {HERRAMIENTA} por modo (pool de {args.sesiones} sesiones)\n")
+
+    if args.url:
+        resultados = asyncio.run(ejecutar(args.url, args))
+    else:
+        from generar_datos import generar
+
+        with tempfile.TemporaryDirectory(prefix="bench_sesiones_") as directorio:
+            db_path = os.path.join(directorio, "seguros.db")
+            generar(db_path, args.clientes, args.polizas, 42)
+            puerto = puerto_libre()
+            # Sin la caché del servidor, para medir la consulta completa en ambos modos
+            servidor = iniciar_servidor_http(db_path, puerto, {"SEGUROS_CACHE_TTL": "0"})
+            try:
+                resultados = asyncio.run(ejecutar(f"http://127.0.0.1:{puerto}/mcp", args))
+            finally:
+                servidor.terminate()
+                servidor.wait()
+
+    print(f"\n{'Modo':<18} {'p50':>9} {'p95':>9} {'p99':>9} {'llamadas/s':>11}")
+    for nombre, medida in resultados.items():
+        print(
+            f"{nombre:<18} {medida['p50_ms']:>7.1f}ms {medida['p95_ms']:>7.1f}ms "
+            f"{medida['p99_ms']:>7.1f}ms {medida['llamadas_por_s']:>11.0f}"
+        )
+    for concurrencia in sorted({1, args.concurrencia}):
+        antes, despues = resultados[f"por_llamada_c{concurrencia}"], resultados[f"pool_c{concurrencia}"]
+        print(
+            f"\n✅ Concurrencia {concurrencia}: p50 {antes['p50_ms']:.1f}ms → {despues['p50_ms']:.1f}ms "
+            f"({antes['p50_ms'] / despues['p50_ms']:.1f}x)"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"sesiones": args.sesiones, "resultados": resultados}, f, indent=2)
+        print(f"\n📁 Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
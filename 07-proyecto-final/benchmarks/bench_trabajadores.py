@@ -0,0 +1,155 @@
+"""
+Benchmark de throughput del lanzador multiproceso según el número de trabajadores.
+Arranca `servidor/lanzador.py` con 1, 2, 4... trabajadores y lo satura desde varios procesos
+cliente (un solo proceso cliente se quedaría sin CPU antes que el servidor). Con núcleos libres
+el throughput debería crecer de forma casi lineal hasta el número de núcleos.
+
+Uso:
+    python bench_trabajadores.py --trabajadores 1 2 4 --procesos-cliente 4 --concurrencia 8 --duracion 10
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from bench_herramientas import DIR_SERVIDOR, percentil, puerto_libre
+
+from fastmcp import Client
+
+# Herramienta con trabajo de CPU en el servidor (consulta con JOIN y serialización de 20 pólizas)
+HERRAMIENTA = "buscar_polizas_por_ids"
+
+
+async def _cargar(url: str, concurrencia: int, duracion: float, polizas: int, semilla: int) -> Dict[str, Any]:
+    """Lanza `concurrencia` clientes que llaman a la herramienta sin pausa durante `duracion` segundos"""
+    latencias_ms: List[float] = []
+    errores = 0
+    fin = time.monotonic() + duracion
+
+    async def cliente(indice: int):
+        nonlocal errores
+        rng = random.Random(semilla + indice)
+        async with Client(url) as client:
+            while time.monotonic() < fin:
+                ids = [rng.randint(1, polizas) for _ in range(20)]
+                inicio = time.perf_counter()
+                try:
+                    await client.call_tool(HERRAMIENTA, {"poliza_ids": ids})
+                    latencias_ms.append((time.perf_counter() - inicio) * 1000)
+                except Exception:
+                    errores += 1
+
+    await asyncio.gather(*(cliente(i) for i in range(concurrencia)))
+    return {"latencias_ms": latencias_ms, "errores": errores}
+
+
+def proceso_cliente(url: str, concurrencia: int, duracion: float, polizas: int, semilla: int) -> Dict[str, Any]:
+    """Punto de entrada de cada proceso generador de carga"""
+    return asyncio.run(_cargar(url, concurrencia, duracion, polizas, semilla))
+
+
+def iniciar_lanzador(db_path: str, puerto: int, trabajadores: int) -> subprocess.Popen:
+    """Arranca el lanzador y espera a que todos sus trabajadores publiquen métricas"""
+    proceso = subprocess.Popen(
+        [sys.executable, "lanzador.py", "--trabajadores", str(trabajadores), "--host", "127.0.0.1",
+         "--puerto", str(puerto), "--intervalo-metricas", "0.5"],
+        cwd=DIR_SERVIDOR,
+        env={**os.environ, "SEGUROS_DB_PATH": db_path, "SEGUROS_CACHE_TTL": "0"},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    limite = time.monotonic() + 60
+    while time.monotonic() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError("El lanzador terminó antes de aceptar conexiones")
+        try:
+            if len(asyncio.run(leer_metricas(puerto))["trabajadores"]) == trabajadores:
+                return proceso
+        except Exception:
+            pass
+        time.sleep(0.5)
+    proceso.terminate()
+    raise RuntimeError(f"Los {trabajadores} trabajadores no respondieron en el puerto {puerto}")
+
+
+async def leer_metricas(puerto: int) -> Dict[str, Any]:
+    async with Client(f"http://127.0.0.1:{puerto}/mcp") as client:
+        return json.loads((await client.read_resource("metricas://trabajadores"))[0].text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trabajadores", type=int, nargs="+", default=[1, 2, 4], help="Trabajadores a probar")
+    parser.add_argument("--procesos-cliente", type=int, default=4, help="Procesos que generan carga")
+    parser.add_argument("--concurrencia", type=int, default=8, help="Clientes por proceso generador")
+    parser.add_argument("--duracion", type=float, default=10.0, help="Segundos de carga por configuración")
+    parser.add_argument("--polizas", type=int, default=100_000, help="Pólizas del dataset sintético")
+    parser.add_argument("--json", help="Ruta donde guardar los resultados")
+    args = parser.parse_args()
+
+    sys.path.insert(0, DIR_SERVIDOR)
+    from generar_datos import generar
+
+    print("=" * 60)
+    print("Benchmark - Lanzador Multiproceso")
+    print("=" * 60)
+    print(f"\n📊 {os.cpu_count()} núcleos, {args.procesos_cliente} procesos cliente x {args.concurrencia} clientes\n")
+
+    resultados: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory(prefix="bench_trabajadores_") as directorio:
+        db_path = os.path.join(directorio, "seguros.db")
+        generar(db_path, max(args.polizas // 10, 1), args.polizas)
+
+        contexto = multiprocessing.get_context("spawn")
+        for trabajadores in args.trabajadores:
+            puerto = puerto_libre()
+            lanzador = iniciar_lanzador(db_path, puerto, trabajadores)
+            url = f"http://127.0.0.1:{puerto}/mcp"
+            try:
+                with contexto.Pool(args.procesos_cliente) as pool:
+                    cargas = pool.starmap(
+                        proceso_cliente,
+                        [(url, args.concurrencia, args.duracion, args.polizas, i * 1000) for i in range(args.procesos_cliente)],
+                    )
+                por_trabajador = {
+                    pid: m["ejecutor"]["completadas"] for pid, m in asyncio.run(leer_metricas(puerto))["trabajadores"].items()
+                }
+            finally:
+                lanzador.terminate()
+                lanzador.wait(timeout=30)
+
+            latencias = [l for carga in cargas for l in carga["latencias_ms"]]
+            resultados[str(trabajadores)] = {
+                "throughput_rps": round(len(latencias) / args.duracion, 1),
+                "p50_ms": round(percentil(latencias, 50), 2),
+                "p95_ms": round(percentil(latencias, 95), 2),
+                "errores": sum(carga["errores"] for carga in cargas),
+                "consultas_por_trabajador": sorted(por_trabajador.values()),
+            }
+            print(f"   {trabajadores} trabajadores: {resultados[str(trabajadores)]}")
+
+    base = resultados[str(args.trabajadores[0])]["throughput_rps"] / args.trabajadores[0]
+    print(f"\n{'Trabajadores':>12} {'rps':>10} {'p50':>10} {'p95':>10} {'Escalado':>9}")
+    for trabajadores, medida in resultados.items():
+        escalado = medida["throughput_rps"] / base / int(trabajadores) if base else 0.0
+        print(
+            f"{int(trabajadores):>12} {medida['throughput_rps']:>10.1f} {medida['p50_ms']:>8.2f}ms "
+            f"{medida['p95_ms']:>8.2f}ms {escalado:>8.0%}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"nucleos": os.cpu_count(), "resultados": resultados}, f, indent=2)
+        print(f"\n📁 Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark de `polizas_por_vencer` a medida que crece la tabla de pólizas.
+Con el índice (estado, fecha_vencimiento) la latencia de una página no depende del tamaño de la
+tabla; como referencia se mide la misma consulta con `NOT INDEXED` (recorrido completo).
+
+Uso:
+    python bench_vencimientos.py --polizas 10000 100000 1000000 --llamadas 200
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+from bench_herramientas import DIR_SERVIDOR, percentil
+
+from fastmcp import Client
+
+# Misma consulta que la herramienta, sin índice sobre polizas
+CONSULTA_SIN_INDICE = """
+    SELECT p.id, p.numero_poliza, c.nombre, c.email, ps.nombre, ps.tipo,
+           p.fecha_vencimiento, p.prima_mensual, p.monto_cobertura, p.estado
+    FROM polizas p NOT INDEXED
+    JOIN clientes c ON p.cliente_id = c.id
+    JOIN productos_seguros ps ON p.producto_id = ps.id
+    WHERE p.estado = 'Activa' AND p.fecha_vencimiento BETWEEN ? AND ?
+    ORDER BY p.fecha_vencimiento, p.id
+    LIMIT ?
+"""
+
+
+def ventanas(rng: random.Random, cantidad: int, dias: int) -> List[Dict[str, str]]:
+    """Ventanas aleatorias de `dias` días dentro del próximo año"""
+    hoy = date.today()
+    resultado = []
+    for _ in range(cantidad):
+        desde = hoy + timedelta(days=rng.randrange(365 - dias))
+        resultado.append({"desde": desde.isoformat(), "hasta": (desde + timedelta(days=dias)).isoformat()})
+    return resultado
+
+
+async def medir_herramienta(llamadas: List[Dict[str, str]], limite: int) -> List[float]:
+    """Latencias (ms) de polizas_por_vencer con el cliente FastMCP en memoria"""
+    import servidor_seguros
+
+    latencias_ms = []
+    async with Client(servidor_seguros.app) as client:
+        for ventana in llamadas:
+            inicio = time.perf_counter()
+            await client.call_tool("polizas_por_vencer", {**ventana, "limite": limite})
+            latencias_ms.append((time.perf_counter() - inicio) * 1000)
+    return latencias_ms
+
+
+def medir_sin_indice(db_path: str, llamadas: List[Dict[str, str]], limite: int) -> List[float]:
+    """Latencias (ms) de la misma consulta forzando un recorrido completo"""
+    conn = sqlite3.connect(db_path)
+    latencias_ms = []
+    for ventana in llamadas:
+        inicio = time.perf_counter()
+        conn.execute(CONSULTA_SIN_INDICE, (ventana["desde"], ventana["hasta"], limite + 1)).fetchall()
+        latencias_ms.append((time.perf_counter() - inicio) * 1000)
+    conn.close()
+    return latencias_ms
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--polizas", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="Tamaños de tabla")
+    parser.add_argument("--llamadas", type=int, default=200, help="Llamadas por tamaño")
+    parser.add_argument("--llamadas-sin-indice", type=int, default=10, help="Llamadas de referencia sin índice")
+    parser.add_argument("--dias", type=int, default=30, help="Amplitud de cada ventana de vencimiento")
+    parser.add_argument("--limite", type=int, default=50, help="Pólizas por página")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--json", help="Ruta donde guardar los resultados")
+    args = parser.parse_args()
+
+    sys.path.insert(0, DIR_SERVIDOR)
+    import servidor_seguros
+    from generar_datos import generar
+    from pool_conexiones import PoolConexiones
+
+    print("=" * 60)
+    print("Benchmark - Pólizas por Vencer")
+    print("=" * 60 + "\n")
+
+    rng = random.Random(args.semilla)
+    resultados: Dict[str, Dict[str, Any]] = {}
+    for polizas in args.polizas:
+        with tempfile.TemporaryDirectory(prefix="bench_vencimientos_") as directorio:
+            db_path = os.path.join(directorio, "seguros.db")
+            generar(db_path, max(polizas // 10, 1), polizas, args.semilla)
+            servidor_seguros.pool_lectura = PoolConexiones(
+                db_path, tamano=1, pragmas=servidor_seguros.pool_lectura.pragmas
+            )
+
+            con_indice = await medir_herramienta(ventanas(rng, args.llamadas, args.dias), args.limite)
+            sin_indice = medir_sin_indice(db_path, ventanas(rng, args.llamadas_sin_indice, args.dias), args.limite)
+            servidor_seguros.pool_lectura.cerrar()
+
+        resultados[str(polizas)] = {
+            "herramienta_p50_ms": round(percentil(con_indice, 50), 3),
+            "herramienta_p95_ms": round(percentil(con_indice, 95), 3),
+            "sin_indice_p50_ms": round(percentil(sin_indice, 50), 3),
+        }
+
+    print(f"\n{'Pólizas':>12} {'p50 herramienta':>16} {'p95 herramienta':>16} {'p50 sin índice':>15}")
+    for polizas, medida in resultados.items():
+        print(
+            f"{int(polizas):>12,} {medida['herramienta_p50_ms']:>14.2f}ms {medida['herramienta_p95_ms']:>14.2f}ms "
+            f"{medida['sin_indice_p50_ms']:>13.2f}ms"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"dias": args.dias, "limite": args.limite, "resultados": resultados}, f, indent=2)
+        print(f"\n📁 Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
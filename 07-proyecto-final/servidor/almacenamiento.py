@@ -0,0 +1,109 @@
+"""
+Perfiles de almacenamiento SQLite para la base de datos de seguros.
+Agrupan el modo de journal, el tamaño de caché, mmap y busy_timeout en una sola configuración.
+"""
+
+import os
+import sqlite3
+from dataclasses import dataclass, replace
+from typing import Any, Dict
+
+
+@dataclass(frozen=True)
+class PerfilAlmacenamiento:
+    """
+    Configuración de PRAGMAs aplicada al iniciar el servidor y en cada conexión.
+
+    `journal_mode` es persistente en el archivo y solo se fija al arrancar;
+    el resto de valores son por conexión y los aplica el pool al abrirlas.
+    """
+
+    nombre: str
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    cache_size_kib: int = 65536
+    mmap_size: int = 256 * 1024 * 1024
+    busy_timeout_ms: int = 5000
+    temp_store: str = "MEMORY"
+
+    def pragmas_conexion(self) -> Dict[str, Any]:
+        """
+        PRAGMAs que deben ejecutarse en cada conexión nueva.
+
+        Returns:
+            Diccionario nombre -> valor listo para `PoolConexiones(pragmas=...)`
+        """
+        return {
+            "busy_timeout": self.busy_timeout_ms,
+            "synchronous": self.synchronous,
+            # Un valor negativo indica el tamaño en KiB en lugar de páginas
+            "cache_size": -self.cache_size_kib,
+            "mmap_size": self.mmap_size,
+            "temp_store": self.temp_store,
+        }
+
+    def aplicar(self, conn: sqlite3.Connection) -> str:
+        """
+        Aplica el perfil completo a una conexión de escritura.
+
+        Args:
+            conn: Conexión con permisos de escritura sobre la base de datos
+
+        Returns:
+            Modo de journal efectivo reportado por SQLite
+        """
+        modo = conn.execute(f"PRAGMA journal_mode = {self.journal_mode}").fetchone()[0]
+        for nombre, valor in self.pragmas_conexion().items():
+            conn.execute(f"PRAGMA {nombre} = {valor}")
+        return modo
+
+
+PERFILES: Dict[str, PerfilAlmacenamiento] = {
+    # Comportamiento por defecto de SQLite: rollback journal, sin mmap y caché de 2 MiB
+    "clasico": PerfilAlmacenamiento(
+        nombre="clasico",
+        journal_mode="DELETE",
+        synchronous="FULL",
+        cache_size_kib=2000,
+        mmap_size=0,
+        temp_store="DEFAULT",
+    ),
+    # WAL: los lectores no se bloquean mientras hay una escritura en curso
+    "wal": PerfilAlmacenamiento(nombre="wal"),
+    # WAL con caché y mmap amplios para bases de datos de millones de filas
+    "rendimiento": PerfilAlmacenamiento(
+        nombre="rendimiento",
+        cache_size_kib=262144,
+        mmap_size=1024 * 1024 * 1024,
+        busy_timeout_ms=10000,
+    ),
+}
+
+
+def perfil_desde_entorno() -> PerfilAlmacenamiento:
+    """
+    Construye el perfil activo a partir de las variables de entorno.
+
+    `SEGUROS_PERFIL` elige un perfil base de `PERFILES` y las variables
+    `SEGUROS_CACHE_KIB`, `SEGUROS_MMAP_BYTES` y `SEGUROS_BUSY_TIMEOUT_MS`
+    permiten ajustar valores individuales.
+
+    Returns:
+        Perfil de almacenamiento a utilizar
+    """
+    nombre = os.getenv("SEGUROS_PERFIL", "wal")
+    if nombre not in PERFILES:
+        raise ValueError(
+            f"Perfil de almacenamiento desconocido: {nombre}. "
+            f"Opciones: {', '.join(PERFILES)}"
+        )
+
+    ajustes: Dict[str, Any] = {}
+    if os.getenv("SEGUROS_CACHE_KIB"):
+        ajustes["cache_size_kib"] = int(os.environ["SEGUROS_CACHE_KIB"])
+    if os.getenv("SEGUROS_MMAP_BYTES"):
+        ajustes["mmap_size"] = int(os.environ["SEGUROS_MMAP_BYTES"])
+    if os.getenv("SEGUROS_BUSY_TIMEOUT_MS"):
+        ajustes["busy_timeout_ms"] = int(os.environ["SEGUROS_BUSY_TIMEOUT_MS"])
+
+    return replace(PERFILES[nombre], **ajustes)
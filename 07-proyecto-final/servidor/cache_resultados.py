@@ -0,0 +1,198 @@
+"""
+Caché de resultados para las herramientas de consulta del servidor de seguros.
+LRU con expiración (TTL), indexada por herramienta y argumentos, con invalidación por tabla.
+"""
+
+import functools
+import inspect
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+
+Clave = Tuple[str, str]
+
+
+class CacheResultados:
+    """
+    Caché LRU thread-safe de resultados de herramientas.
+
+    Cada entrada registra las tablas de las que depende; `invalidar(tabla)` elimina
+    todas las entradas que leyeron esa tabla. Un acierto devuelve el objeto ya
+    construido, sin ejecutar SQL ni volver a armar los diccionarios.
+
+    Cada tabla tiene además un número de generación que `invalidar` incrementa. Una
+    consulta anota las generaciones antes de ejecutarse y su resultado no se guarda
+    si alguna cambió mientras tanto: puede ser anterior a la escritura.
+    """
+
+    def __init__(self, capacidad: int = 1024, ttl: float = 300.0):
+        """
+        Args:
+            capacidad: Número máximo de entradas; al superarlo se expulsa la menos usada
+            ttl: Segundos de validez de cada entrada (0 desactiva la caché)
+        """
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self._entradas: "OrderedDict[Clave, Tuple[float, Any, Tuple[str, ...]]]" = OrderedDict()
+        self._por_tabla: Dict[str, Set[Clave]] = {}
+        self._generaciones: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._metricas = {
+            "aciertos": 0,
+            "fallos": 0,
+            "expulsiones": 0,
+            "expiradas": 0,
+            "invalidaciones": 0,
+            "descartadas": 0,
+        }
+
+    @property
+    def activa(self) -> bool:
+        return self.capacidad > 0 and self.ttl > 0
+
+    def _quitar(self, clave: Clave):
+        """Elimina una entrada y sus referencias por tabla (requiere el lock)"""
+        _, _, tablas = self._entradas.pop(clave)
+        for tabla in tablas:
+            claves = self._por_tabla.get(tabla)
+            if claves is not None:
+                claves.discard(clave)
+
+    def obtener(self, clave: Clave) -> Tuple[bool, Any]:
+        """
+        Busca una entrada vigente.
+
+        Returns:
+            Tupla (encontrada, valor)
+        """
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                self._metricas["fallos"] += 1
+                return False, None
+            expira, valor, _ = entrada
+            if expira < time.monotonic():
+                self._quitar(clave)
+                self._metricas["expiradas"] += 1
+                self._metricas["fallos"] += 1
+                return False, None
+            self._entradas.move_to_end(clave)
+            self._metricas["aciertos"] += 1
+            return True, valor
+
+    def generacion(self, tablas: Tuple[str, ...]) -> Tuple[int, ...]:
+        """Generación actual de cada tabla, para anotarla antes de ejecutar una consulta"""
+        with self._lock:
+            return tuple(self._generaciones.get(tabla, 0) for tabla in tablas)
+
+    def guardar(
+        self,
+        clave: Clave,
+        valor: Any,
+        tablas: Tuple[str, ...],
+        generacion: Optional[Tuple[int, ...]] = None,
+    ):
+        """
+        Guarda un resultado asociado a las tablas de las que depende.
+
+        Args:
+            generacion: Generaciones de `tablas` anotadas antes de la consulta; si alguna
+                tabla se invalidó después, el resultado se descarta
+        """
+        with self._lock:
+            if generacion is not None and generacion != tuple(self._generaciones.get(t, 0) for t in tablas):
+                self._metricas["descartadas"] += 1
+                return
+            if clave in self._entradas:
+                self._quitar(clave)
+            self._entradas[clave] = (time.monotonic() + self.ttl, valor, tablas)
+            for tabla in tablas:
+                self._por_tabla.setdefault(tabla, set()).add(clave)
+            while len(self._entradas) > self.capacidad:
+                antigua = next(iter(self._entradas))
+                self._quitar(antigua)
+                self._metricas["expulsiones"] += 1
+
+    def invalidar(self, *tablas: str) -> int:
+        """
+        Elimina las entradas que dependen de alguna de las tablas indicadas.
+
+        Args:
+            tablas: Nombres de las tablas modificadas
+
+        Returns:
+            Número de entradas eliminadas
+        """
+        with self._lock:
+            claves = set()
+            for tabla in tablas:
+                self._generaciones[tabla] = self._generaciones.get(tabla, 0) + 1
+                claves |= self._por_tabla.pop(tabla, set())
+            for clave in claves:
+                if clave in self._entradas:
+                    self._quitar(clave)
+            self._metricas["invalidaciones"] += len(claves)
+            return len(claves)
+
+    def limpiar(self):
+        """Vacía la caché por completo"""
+        with self._lock:
+            self._entradas.clear()
+            self._por_tabla.clear()
+
+    def cachear(self, tablas: Iterable[str]) -> Callable:
+        """
+        Decorador que cachea el resultado de una herramienta.
+
+        La clave combina el nombre de la función con sus argumentos normalizados
+        (posicionales y por defecto resueltos), de modo que `f(1)` y `f(id=1)`
+        comparten entrada.
+
+        Args:
+            tablas: Tablas que lee la herramienta; un cambio en ellas invalida el resultado
+        """
+        tablas = tuple(tablas)
+
+        def decorador(func: Callable) -> Callable:
+            firma = inspect.signature(func)
+
+            @functools.wraps(func)
+            def envoltura(*args, **kwargs):
+                if not self.activa:
+                    return func(*args, **kwargs)
+                argumentos = firma.bind(*args, **kwargs)
+                argumentos.apply_defaults()
+                clave = (
+                    func.__name__,
+                    json.dumps(argumentos.arguments, sort_keys=True, default=str),
+                )
+                encontrada, valor = self.obtener(clave)
+                if encontrada:
+                    return valor
+                generacion = self.generacion(tablas)
+                valor = func(*args, **kwargs)
+                self.guardar(clave, valor, tablas, generacion)
+                return valor
+
+            return envoltura
+
+        return decorador
+
+    def metricas(self) -> Dict[str, Any]:
+        """
+        Devuelve los contadores de uso de la caché.
+
+        Returns:
+            Diccionario con aciertos, fallos, expulsiones, expiradas, invalidaciones, resultados
+            descartados por una invalidación durante la consulta y tamaño
+        """
+        with self._lock:
+            metricas = dict(self._metricas)
+            metricas["entradas"] = len(self._entradas)
+        metricas["capacidad"] = self.capacidad
+        metricas["ttl_segundos"] = self.ttl
+        consultas = metricas["aciertos"] + metricas["fallos"]
+        metricas["tasa_aciertos"] = metricas["aciertos"] / consultas if consultas else 0.0
+        return metricas
@@ -0,0 +1,141 @@
+"""
+Capa de consultas compartida por las herramientas del servidor de seguros.
+Convierte filas en diccionarios según los nombres de columna, genera JSON directamente en SQLite
+y construye la proyección de columnas pedida por cada llamada.
+"""
+
+import sqlite3
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Campo de respuesta -> (expresión SQL, alias de la tabla unida que necesita o None)
+Catalogo = Dict[str, Tuple[str, Optional[str]]]
+
+
+def _diccionarios(nombres: Tuple[str, ...], leidas: List[tuple]) -> List[Dict[str, Any]]:
+    """Convierte filas en diccionarios con los nombres de columna como claves"""
+    return [dict(zip(nombres, f)) for f in leidas]
+
+
+def columnas(cursor: sqlite3.Cursor) -> Tuple[str, ...]:
+    """Nombres de las columnas de la última consulta (los alias de `AS`)"""
+    return tuple(d[0] for d in cursor.description)
+
+
+def filas(cursor: sqlite3.Cursor, limite: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Lee las filas pendientes de un cursor como diccionarios indexados por nombre de columna.
+
+    Args:
+        cursor: Cursor con una consulta ejecutada; cada columna debe tener un nombre único
+        limite: Lee como máximo este número de filas (por defecto todas)
+    """
+    leidas = cursor.fetchall() if limite is None else cursor.fetchmany(limite)
+    return _diccionarios(columnas(cursor), leidas)
+
+
+def fila(cursor: sqlite3.Cursor) -> Optional[Dict[str, Any]]:
+    """Lee la siguiente fila de un cursor como diccionario, o None si no quedan filas"""
+    leida = cursor.fetchone()
+    if leida is None:
+        return None
+    return dict(zip(columnas(cursor), leida))
+
+
+def lotes(cursor: sqlite3.Cursor, tamano: int) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Recorre las filas pendientes de un cursor en listas de como máximo `tamano` diccionarios.
+
+    Solo hay un lote en memoria a la vez: sirve para transmitir resultados de cualquier tamaño.
+    """
+    nombres = columnas(cursor)
+    while True:
+        leidas = cursor.fetchmany(tamano)
+        if not leidas:
+            return
+        yield _diccionarios(nombres, leidas)
+
+
+def proyeccion(
+    catalogo: Catalogo,
+    uniones: Dict[str, str],
+    campos: Optional[Sequence[str]],
+    por_defecto: Sequence[str],
+    obligatorios: Sequence[str] = (),
+    unir: Sequence[str] = (),
+) -> Tuple[str, str]:
+    """
+    Construye la lista de columnas y los JOIN necesarios para devolver solo los campos pedidos.
+
+    Los campos salen siempre en el orden del catálogo, de modo que la misma selección produce
+    el mismo texto SQL (y reutiliza la sentencia preparada) sea cual sea el orden pedido.
+
+    Args:
+        catalogo: Campos que se pueden pedir, con su expresión y la tabla unida que requieren
+        uniones: Alias de tabla -> cláusula JOIN, en el orden en que deben aparecer
+        campos: Campos pedidos; None devuelve `por_defecto`
+        por_defecto: Campos de la respuesta cuando no se indica `campos`
+        obligatorios: Campos que se añaden siempre (por ejemplo la clave del cursor)
+        unir: Alias que se unen aunque ningún campo los necesite (por ejemplo para filtrar)
+
+    Returns:
+        Tupla (columnas del SELECT con sus alias, cláusulas JOIN separadas por saltos de línea)
+
+    Raises:
+        ValueError: Si `campos` está vacío o contiene campos desconocidos
+    """
+    if campos is None:
+        campos = por_defecto
+    elif not campos:
+        raise ValueError("`campos` debe contener al menos un campo")
+    desconocidos = [campo for campo in campos if campo not in catalogo]
+    if desconocidos:
+        raise ValueError(f"Campos desconocidos {desconocidos}; opciones: {list(catalogo)}")
+
+    elegidos = set(campos) | set(obligatorios)
+    nombres = [nombre for nombre in catalogo if nombre in elegidos]
+    necesarios = {catalogo[nombre][1] for nombre in nombres} | set(unir)
+    columnas = ", ".join(f"{catalogo[nombre][0]} AS {nombre}" for nombre in nombres)
+    return columnas, "\n".join(union for alias, union in uniones.items() if alias in necesarios)
+
+
+# Consulta JSON ya construida por cada consulta original. Con las proyecciones hay una consulta por
+# combinación de campos, así que se descartan las más antiguas al pasar de CONSULTAS_JSON_MAXIMAS.
+# Las herramientas corren en varios hilos del ejecutor: el lock protege la lectura y el descarte
+CONSULTAS_JSON_MAXIMAS = 512
+_consultas_json: Dict[str, str] = {}
+_lock_consultas_json = threading.Lock()
+
+
+def _sql_json(sql: str, nombres: Tuple[str, ...]) -> str:
+    """Envuelve una consulta para que SQLite devuelva todas sus filas como un array JSON"""
+    pares = ", ".join(f"'{nombre}', \"{nombre}\"" for nombre in nombres)
+    # La subconsulta conserva su ORDER BY: json_group_array agrega las filas en ese orden
+    return f"SELECT COALESCE(json_group_array(json_object({pares})), '[]') FROM ({sql})"
+
+
+def json_filas(conn: sqlite3.Connection, sql: str, parametros: Sequence[Any] = ()) -> str:
+    """
+    Ejecuta una consulta y devuelve sus filas ya serializadas como array JSON de objetos.
+
+    SQLite construye el texto con `json_group_array(json_object(...))`, sin crear tuplas ni
+    diccionarios de Python ni pasar por `json.dumps`. Las claves son los nombres de columna.
+
+    Args:
+        conn: Conexión SQLite
+        sql: Consulta SELECT con nombres de columna únicos
+        parametros: Parámetros posicionales de la consulta
+    """
+    with _lock_consultas_json:
+        consulta = _consultas_json.get(sql)
+    if consulta is None:
+        # Solo la primera vez: LIMIT 0 no lee filas y basta para conocer los nombres de columna
+        nombres = columnas(conn.execute(f"SELECT * FROM ({sql}) LIMIT 0", parametros))
+        if not all(nombre.isidentifier() for nombre in nombres):
+            raise ValueError(f"Las columnas deben tener nombres simples (usa AS): {nombres}")
+        consulta = _sql_json(sql, nombres)
+        with _lock_consultas_json:
+            if sql not in _consultas_json and len(_consultas_json) >= CONSULTAS_JSON_MAXIMAS:
+                del _consultas_json[next(iter(_consultas_json))]
+            _consultas_json[sql] = consulta
+    return conn.execute(consulta, parametros).fetchone()[0]
@@ -0,0 +1,163 @@
+"""
+Ejecutor dedicado para el acceso a SQLite desde herramientas asíncronas.
+Las consultas corren en un grupo fijo de hilos y el event loop queda libre para atender otras peticiones.
+"""
+
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class EjecutorSaturadoError(RuntimeError):
+    """Se lanza cuando la cola de consultas pendientes está llena"""
+
+
+class EjecutorBD:
+    """
+    Ejecuta funciones bloqueantes de base de datos en hilos propios.
+
+    Como máximo `hilos` consultas corren a la vez y `cola_maxima` esperan turno;
+    las peticiones que no caben se rechazan de inmediato con EjecutorSaturadoError
+    en lugar de acumularse sin límite. Con `hilos=0` la función se ejecuta en el
+    propio event loop (el comportamiento bloqueante, útil solo para comparar).
+    """
+
+    def __init__(self, hilos: int = 5, cola_maxima: int = 100):
+        """
+        Args:
+            hilos: Hilos dedicados a SQLite; conviene igualarlo al tamaño del pool de conexiones
+            cola_maxima: Consultas que pueden esperar un hilo libre antes de rechazar nuevas
+        """
+        if hilos < 0 or cola_maxima < 0:
+            raise ValueError("hilos y cola_maxima no pueden ser negativos")
+
+        self.hilos = hilos
+        self.cola_maxima = cola_maxima
+        self._executor = (
+            ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="bd") if hilos else None
+        )
+        self._cupos = threading.BoundedSemaphore(hilos + cola_maxima) if hilos else None
+        self._lock = threading.Lock()
+        self._primer_uso: Optional[Callable[[], Any]] = None
+        self._lock_primer_uso = threading.Lock()
+        self._en_cola = 0
+        self._en_curso = 0
+        self._metricas = {
+            "completadas": 0,
+            "rechazadas": 0,
+            "canceladas": 0,
+            "espera_cola_total_ms": 0.0,
+            "max_en_cola": 0,
+        }
+
+    def al_primer_uso(self, func: Callable[[], Any]):
+        """
+        Registra una función que se ejecuta una sola vez, en un hilo de base de datos, antes de
+        la primera tarea (por ejemplo, `init_database`). Si falla, la tarea que la disparó recibe
+        el error y la siguiente vuelve a intentarlo.
+
+        Args:
+            func: Función sin argumentos
+        """
+        self._primer_uso = func
+
+    def _preparar(self):
+        """Ejecuta la función de primer uso pendiente; las tareas concurrentes esperan a que termine"""
+        if self._primer_uso is None:
+            return
+        with self._lock_primer_uso:
+            func = self._primer_uso
+            if func is not None:
+                func()
+                self._primer_uso = None
+
+    def _ejecutar_en_hilo(self, encolada: float, func: Callable, args, kwargs) -> Any:
+        """Cuerpo de cada tarea: registra la espera en cola y libera el cupo al terminar"""
+        with self._lock:
+            self._en_cola -= 1
+            self._en_curso += 1
+            self._metricas["espera_cola_total_ms"] += (time.perf_counter() - encolada) * 1000
+        try:
+            self._preparar()
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._en_curso -= 1
+                self._metricas["completadas"] += 1
+            self._cupos.release()
+
+    def _al_terminar(self, futuro: Future):
+        """Devuelve el cupo de una tarea cancelada antes de empezar: su cuerpo no llegó a ejecutarse"""
+        if not futuro.cancelled():
+            return
+        with self._lock:
+            self._en_cola -= 1
+            self._metricas["canceladas"] += 1
+        self._cupos.release()
+
+    async def ejecutar(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Ejecuta `func(*args, **kwargs)` en un hilo de base de datos y espera su resultado.
+
+        Raises:
+            EjecutorSaturadoError: Si ya hay `hilos + cola_maxima` consultas pendientes
+        """
+        if self._executor is None:
+            self._preparar()
+            return func(*args, **kwargs)
+
+        if not self._cupos.acquire(blocking=False):
+            with self._lock:
+                self._metricas["rechazadas"] += 1
+            raise EjecutorSaturadoError(
+                f"Servidor saturado: {self.hilos + self.cola_maxima} consultas pendientes, reintenta más tarde"
+            )
+        with self._lock:
+            self._en_cola += 1
+            self._metricas["max_en_cola"] = max(self._metricas["max_en_cola"], self._en_cola)
+
+        # Si quien espera se cancela (cliente desconectado, timeout del agente) con la tarea aún en
+        # cola, el executor la descarta sin ejecutarla: el cupo se devuelve al cancelarse el futuro
+        futuro = self._executor.submit(self._ejecutar_en_hilo, time.perf_counter(), func, args, kwargs)
+        futuro.add_done_callback(self._al_terminar)
+        return await asyncio.wrap_future(futuro)
+
+    def asincrono(self, func: Callable) -> Callable:
+        """
+        Decorador que convierte una herramienta síncrona en asíncrona ejecutada en este ejecutor.
+
+        Conserva nombre, docstring y firma, de modo que FastMCP genera el mismo esquema.
+        """
+        @functools.wraps(func)
+        async def envoltura(*args, **kwargs):
+            return await self.ejecutar(func, *args, **kwargs)
+
+        return envoltura
+
+    def metricas(self) -> Dict[str, Any]:
+        """
+        Devuelve el estado y los contadores del ejecutor.
+
+        Returns:
+            Diccionario con consultas en curso y en cola, completadas, rechazadas, canceladas en cola
+            y espera media en cola
+        """
+        with self._lock:
+            metricas = dict(self._metricas)
+            metricas["en_curso"] = self._en_curso
+            metricas["en_cola"] = self._en_cola
+        metricas["hilos"] = self.hilos
+        metricas["primer_uso_pendiente"] = self._primer_uso is not None
+        metricas["cola_maxima"] = self.cola_maxima
+        metricas["espera_cola_promedio_ms"] = (
+            metricas["espera_cola_total_ms"] / metricas["completadas"] if metricas["completadas"] else 0.0
+        )
+        return metricas
+
+    def cerrar(self):
+        """Espera a que terminen las consultas en curso y libera los hilos"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
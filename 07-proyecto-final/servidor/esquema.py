@@ -0,0 +1,254 @@
+"""
+Migraciones de esquema para la base de datos de seguros.
+Cada migración se aplica una sola vez y la versión actual se guarda en `PRAGMA user_version`.
+"""
+
+import sqlite3
+from typing import List, Tuple
+
+# Grupo de resumen de una póliza: tipo de su producto y ciudad de su cliente ('' si no existen)
+_TIPO = "COALESCE((SELECT tipo FROM productos_seguros WHERE id = {p}.producto_id), '')"
+_CIUDAD = "COALESCE((SELECT ciudad FROM clientes WHERE id = {p}.cliente_id), '')"
+_CLAVE_RESUMEN = (
+    "tipo = " + _TIPO + " AND ciudad = " + _CIUDAD
+    + " AND estado = {p}.estado AND mes = substr({p}.fecha_inicio, 1, 7)"
+)
+
+
+def _sumar_poliza(p: str) -> str:
+    """Suma la póliza `p` (new u old dentro de un trigger) a su grupo de resumen"""
+    return f"""INSERT INTO resumen_polizas (tipo, ciudad, estado, mes, polizas, prima_total, cobertura_total)
+                VALUES ({_TIPO.format(p=p)}, {_CIUDAD.format(p=p)}, {p}.estado, substr({p}.fecha_inicio, 1, 7),
+                        1, {p}.prima_mensual, {p}.monto_cobertura)
+                ON CONFLICT DO UPDATE SET polizas = polizas + 1,
+                    prima_total = prima_total + excluded.prima_total,
+                    cobertura_total = cobertura_total + excluded.cobertura_total;"""
+
+
+def _restar_poliza(p: str) -> str:
+    """Resta la póliza `p` de su grupo de resumen y elimina el grupo si queda vacío"""
+    clave = _CLAVE_RESUMEN.format(p=p)
+    return f"""UPDATE resumen_polizas SET polizas = polizas - 1,
+                    prima_total = prima_total - {p}.prima_mensual,
+                    cobertura_total = cobertura_total - {p}.monto_cobertura
+                WHERE {clave};
+                DELETE FROM resumen_polizas WHERE {clave} AND polizas = 0;"""
+
+
+def _mover_grupos(filtro: str, tipo_anterior: str, ciudad_anterior: str, tipo_nuevo: str, ciudad_nuevo: str) -> str:
+    """Traslada los agregados de las pólizas que cumplen `filtro` de un grupo de resumen a otro"""
+    grupos = """SELECT {tipo} AS tipo, {ciudad} AS ciudad, p.estado AS estado, substr(p.fecha_inicio, 1, 7) AS mes,
+                       COUNT(*) AS polizas, SUM(p.prima_mensual) AS prima_total, SUM(p.monto_cobertura) AS cobertura_total
+                FROM polizas p WHERE {filtro} GROUP BY 1, 2, 3, 4"""
+    return f"""UPDATE resumen_polizas SET polizas = resumen_polizas.polizas - g.polizas,
+                    prima_total = resumen_polizas.prima_total - g.prima_total,
+                    cobertura_total = resumen_polizas.cobertura_total - g.cobertura_total
+                FROM ({grupos.format(tipo=tipo_anterior, ciudad=ciudad_anterior, filtro=filtro)}) AS g
+                WHERE resumen_polizas.tipo = g.tipo AND resumen_polizas.ciudad = g.ciudad
+                  AND resumen_polizas.estado = g.estado AND resumen_polizas.mes = g.mes;
+                INSERT INTO resumen_polizas (tipo, ciudad, estado, mes, polizas, prima_total, cobertura_total)
+                {grupos.format(tipo=tipo_nuevo, ciudad=ciudad_nuevo, filtro=filtro)}
+                ON CONFLICT DO UPDATE SET polizas = polizas + excluded.polizas,
+                    prima_total = prima_total + excluded.prima_total,
+                    cobertura_total = cobertura_total + excluded.cobertura_total;
+                DELETE FROM resumen_polizas WHERE polizas = 0;"""
+
+
+# Recalcula la tabla de resumen completa a partir de las pólizas
+SQL_RECONSTRUIR_RESUMEN = [
+    "DELETE FROM resumen_polizas",
+    f"""INSERT INTO resumen_polizas (tipo, ciudad, estado, mes, polizas, prima_total, cobertura_total)
+    SELECT {_TIPO.format(p="p")}, {_CIUDAD.format(p="p")}, p.estado, substr(p.fecha_inicio, 1, 7),
+           COUNT(*), SUM(p.prima_mensual), SUM(p.monto_cobertura)
+    FROM polizas p GROUP BY 1, 2, 3, 4""",
+]
+
+# (versión, descripción, sentencias SQL)
+MIGRACIONES: List[Tuple[int, str, List[str]]] = [
+    (
+        1,
+        "Índices secundarios para búsquedas por cliente, tipo de seguro y ciudad",
+        [
+            # buscar_polizas_por_cliente: filtra por cliente y ordena por fecha_inicio
+            "CREATE INDEX IF NOT EXISTS idx_polizas_cliente_inicio "
+            "ON polizas (cliente_id, fecha_inicio)",
+            # buscar_polizas_por_tipo: une productos del tipo con sus pólizas por prima
+            "CREATE INDEX IF NOT EXISTS idx_polizas_producto_prima "
+            "ON polizas (producto_id, prima_mensual)",
+            # Cubre (id, nombre, tipo) para el JOIN sin leer la tabla de productos
+            "CREATE INDEX IF NOT EXISTS idx_productos_tipo "
+            "ON productos_seguros (tipo COLLATE NOCASE, nombre)",
+            # buscar_clientes_por_ciudad: LIKE por prefijo insensible a mayúsculas
+            "CREATE INDEX IF NOT EXISTS idx_clientes_ciudad_nombre "
+            "ON clientes (ciudad COLLATE NOCASE, nombre)",
+        ],
+    ),
+    (
+        2,
+        "Índice por nombre para paginar clientes por (nombre, id)",
+        [
+            "CREATE INDEX IF NOT EXISTS idx_clientes_nombre ON clientes (nombre)",
+        ],
+    ),
+    (
+        3,
+        "Índices FTS5 de clientes y productos sincronizados por triggers",
+        [
+            # Tablas de contenido externo: el índice guarda solo los tokens, no copia las filas
+            "CREATE VIRTUAL TABLE IF NOT EXISTS clientes_fts USING fts5("
+            "nombre, email, ciudad, content='clientes', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2')",
+            """CREATE TRIGGER IF NOT EXISTS clientes_fts_ai AFTER INSERT ON clientes BEGIN
+                INSERT INTO clientes_fts (rowid, nombre, email, ciudad)
+                VALUES (new.id, new.nombre, new.email, new.ciudad);
+            END""",
+            """CREATE TRIGGER IF NOT EXISTS clientes_fts_ad AFTER DELETE ON clientes BEGIN
+                INSERT INTO clientes_fts (clientes_fts, rowid, nombre, email, ciudad)
+                VALUES ('delete', old.id, old.nombre, old.email, old.ciudad);
+            END""",
+            """CREATE TRIGGER IF NOT EXISTS clientes_fts_au AFTER UPDATE OF nombre, email, ciudad ON clientes BEGIN
+                INSERT INTO clientes_fts (clientes_fts, rowid, nombre, email, ciudad)
+                VALUES ('delete', old.id, old.nombre, old.email, old.ciudad);
+                INSERT INTO clientes_fts (rowid, nombre, email, ciudad)
+                VALUES (new.id, new.nombre, new.email, new.ciudad);
+            END""",
+            "CREATE VIRTUAL TABLE IF NOT EXISTS productos_seguros_fts USING fts5("
+            "nombre, tipo, descripcion, content='productos_seguros', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2')",
+            """CREATE TRIGGER IF NOT EXISTS productos_seguros_fts_ai AFTER INSERT ON productos_seguros BEGIN
+                INSERT INTO productos_seguros_fts (rowid, nombre, tipo, descripcion)
+                VALUES (new.id, new.nombre, new.tipo, new.descripcion);
+            END""",
+            """CREATE TRIGGER IF NOT EXISTS productos_seguros_fts_ad AFTER DELETE ON productos_seguros BEGIN
+                INSERT INTO productos_seguros_fts (productos_seguros_fts, rowid, nombre, tipo, descripcion)
+                VALUES ('delete', old.id, old.nombre, old.tipo, old.descripcion);
+            END""",
+            """CREATE TRIGGER IF NOT EXISTS productos_seguros_fts_au
+            AFTER UPDATE OF nombre, tipo, descripcion ON productos_seguros BEGIN
+                INSERT INTO productos_seguros_fts (productos_seguros_fts, rowid, nombre, tipo, descripcion)
+                VALUES ('delete', old.id, old.nombre, old.tipo, old.descripcion);
+                INSERT INTO productos_seguros_fts (rowid, nombre, tipo, descripcion)
+                VALUES (new.id, new.nombre, new.tipo, new.descripcion);
+            END""",
+            # Indexa las filas que ya existían antes de la migración
+            "INSERT INTO clientes_fts (clientes_fts) VALUES ('rebuild')",
+            "INSERT INTO productos_seguros_fts (productos_seguros_fts) VALUES ('rebuild')",
+        ],
+    ),
+    (
+        4,
+        "Resumen de la cartera por tipo, ciudad, estado y mes mantenido por triggers",
+        [
+            # Una fila por grupo: su tamaño depende del número de combinaciones, no de las pólizas
+            """CREATE TABLE IF NOT EXISTS resumen_polizas (
+                tipo TEXT NOT NULL,
+                ciudad TEXT NOT NULL,
+                estado TEXT NOT NULL,
+                mes TEXT NOT NULL,
+                polizas INTEGER NOT NULL,
+                prima_total REAL NOT NULL,
+                cobertura_total REAL NOT NULL,
+                PRIMARY KEY (tipo, ciudad, estado, mes)
+            ) WITHOUT ROWID""",
+            f"""CREATE TRIGGER IF NOT EXISTS resumen_polizas_ai AFTER INSERT ON polizas BEGIN
+                {_sumar_poliza("new")}
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS resumen_polizas_ad AFTER DELETE ON polizas BEGIN
+                {_restar_poliza("old")}
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS resumen_polizas_au
+            AFTER UPDATE OF cliente_id, producto_id, fecha_inicio, prima_mensual, monto_cobertura, estado ON polizas BEGIN
+                {_restar_poliza("old")}
+                {_sumar_poliza("new")}
+            END""",
+            # Cambiar la ciudad de un cliente o el tipo de un producto mueve sus pólizas de grupo
+            f"""CREATE TRIGGER IF NOT EXISTS resumen_clientes_au
+            AFTER UPDATE OF ciudad ON clientes WHEN old.ciudad IS NOT new.ciudad BEGIN
+                {_mover_grupos("p.cliente_id = old.id", _TIPO.format(p="p"), "COALESCE(old.ciudad, '')",
+                               _TIPO.format(p="p"), "COALESCE(new.ciudad, '')")}
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS resumen_clientes_ad AFTER DELETE ON clientes BEGIN
+                {_mover_grupos("p.cliente_id = old.id", _TIPO.format(p="p"), "COALESCE(old.ciudad, '')",
+                               _TIPO.format(p="p"), "''")}
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS resumen_productos_au
+            AFTER UPDATE OF tipo ON productos_seguros WHEN old.tipo IS NOT new.tipo BEGIN
+                {_mover_grupos("p.producto_id = old.id", "old.tipo", _CIUDAD.format(p="p"),
+                               "new.tipo", _CIUDAD.format(p="p"))}
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS resumen_productos_ad AFTER DELETE ON productos_seguros BEGIN
+                {_mover_grupos("p.producto_id = old.id", "old.tipo", _CIUDAD.format(p="p"),
+                               "''", _CIUDAD.format(p="p"))}
+            END""",
+            *SQL_RECONSTRUIR_RESUMEN,
+        ],
+    ),
+    (
+        5,
+        "Índice por estado y fecha de vencimiento para las pólizas por vencer",
+        [
+            # polizas_por_vencer: rango de fechas dentro de un estado, ya ordenado por (fecha, id)
+            "CREATE INDEX IF NOT EXISTS idx_polizas_estado_vencimiento "
+            "ON polizas (estado, fecha_vencimiento)",
+        ],
+    ),
+]
+
+# Índices de texto completo que se reconstruyen tras una carga masiva sin triggers
+TABLAS_FTS = ["clientes_fts", "productos_seguros_fts"]
+
+
+def version_esquema(conn: sqlite3.Connection) -> int:
+    """Devuelve la versión de esquema registrada en la base de datos"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrar_esquema(conn: sqlite3.Connection) -> int:
+    """
+    Aplica en orden las migraciones pendientes, cada una en su propia transacción.
+
+    Args:
+        conn: Conexión con permisos de escritura
+
+    Returns:
+        Versión de esquema tras aplicar las migraciones
+    """
+    actual = version_esquema(conn)
+    for version, descripcion, sentencias in MIGRACIONES:
+        if version <= actual:
+            continue
+        conn.execute("BEGIN")
+        try:
+            for sentencia in sentencias:
+                conn.execute(sentencia)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        print(f"✅ Migración {version} aplicada: {descripcion}")
+        actual = version
+    return actual
+
+
+def objetos_derivados(conn: sqlite3.Connection) -> List[Tuple[str, str, str]]:
+    """
+    Lista los índices y triggers creados explícitamente (excluye los automáticos de UNIQUE/PK).
+
+    Las cargas masivas los eliminan antes de insertar y los recrean al final.
+
+    Returns:
+        Lista de tuplas (tipo, nombre, sentencia CREATE)
+    """
+    return conn.execute(
+        "SELECT type, name, sql FROM sqlite_master "
+        "WHERE type IN ('index', 'trigger') AND sql IS NOT NULL ORDER BY type, name"
+    ).fetchall()
+
+
+def reconstruir_derivados(conn: sqlite3.Connection):
+    """Recalcula los datos mantenidos por triggers tras una carga con los triggers eliminados"""
+    for tabla in TABLAS_FTS:
+        conn.execute(f"INSERT INTO {tabla} ({tabla}) VALUES ('rebuild')")
+    for sentencia in SQL_RECONSTRUIR_RESUMEN:
+        conn.execute(sentencia)
@@ -0,0 +1,235 @@
+"""
+Generador de datos sintéticos para la base de datos de seguros.
+Crea N clientes y M pólizas reproducibles (misma semilla, mismos datos) para medir el servidor a escala.
+
+Uso:
+    python generar_datos.py --clientes 1000000 --polizas 10000000 --semilla 42
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, timedelta
+from typing import Iterator, List, Tuple
+
+from esquema import objetos_derivados, reconstruir_derivados
+from servidor_seguros import DB_PATH, PERFIL, init_database
+
+NOMBRES = [
+    "Juan", "María", "Carlos", "Ana", "Luis", "Laura", "Andrés", "Camila", "Jorge", "Valentina",
+    "Felipe", "Daniela", "Santiago", "Paula", "Diego", "Natalia", "Sebastián", "Carolina",
+]
+APELLIDOS = [
+    "Pérez", "García", "López", "Martínez", "Rodríguez", "Fernández", "Gómez", "Díaz", "Torres",
+    "Ramírez", "Vargas", "Castro", "Rojas", "Moreno", "Jiménez", "Herrera", "Ruiz", "Ortiz",
+]
+CIUDADES = [
+    "Bogotá", "Medellín", "Cali", "Barranquilla", "Cartagena", "Bucaramanga", "Pereira",
+    "Manizales", "Santa Marta", "Cúcuta", "Ibagué", "Villavicencio",
+]
+# Estados de póliza y su peso relativo
+ESTADOS = ["Activa"] * 16 + ["Vencida"] * 3 + ["Cancelada"]
+
+TAMANO_LOTE = 100_000
+
+
+def _fechas(desde: date, dias: int) -> List[str]:
+    """Precalcula fechas ISO consecutivas para no formatear una por fila"""
+    return [(desde + timedelta(days=i)).isoformat() for i in range(dias)]
+
+
+def _filas_clientes(rng: random.Random, primer_id: int, total: int) -> Iterator[Tuple]:
+    """Genera filas de clientes con id explícito y email único"""
+    nacimientos = _fechas(date(1950, 1, 1), 50 * 365)
+    for cliente_id in range(primer_id, primer_id + total):
+        yield (
+            cliente_id,
+            f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}",
+            f"cliente{cliente_id}@sintetico.com",
+            f"+57-3{rng.randint(0, 99):02d}-{rng.randint(0, 9999999):07d}",
+            rng.choice(CIUDADES),
+            rng.choice(nacimientos),
+        )
+
+
+def _filas_polizas(
+    rng: random.Random, primer_id: int, total: int, max_cliente: int, productos: List[Tuple[int, float]]
+) -> Iterator[Tuple]:
+    """Genera filas de pólizas con número de póliza único y vigencia de un año"""
+    dias_inicio = 3 * 365
+    fechas = _fechas(date.today() - timedelta(days=dias_inicio), dias_inicio + 366)
+    for poliza_id in range(primer_id, primer_id + total):
+        producto_id, cobertura_base = rng.choice(productos)
+        inicio = rng.randrange(dias_inicio)
+        yield (
+            poliza_id,
+            f"POL-SIN-{poliza_id:010d}",
+            rng.randint(1, max_cliente),
+            producto_id,
+            fechas[inicio],
+            fechas[inicio + 365],
+            round(rng.uniform(50, 600), 2),
+            cobertura_base * rng.choice((0.5, 1, 1, 1.5, 2)),
+            rng.choice(ESTADOS),
+        )
+
+
+def _insertar_por_lotes(conn: sqlite3.Connection, sql: str, filas: Iterator[Tuple], total: int, lote: int, etiqueta: str):
+    """Inserta las filas en transacciones de `lote` filas mostrando el avance"""
+    inicio = time.perf_counter()
+    insertadas = 0
+    while insertadas < total:
+        tamano = min(lote, total - insertadas)
+        conn.execute("BEGIN")
+        conn.executemany(sql, (next(filas) for _ in range(tamano)))
+        conn.commit()
+        insertadas += tamano
+        transcurrido = time.perf_counter() - inicio
+        print(
+            f"\r   {etiqueta}: {insertadas:,}/{total:,} "
+            f"({insertadas / transcurrido:,.0f} filas/s)",
+            end="",
+            flush=True,
+        )
+    print()
+
+
+def abrir_exclusiva(db_path: str) -> sqlite3.Connection:
+    """
+    Abre la base de datos con bloqueo exclusivo, que se mantiene mientras la conexión siga abierta.
+
+    Returns:
+        Conexión en modo autocommit que ningún otro proceso puede leer ni escribir
+
+    Raises:
+        RuntimeError: Si otro proceso (por ejemplo, el servidor) tiene la base de datos abierta
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None, timeout=0)
+    try:
+        # Salir de WAL exige ser la única conexión; en modo rollback, el bloqueo exclusivo
+        # falla si alguien está leyendo o escribiendo ahora
+        conn.execute("PRAGMA journal_mode = DELETE")
+        conn.execute("PRAGMA locking_mode = EXCLUSIVE")
+        conn.execute("BEGIN EXCLUSIVE")
+        conn.execute("COMMIT")
+    except sqlite3.OperationalError as e:
+        conn.close()
+        raise RuntimeError(f"{db_path} está en uso ({e}); detén el servidor antes de generar datos") from e
+    return conn
+
+
+def generar(db_path: str, clientes: int, polizas: int, semilla: int = 42, lote: int = TAMANO_LOTE):
+    """
+    Añade clientes y pólizas sintéticos a la base de datos de seguros.
+
+    Los índices secundarios y los triggers se eliminan durante la carga y se
+    reconstruyen al final, lo que es mucho más rápido que mantenerlos fila a fila.
+    La reconstrucción y el perfil de almacenamiento se aplican aunque la carga se
+    interrumpa (Ctrl-C o error); las filas ya insertadas se conservan. La base de
+    datos queda bloqueada durante la carga, así que un servidor que la use debe estar
+    detenido, y al arrancarlo no hay resultados cacheados de antes de la carga.
+
+    Args:
+        db_path: Ruta del archivo SQLite (se crea con el esquema del servidor si no existe)
+        clientes: Número de clientes a generar
+        polizas: Número de pólizas a generar
+        semilla: Semilla del generador aleatorio
+        lote: Filas por transacción
+
+    Raises:
+        RuntimeError: Si otro proceso tiene la base de datos abierta
+    """
+    if os.path.exists(db_path):
+        abrir_exclusiva(db_path).close()
+    init_database(db_path)
+    rng = random.Random(semilla)
+
+    conn = abrir_exclusiva(db_path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -262144")
+
+    eliminados = []
+    inicio = time.perf_counter()
+    try:
+        for tipo, nombre, sql in objetos_derivados(conn):
+            conn.execute(f"DROP {tipo.upper()} {nombre}")
+            eliminados.append(sql)
+        _cargar(conn, rng, clientes, polizas, lote)
+    finally:
+        # Sin journal no hay rollback: un lote a medias se confirma y los objetos derivados se
+        # recrean sobre lo insertado, para no dejar la base sin índices, FTS ni resúmenes
+        if conn.in_transaction:
+            conn.execute("COMMIT")
+        print(f"   Reconstruyendo {len(eliminados)} índices y triggers...")
+        for sql in eliminados:
+            conn.execute(sql)
+        reconstruir_derivados(conn)
+        conn.execute("ANALYZE")
+        conn.execute("PRAGMA locking_mode = NORMAL")
+        PERFIL.aplicar(conn)
+        conn.close()
+
+    print(f"✅ Datos generados en {time.perf_counter() - inicio:,.1f}s")
+
+
+def _cargar(conn: sqlite3.Connection, rng: random.Random, clientes: int, polizas: int, lote: int):
+    """Inserta los clientes y las pólizas sintéticos a continuación de los existentes"""
+    primer_cliente = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM clientes").fetchone()[0]
+    _insertar_por_lotes(
+        conn,
+        "INSERT INTO clientes (id, nombre, email, telefono, ciudad, fecha_nacimiento) VALUES (?, ?, ?, ?, ?, ?)",
+        _filas_clientes(rng, primer_cliente, clientes),
+        clientes,
+        lote,
+        "Clientes",
+    )
+
+    max_cliente = conn.execute("SELECT MAX(id) FROM clientes").fetchone()[0]
+    productos = conn.execute("SELECT id, cobertura_base FROM productos_seguros ORDER BY id").fetchall()
+    primera_poliza = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM polizas").fetchone()[0]
+    _insertar_por_lotes(
+        conn,
+        "INSERT INTO polizas (id, numero_poliza, cliente_id, producto_id, fecha_inicio, fecha_vencimiento, "
+        "prima_mensual, monto_cobertura, estado) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        _filas_polizas(rng, primera_poliza, polizas, max_cliente, productos),
+        polizas,
+        lote,
+        "Pólizas",
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clientes", type=int, default=100_000, help="Clientes a generar")
+    parser.add_argument("--polizas", type=int, default=1_000_000, help="Pólizas a generar")
+    parser.add_argument("--semilla", type=int, default=42, help="Semilla para datos reproducibles")
+    parser.add_argument("--lote", type=int, default=TAMANO_LOTE, help="Filas por transacción")
+    parser.add_argument("--db", default=DB_PATH, help="Ruta de la base de datos")
+    parser.add_argument("--reemplazar", action="store_true", help="Elimina la base de datos existente antes de generar")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Generador de Datos Sintéticos - Aseguradora")
+    print("=" * 60 + "\n")
+
+    try:
+        if args.reemplazar:
+            if os.path.exists(args.db):
+                abrir_exclusiva(args.db).close()
+            for sufijo in ("", "-wal", "-shm"):
+                if os.path.exists(args.db + sufijo):
+                    os.remove(args.db + sufijo)
+
+        generar(args.db, args.clientes, args.polizas, args.semilla, args.lote)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print(f"📁 Base de datos: {args.db}\n")
+
+
+if __name__ == "__main__":
+    main()
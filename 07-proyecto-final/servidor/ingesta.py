@@ -0,0 +1,395 @@
+"""
+Ingesta masiva de pólizas desde archivos CSV o JSONL de los socios.
+Valida cada fila, inserta las válidas en transacciones de muchas filas y rechaza las inválidas
+una a una sin abortar el lote en el que llegaron.
+
+Uso:
+    python ingesta.py polizas.csv --lote 5000
+    python ingesta.py polizas.jsonl --rechazos rechazos.jsonl
+    cat polizas.csv | python ingesta.py - --formato csv
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import sqlite3
+import sys
+import time
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+FORMATOS = ("csv", "jsonl")
+
+# Columnas que debe traer cada fila, en el orden del INSERT
+COLUMNAS = (
+    "numero_poliza", "cliente_id", "producto_id", "fecha_inicio",
+    "fecha_vencimiento", "prima_mensual", "monto_cobertura", "estado",
+)
+ESTADOS = ("Activa", "Vencida", "Cancelada")
+
+# Filas por transacción: lotes grandes reparten el coste del commit (fsync) entre más filas
+LOTE_INGESTA = 5000
+LOTE_INGESTA_MAXIMO = 100_000
+
+# Rechazos que se conservan con detalle en el resultado; el total se cuenta siempre
+RECHAZOS_MAXIMOS = 100
+
+INSERTAR_POLIZA = (
+    f"INSERT INTO polizas ({', '.join(COLUMNAS)}) VALUES ({', '.join('?' * len(COLUMNAS))})"
+)
+
+# (línea del archivo, fila leída o error de lectura)
+Registro = Tuple[int, Any]
+
+
+class FilaInvalida(ValueError):
+    """Una fila no cumple el formato o las reglas de negocio; se rechaza sin afectar al resto"""
+
+
+def leer_registros(flujo: TextIO, formato: str) -> Iterator[Registro]:
+    """
+    Lee las filas de un flujo de texto sin cargarlo entero en memoria.
+
+    Args:
+        flujo: Texto CSV con cabecera o JSONL (un objeto JSON por línea)
+        formato: "csv" o "jsonl"
+
+    Returns:
+        Iterador de (línea, fila); las líneas JSON ilegibles llegan como FilaInvalida
+
+    Raises:
+        ValueError: Si el formato no existe o a la cabecera CSV le faltan columnas
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconocido: {formato!r}; opciones: {list(FORMATOS)}")
+
+    if formato == "csv":
+        lector = csv.DictReader(flujo)
+        cabecera = [(c or "").strip().lstrip("\ufeff") for c in lector.fieldnames or ()]
+        faltan = [c for c in COLUMNAS if c not in cabecera]
+        if faltan:
+            raise ValueError(f"Faltan columnas en la cabecera CSV: {faltan}")
+        lector.fieldnames = cabecera
+        for fila in lector:
+            yield lector.line_num, fila
+        return
+
+    for numero, linea in enumerate(flujo, 1):
+        if not linea.strip():
+            continue
+        try:
+            fila = json.loads(linea)
+        except ValueError as e:
+            yield numero, FilaInvalida(f"JSON inválido: {e}")
+            continue
+        yield numero, fila if isinstance(fila, dict) else FilaInvalida("Se esperaba un objeto JSON")
+
+
+def _obligatorio(fila: Dict[str, Any], campo: str) -> Any:
+    valor = fila.get(campo)
+    if valor is None or (isinstance(valor, str) and not valor.strip()):
+        raise FilaInvalida(f"Falta {campo}")
+    if isinstance(valor, (bool, dict, list)):
+        raise FilaInvalida(f"{campo} no es válido: {valor!r}")
+    return valor.strip() if isinstance(valor, str) else valor
+
+
+def _entero(fila: Dict[str, Any], campo: str) -> int:
+    valor = _obligatorio(fila, campo)
+    try:
+        numero = int(str(valor))
+    except ValueError:
+        raise FilaInvalida(f"{campo} debe ser un entero: {valor!r}") from None
+    if numero < 1:
+        raise FilaInvalida(f"{campo} debe ser positivo: {numero}")
+    return numero
+
+
+def _importe(fila: Dict[str, Any], campo: str) -> float:
+    valor = _obligatorio(fila, campo)
+    try:
+        importe = float(str(valor))
+    except ValueError:
+        raise FilaInvalida(f"{campo} debe ser numérico: {valor!r}") from None
+    if not math.isfinite(importe) or importe <= 0:
+        raise FilaInvalida(f"{campo} debe ser mayor que cero: {valor!r}")
+    return importe
+
+
+def _fecha(fila: Dict[str, Any], campo: str) -> str:
+    valor = _obligatorio(fila, campo)
+    try:
+        return date.fromisoformat(str(valor)).isoformat()
+    except ValueError:
+        raise FilaInvalida(f"{campo} debe tener formato AAAA-MM-DD: {valor!r}") from None
+
+
+def validar(fila: Any) -> Tuple:
+    """
+    Valida una fila y la convierte a los tipos de la tabla polizas.
+
+    No consulta la base de datos: la existencia de clientes y productos y la unicidad del
+    número de póliza se comprueban por lotes en `ingerir`.
+
+    Args:
+        fila: Diccionario leído del CSV o del JSONL
+
+    Returns:
+        Tupla con los valores en el orden de COLUMNAS
+
+    Raises:
+        FilaInvalida: Si falta un campo, tiene un tipo incorrecto o incumple las reglas de negocio
+    """
+    if isinstance(fila, FilaInvalida):
+        raise fila
+    inicio = _fecha(fila, "fecha_inicio")
+    vencimiento = _fecha(fila, "fecha_vencimiento")
+    if vencimiento <= inicio:
+        raise FilaInvalida(f"fecha_vencimiento ({vencimiento}) debe ser posterior a fecha_inicio ({inicio})")
+    estado = str(_obligatorio(fila, "estado"))
+    if estado not in ESTADOS:
+        raise FilaInvalida(f"estado desconocido: {estado!r}; opciones: {list(ESTADOS)}")
+    return (
+        str(_obligatorio(fila, "numero_poliza")),
+        _entero(fila, "cliente_id"),
+        _entero(fila, "producto_id"),
+        inicio,
+        vencimiento,
+        _importe(fila, "prima_mensual"),
+        _importe(fila, "monto_cobertura"),
+        estado,
+    )
+
+
+def abrir_conexion(db_path: str, pragmas: Optional[Dict[str, Any]] = None) -> sqlite3.Connection:
+    """
+    Abre la conexión de escritura de una ingesta.
+
+    Args:
+        db_path: Ruta del archivo SQLite
+        pragmas: PRAGMAs por conexión del perfil de almacenamiento (busy_timeout, synchronous...)
+
+    Returns:
+        Conexión en modo autocommit que puede usarse desde los hilos del ejecutor, de uno en uno
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+    for nombre, valor in (pragmas or {}).items():
+        conn.execute(f"PRAGMA {nombre} = {valor}")
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def _existentes(conn: sqlite3.Connection, sql: str, valores: Iterable[Any]) -> set:
+    """Devuelve cuáles de los valores aparecen en la consulta, con una sola sentencia por lote"""
+    return {valor for (valor,) in conn.execute(sql, (json.dumps(sorted(set(valores))),))}
+
+
+def _procesar_lote(
+    conn: sqlite3.Connection, pendientes: List[Registro]
+) -> Tuple[int, List[Tuple[int, Optional[str], str]]]:
+    """
+    Valida e inserta un lote en una sola transacción.
+
+    Returns:
+        Tupla (insertadas, rechazos como (línea, numero_poliza, error))
+    """
+    rechazos: List[Tuple[int, Optional[str], str]] = []
+    validas: List[Tuple[int, Tuple]] = []
+    for linea, fila in pendientes:
+        try:
+            validas.append((linea, validar(fila)))
+        except FilaInvalida as e:
+            numero = fila.get("numero_poliza") if isinstance(fila, dict) else None
+            rechazos.append((linea, None if numero is None else str(numero), str(e)))
+
+    # BEGIN IMMEDIATE toma el bloqueo de escritura antes de comprobar referencias y duplicados,
+    # así nadie puede insertar el mismo número de póliza entre la comprobación y el INSERT
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        clientes = _existentes(
+            conn, "SELECT id FROM clientes WHERE id IN (SELECT value FROM json_each(?))",
+            (t[1] for _, t in validas),
+        )
+        productos = _existentes(
+            conn, "SELECT id FROM productos_seguros WHERE id IN (SELECT value FROM json_each(?))",
+            (t[2] for _, t in validas),
+        )
+        duplicadas = _existentes(
+            conn, "SELECT numero_poliza FROM polizas WHERE numero_poliza IN (SELECT value FROM json_each(?))",
+            (t[0] for _, t in validas),
+        )
+
+        aceptadas: List[Tuple[int, Tuple]] = []
+        for linea, tupla in validas:
+            if tupla[0] in duplicadas:
+                rechazos.append((linea, tupla[0], "numero_poliza duplicado"))
+            elif tupla[1] not in clientes:
+                rechazos.append((linea, tupla[0], f"cliente_id {tupla[1]} no existe"))
+            elif tupla[2] not in productos:
+                rechazos.append((linea, tupla[0], f"producto_id {tupla[2]} no existe"))
+            else:
+                duplicadas.add(tupla[0])
+                aceptadas.append((linea, tupla))
+
+        try:
+            conn.executemany(INSERTAR_POLIZA, (tupla for _, tupla in aceptadas))
+            insertadas = len(aceptadas)
+        except sqlite3.IntegrityError:
+            # Algo que las comprobaciones no cubren: se repite el lote fila a fila. Con la
+            # resolución ABORT un INSERT fallido solo deshace su propia fila, no la transacción
+            conn.execute("ROLLBACK")
+            conn.execute("BEGIN IMMEDIATE")
+            insertadas = 0
+            for linea, tupla in aceptadas:
+                try:
+                    conn.execute(INSERTAR_POLIZA, tupla)
+                    insertadas += 1
+                except sqlite3.IntegrityError as e:
+                    rechazos.append((linea, tupla[0], str(e)))
+        conn.execute("COMMIT")
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+
+    rechazos.sort(key=lambda rechazo: rechazo[0])
+    return insertadas, rechazos
+
+
+def ingerir(
+    conn: sqlite3.Connection,
+    registros: Iterable[Registro],
+    lote: int = LOTE_INGESTA,
+    al_rechazar: Optional[Callable[[Dict[str, Any]], None]] = None,
+    rechazos_maximos: int = RECHAZOS_MAXIMOS,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Inserta pólizas por lotes y produce el avance acumulado tras confirmar cada lote.
+
+    Cada lote es una transacción: las filas válidas se confirman juntas y las inválidas
+    (formato, referencias a clientes o productos inexistentes, número de póliza repetido)
+    se rechazan individualmente. Un error de la base de datos deshace solo el lote en curso;
+    los anteriores ya están confirmados.
+
+    Args:
+        conn: Conexión de `abrir_conexion`
+        registros: Filas de `leer_registros`
+        lote: Filas por transacción (entre 1 y LOTE_INGESTA_MAXIMO)
+        al_rechazar: Función que recibe cada rechazo, por ejemplo para escribirlos todos a disco
+        rechazos_maximos: Rechazos que se conservan con detalle en el avance
+
+    Returns:
+        Iterador de diccionarios con leidas, insertadas, rechazadas, lotes, duracion_s,
+        filas_por_segundo y rechazos; el último es el resultado final
+
+    Raises:
+        ValueError: Si el tamaño de lote no es válido
+    """
+    if not 1 <= lote <= LOTE_INGESTA_MAXIMO:
+        raise ValueError(f"El lote debe estar entre 1 y {LOTE_INGESTA_MAXIMO}")
+
+    inicio = time.perf_counter()
+    avance: Dict[str, Any] = {
+        "leidas": 0, "insertadas": 0, "rechazadas": 0, "lotes": 0,
+        "duracion_s": 0.0, "filas_por_segundo": 0.0, "rechazos": [],
+    }
+    iterador = iter(registros)
+    while True:
+        pendientes = [registro for _, registro in zip(range(lote), iterador)]
+        if not pendientes:
+            break
+        insertadas, rechazos = _procesar_lote(conn, pendientes)
+
+        avance["leidas"] += len(pendientes)
+        avance["insertadas"] += insertadas
+        avance["rechazadas"] += len(rechazos)
+        avance["lotes"] += 1
+        for linea, numero, error in rechazos:
+            rechazo = {"linea": linea, "numero_poliza": numero, "error": error}
+            if len(avance["rechazos"]) < rechazos_maximos:
+                avance["rechazos"].append(rechazo)
+            if al_rechazar is not None:
+                al_rechazar(rechazo)
+        transcurrido = time.perf_counter() - inicio
+        avance["duracion_s"] = round(transcurrido, 3)
+        avance["filas_por_segundo"] = round(avance["leidas"] / transcurrido, 1) if transcurrido else 0.0
+        yield avance
+        if len(pendientes) < lote:
+            break
+
+    if not avance["lotes"]:
+        yield avance
+
+
+def detectar_formato(ruta: str) -> str:
+    """Deduce el formato por la extensión del archivo"""
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    raise ValueError(f"No se reconoce el formato de {ruta!r}; indícalo con --formato")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("archivo", help="Archivo CSV o JSONL; '-' lee de la entrada estándar")
+    parser.add_argument("--formato", choices=FORMATOS, help="Por defecto se deduce de la extensión")
+    parser.add_argument("--lote", type=int, default=LOTE_INGESTA, help="Filas por transacción")
+    parser.add_argument("--db", help="Ruta de la base de datos (por defecto la del servidor)")
+    parser.add_argument("--rechazos", help="Ruta donde escribir todos los rechazos en JSONL")
+    args = parser.parse_args()
+
+    if args.formato is None and args.archivo == "-":
+        parser.error("--formato es obligatorio al leer de la entrada estándar")
+    formato = args.formato or detectar_formato(args.archivo)
+
+    # Importación diferida: servidor_seguros importa este módulo para su herramienta de ingesta
+    from servidor_seguros import DB_PATH, PERFIL, init_database
+
+    db_path = args.db or DB_PATH
+    print("=" * 60)
+    print("Ingesta de Pólizas - Aseguradora")
+    print("=" * 60 + "\n")
+    init_database(db_path)
+
+    flujo = sys.stdin if args.archivo == "-" else open(args.archivo, encoding="utf-8-sig", newline="")
+    salida_rechazos = open(args.rechazos, "w", encoding="utf-8") if args.rechazos else None
+    al_rechazar = None
+    if salida_rechazos is not None:
+        al_rechazar = lambda rechazo: salida_rechazos.write(json.dumps(rechazo, ensure_ascii=False) + "\n")
+
+    conn = abrir_conexion(db_path, PERFIL.pragmas_conexion())
+    resultado: Dict[str, Any] = {}
+    try:
+        for resultado in ingerir(conn, leer_registros(flujo, formato), args.lote, al_rechazar):
+            print(
+                f"\r   Pólizas: {resultado['insertadas']:,} insertadas, {resultado['rechazadas']:,} rechazadas "
+                f"({resultado['filas_por_segundo']:,.0f} filas/s)",
+                end="",
+                flush=True,
+            )
+        print()
+    finally:
+        conn.close()
+        if flujo is not sys.stdin:
+            flujo.close()
+        if salida_rechazos is not None:
+            salida_rechazos.close()
+
+    print(f"✅ {resultado['insertadas']:,} de {resultado['leidas']:,} pólizas insertadas "
+          f"en {resultado['lotes']} lotes ({resultado['duracion_s']:,.1f}s)")
+    if resultado["rechazadas"]:
+        print(f"❌ {resultado['rechazadas']:,} filas rechazadas")
+        for rechazo in resultado["rechazos"][:10]:
+            print(f"   Línea {rechazo['linea']}: {rechazo['error']}")
+        if args.rechazos:
+            print(f"📁 Rechazos guardados en {args.rechazos}")
+    # Los servidores en marcha ven las pólizas nuevas cuando expiran sus cachés (SEGUROS_CACHE_TTL)
+    print(f"📁 Base de datos: {db_path}\n")
+
+
+if __name__ == "__main__":
+    main()
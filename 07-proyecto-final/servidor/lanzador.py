@@ -0,0 +1,224 @@
+"""
+Lanzador multiproceso del servidor MCP de seguros.
+Arranca varios procesos trabajadores que atienden el mismo puerto, de modo que la serialización JSON
+y las consultas SQL se reparten entre núcleos en lugar de quedar limitadas por el GIL de un proceso.
+
+Uso:
+    python lanzador.py --trabajadores 4 --puerto 8200
+    SEGUROS_TRABAJADORES=8 python lanzador.py --modelo prefork
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+
+# SO_REUSEPORT: cada trabajador abre su propio socket y el kernel reparte las conexiones entre ellos.
+# prefork: el lanzador abre un socket y los trabajadores lo heredan y compiten por aceptar.
+MODELOS = ("reuseport", "prefork")
+
+# Un trabajador que termina antes de este tiempo indica un error de configuración, no un fallo puntual
+ARRANQUE_MINIMO_S = 5.0
+
+
+def crear_socket(host: str, puerto: int, reuseport: bool) -> socket.socket:
+    """
+    Abre un socket TCP en escucha.
+
+    Args:
+        host: Dirección en la que escuchar
+        puerto: Puerto TCP
+        reuseport: Activa SO_REUSEPORT para que otros procesos escuchen en el mismo puerto
+
+    Returns:
+        Socket ya enlazado y en escucha
+    """
+    familia = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(familia, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuseport:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, puerto))
+    sock.listen(2048)
+    return sock
+
+
+def _trabajador(
+    host: str, puerto: int, compartido: Optional[socket.socket], dir_metricas: str, intervalo_metricas: float
+):
+    """Cuerpo de cada proceso trabajador: sirve el servidor completo sobre su socket"""
+    import servidor_seguros
+
+    sock = compartido if compartido is not None else crear_socket(host, puerto, reuseport=True)
+    servidor_seguros.publicar_metricas(dir_metricas, intervalo_metricas)
+    # Peticiones consecutivas de un cliente pueden llegar a trabajadores distintos, así que no se
+    # guardan sesiones en memoria; las notificaciones de progreso viajan en el stream de su petición
+    servidor_seguros.app.run(
+        transport="streamable-http",
+        host=host,
+        port=puerto,
+        sockets=[sock],
+        stateless_http=True,
+        show_banner=False,
+    )
+
+
+class Lanzador:
+    """
+    Arranca y supervisa `trabajadores` procesos del servidor sobre un mismo puerto.
+
+    Los trabajadores heredan la configuración de la base de datos por variables de entorno
+    (SEGUROS_DB_PATH, SEGUROS_PERFIL, SEGUROS_POOL_TAMANO, ...) y publican sus métricas en un
+    directorio temporal común que lee el recurso `metricas://trabajadores`. Un trabajador que
+    termina inesperadamente se vuelve a arrancar.
+    """
+
+    def __init__(
+        self,
+        trabajadores: int,
+        host: str = "0.0.0.0",
+        puerto: int = 8200,
+        modelo: str = "reuseport",
+        intervalo_metricas: float = 2.0,
+    ):
+        """
+        Args:
+            trabajadores: Número de procesos; conviene igualarlo a los núcleos disponibles
+            host: Dirección en la que escuchar
+            puerto: Puerto TCP compartido por todos los trabajadores
+            modelo: "reuseport" o "prefork"
+            intervalo_metricas: Segundos entre publicaciones de métricas de cada trabajador
+        """
+        if trabajadores < 1:
+            raise ValueError("Se necesita al menos un trabajador")
+        if modelo not in MODELOS:
+            raise ValueError(f"Modelo desconocido: {modelo!r}; opciones: {list(MODELOS)}")
+        if modelo == "reuseport" and not hasattr(socket, "SO_REUSEPORT"):
+            raise ValueError("Este sistema no admite SO_REUSEPORT; usa el modelo prefork")
+
+        self.trabajadores = trabajadores
+        self.host = host
+        self.puerto = puerto
+        self.modelo = modelo
+        self.intervalo_metricas = intervalo_metricas
+        # spawn: cada trabajador empieza con un intérprete limpio, sin hilos ni conexiones heredados
+        self._contexto = multiprocessing.get_context("spawn")
+        self._procesos: Dict[int, multiprocessing.Process] = {}
+        self._arranques: Dict[int, float] = {}
+        self._compartido: Optional[socket.socket] = None
+        self._dir_metricas = ""
+        self._detener = threading.Event()
+
+    def _arrancar(self, indice: int):
+        """Arranca (o vuelve a arrancar) el trabajador `indice`"""
+        proceso = self._contexto.Process(
+            target=_trabajador,
+            args=(self.host, self.puerto, self._compartido, self._dir_metricas, self.intervalo_metricas),
+            name=f"trabajador-{indice}",
+            daemon=True,
+        )
+        proceso.start()
+        self._procesos[indice] = proceso
+        self._arranques[indice] = time.monotonic()
+
+    def _retirar_metricas(self, pid: Optional[int]):
+        """Borra las métricas publicadas por un trabajador que ya no existe"""
+        try:
+            os.remove(os.path.join(self._dir_metricas, f"{pid}.json"))
+        except FileNotFoundError:
+            pass
+
+    def ejecutar(self) -> int:
+        """
+        Arranca los trabajadores y los supervisa hasta recibir SIGINT o SIGTERM.
+
+        Returns:
+            Código de salida: 0 si se detuvo a petición, 1 si un trabajador falló al arrancar
+        """
+        self._dir_metricas = tempfile.mkdtemp(prefix="seguros_metricas_")
+        if self.modelo == "prefork":
+            self._compartido = crear_socket(self.host, self.puerto, reuseport=False)
+        signal.signal(signal.SIGTERM, lambda *_: self._detener.set())
+
+        codigo = 0
+        try:
+            for indice in range(self.trabajadores):
+                self._arrancar(indice)
+
+            while not self._detener.wait(0.5):
+                for indice, proceso in list(self._procesos.items()):
+                    if proceso.is_alive():
+                        continue
+                    self._retirar_metricas(proceso.pid)
+                    if time.monotonic() - self._arranques[indice] < ARRANQUE_MINIMO_S:
+                        print(f"❌ El trabajador {indice} terminó al arrancar (código {proceso.exitcode})")
+                        codigo = 1
+                        self._detener.set()
+                        break
+                    print(f"❌ El trabajador {indice} terminó (código {proceso.exitcode}); reiniciando")
+                    self._arrancar(indice)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.detener()
+        return codigo
+
+    def detener(self):
+        """Detiene todos los trabajadores y libera el socket y el directorio de métricas"""
+        self._detener.set()
+        for proceso in self._procesos.values():
+            if proceso.is_alive():
+                proceso.terminate()
+        for proceso in self._procesos.values():
+            proceso.join(timeout=10)
+            if proceso.is_alive():
+                proceso.kill()
+                proceso.join()
+        self._procesos.clear()
+        if self._compartido is not None:
+            self._compartido.close()
+            self._compartido = None
+        shutil.rmtree(self._dir_metricas, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--trabajadores", type=int,
+        default=int(os.getenv("SEGUROS_TRABAJADORES", str(os.cpu_count() or 1))),
+        help="Procesos trabajadores (por defecto SEGUROS_TRABAJADORES o el número de núcleos)",
+    )
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--puerto", type=int, default=8200)
+    parser.add_argument(
+        "--modelo", choices=MODELOS, default="reuseport" if hasattr(socket, "SO_REUSEPORT") else "prefork",
+        help="Cómo comparten el puerto los trabajadores",
+    )
+    parser.add_argument("--intervalo-metricas", type=float, default=2.0, help="Segundos entre publicaciones de métricas")
+    args = parser.parse_args()
+
+    import servidor_seguros
+
+    print("=" * 60)
+    print("Inicializando Base de Datos de Seguros")
+    print("=" * 60 + "\n")
+    # Las migraciones se aplican una sola vez, antes de que arranquen los trabajadores
+    servidor_seguros.init_database()
+    servidor_seguros.pool_lectura.cerrar()
+
+    servidor_seguros.mostrar_banner(
+        f"http://{args.host}:{args.puerto} ({args.trabajadores} trabajadores, {args.modelo})"
+    )
+    lanzador = Lanzador(args.trabajadores, args.host, args.puerto, args.modelo, args.intervalo_metricas)
+    sys.exit(lanzador.ejecutar())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Métricas de varios procesos del servidor de seguros servidos por el lanzador.
+Cada trabajador publica periódicamente sus métricas en un directorio compartido y cualquiera de
+ellos puede leerlas todas y sumarlas, sin memoria compartida ni un proceso coordinador.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Componente -> métricas de ese componente (pool, caché, ejecutor, réplica)
+MetricasProceso = Dict[str, Dict[str, Any]]
+
+# Métricas derivadas: se recalculan con los totales (numerador, denominador) en lugar de sumarse
+DERIVADAS: Dict[str, Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]]] = {
+    "pool": {
+        "tasa_aciertos": (("aciertos",), ("aciertos", "creadas", "esperas")),
+        "tiempo_espera_promedio_ms": (("tiempo_espera_total_ms",), ("esperas",)),
+    },
+    "cache": {"tasa_aciertos": (("aciertos",), ("aciertos", "fallos"))},
+    "ejecutor": {"espera_cola_promedio_ms": (("espera_cola_total_ms",), ("completadas",))},
+    "replica": {"duracion_copia_promedio_ms": (("duracion_copia_total_ms",), ("copias",))},
+}
+
+# Valores que no tiene sentido sumar entre procesos: se toma el mayor
+MAXIMOS = {"ttl_segundos", "intervalo_s", "desfase_s", "antiguedad_copia_s", "max_en_cola", "ultima_copia_ms", "generacion"}
+
+
+def sumar(por_trabajador: Dict[str, MetricasProceso]) -> MetricasProceso:
+    """
+    Combina las métricas de varios procesos en una sola vista.
+
+    Los contadores se suman, las tasas y promedios se recalculan a partir de los totales y los
+    valores de configuración o de antigüedad se reducen al máximo. Los textos se toman del primer
+    proceso que los tenga.
+
+    Args:
+        por_trabajador: Métricas de cada proceso, indexadas por PID
+
+    Returns:
+        Métricas totales con la misma forma que las de un proceso
+    """
+    totales: MetricasProceso = {}
+    for metricas in por_trabajador.values():
+        for componente, valores in metricas.items():
+            total = totales.setdefault(componente, {})
+            for clave, valor in valores.items():
+                if clave in DERIVADAS.get(componente, {}):
+                    continue
+                if total.get(clave) is None:
+                    total[clave] = valor
+                elif isinstance(valor, bool) or not isinstance(valor, (int, float)):
+                    continue
+                elif clave in MAXIMOS:
+                    total[clave] = max(total[clave], valor)
+                else:
+                    total[clave] += valor
+
+    for componente, derivadas in DERIVADAS.items():
+        total = totales.get(componente)
+        if total is None:
+            continue
+        for clave, (numerador, denominador) in derivadas.items():
+            divisor = sum(total.get(nombre) or 0 for nombre in denominador)
+            total[clave] = sum(total.get(nombre) or 0 for nombre in numerador) / divisor if divisor else 0.0
+    return totales
+
+
+class PublicadorMetricas:
+    """
+    Publica las métricas de este proceso en `directorio/<pid>.json` cada `intervalo` segundos.
+
+    `leer()` reúne las publicaciones recientes de todos los procesos; las que superan
+    `antiguedad_maxima` se consideran de trabajadores caídos y se ignoran.
+    """
+
+    def __init__(
+        self,
+        directorio: str,
+        recolectar: Callable[[], MetricasProceso],
+        intervalo: float = 2.0,
+        antiguedad_maxima: Optional[float] = None,
+    ):
+        """
+        Args:
+            directorio: Directorio compartido por todos los trabajadores
+            recolectar: Función que devuelve las métricas actuales de este proceso
+            intervalo: Segundos entre publicaciones
+            antiguedad_maxima: Segundos tras los que se ignora una publicación (por defecto 3 intervalos)
+        """
+        if intervalo <= 0:
+            raise ValueError("El intervalo de publicación debe ser positivo")
+
+        self.directorio = directorio
+        self.recolectar = recolectar
+        self.intervalo = intervalo
+        self.antiguedad_maxima = antiguedad_maxima if antiguedad_maxima is not None else 3 * intervalo
+        self.ruta = os.path.join(directorio, f"{os.getpid()}.json")
+        self._hilo: Optional[threading.Thread] = None
+        self._detener = threading.Event()
+
+    def publicar(self):
+        """Escribe las métricas actuales; el reemplazo atómico evita que otro proceso lea un archivo a medias"""
+        temporal = f"{self.ruta}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump({"publicado": time.time(), "metricas": self.recolectar()}, f, default=str)
+        os.replace(temporal, self.ruta)
+
+    def _publicar_periodicamente(self):
+        while not self._detener.wait(self.intervalo):
+            try:
+                self.publicar()
+            except OSError:
+                pass
+
+    def iniciar(self):
+        """Publica una primera vez y arranca el hilo de publicación"""
+        self.publicar()
+        if self._hilo is None:
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._publicar_periodicamente, name="metricas", daemon=True)
+            self._hilo.start()
+
+    def leer(self) -> Dict[str, Any]:
+        """
+        Reúne las métricas publicadas por todos los trabajadores.
+
+        Returns:
+            Diccionario con `trabajadores` (métricas por PID) y `totales` (sumadas con `sumar`)
+        """
+        limite = time.time() - self.antiguedad_maxima
+        por_trabajador: Dict[str, MetricasProceso] = {}
+        for nombre in sorted(os.listdir(self.directorio)):
+            if not nombre.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directorio, nombre), encoding="utf-8") as f:
+                    publicacion = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if publicacion["publicado"] >= limite:
+                por_trabajador[nombre[: -len(".json")]] = publicacion["metricas"]
+        return {"trabajadores": por_trabajador, "totales": sumar(por_trabajador)}
+
+    def cerrar(self):
+        """Detiene la publicación y retira el archivo de este proceso"""
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join()
+            self._hilo = None
+        try:
+            os.remove(self.ruta)
+        except FileNotFoundError:
+            pass
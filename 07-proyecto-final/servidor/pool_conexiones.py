@@ -0,0 +1,217 @@
+"""
+Pool de conexiones SQLite compartido por las herramientas del servidor de seguros.
+Reutiliza conexiones abiertas en lugar de abrir y cerrar el archivo en cada llamada.
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+
+class PoolAgotadoError(RuntimeError):
+    """Se lanza cuando no hay conexiones libres dentro del tiempo de espera"""
+
+
+class PoolConexiones:
+    """
+    Pool thread-safe de conexiones SQLite con tamaño máximo configurable.
+
+    Las conexiones se crean bajo demanda hasta `tamano` y se devuelven al pool
+    al terminar cada uso. Antes de entregar una conexión reutilizada se verifica
+    con `SELECT 1`; si falla se descarta y se abre una nueva.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        tamano: int = 5,
+        solo_lectura: bool = True,
+        pragmas: Optional[Dict[str, Any]] = None,
+        timeout: float = 10.0,
+        sentencias_cacheadas: int = 256,
+        uri: Optional[str] = None,
+    ):
+        """
+        Args:
+            db_path: Ruta del archivo SQLite
+            tamano: Número máximo de conexiones abiertas simultáneamente
+            solo_lectura: Abre las conexiones en modo `mode=ro`
+            pragmas: PRAGMAs que se ejecutan al abrir cada conexión
+            timeout: Segundos máximos de espera por una conexión libre
+            sentencias_cacheadas: Sentencias preparadas que conserva cada conexión; sqlite3 guarda
+                                  128 por defecto y `resumen_cartera` genera una por combinación
+                                  de agrupaciones y filtros
+            uri: URI SQLite que se abre en lugar de `db_path` (por ejemplo una copia `immutable=1`
+                 o una base en memoria `vfs=memdb`); ignora `solo_lectura`
+        """
+        if tamano < 1:
+            raise ValueError("El tamaño del pool debe ser al menos 1")
+
+        self.db_path = db_path
+        self.tamano = tamano
+        self.solo_lectura = solo_lectura
+        self.pragmas = dict(pragmas or {})
+        self.timeout = timeout
+        self.sentencias_cacheadas = sentencias_cacheadas
+        self.uri = uri
+
+        self._libres: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._abiertas = 0
+        self._metricas = {
+            "aciertos": 0,
+            "creadas": 0,
+            "esperas": 0,
+            "tiempo_espera_total_ms": 0.0,
+            "descartadas": 0,
+        }
+
+    def _conectar(self) -> sqlite3.Connection:
+        """Abre una conexión nueva y aplica los PRAGMAs configurados"""
+        if self.uri:
+            conn = sqlite3.connect(
+                self.uri, uri=True, check_same_thread=False, cached_statements=self.sentencias_cacheadas
+            )
+        elif self.solo_lectura:
+            conn = sqlite3.connect(
+                f"file:{self.db_path}?mode=ro",
+                uri=True,
+                check_same_thread=False,
+                cached_statements=self.sentencias_cacheadas,
+            )
+        else:
+            conn = sqlite3.connect(
+                self.db_path, check_same_thread=False, cached_statements=self.sentencias_cacheadas
+            )
+
+        for nombre, valor in self.pragmas.items():
+            conn.execute(f"PRAGMA {nombre} = {valor}")
+        return conn
+
+    @staticmethod
+    def _esta_sana(conn: sqlite3.Connection) -> bool:
+        """Verifica que la conexión siga siendo utilizable"""
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _descartar(self, conn: sqlite3.Connection):
+        """Cierra una conexión y libera su cupo en el pool"""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._abiertas -= 1
+            self._metricas["descartadas"] += 1
+
+    def _obtener(self) -> sqlite3.Connection:
+        """Entrega una conexión libre, crea una nueva o espera a que se libere una"""
+        while True:
+            try:
+                conn = self._libres.get_nowait()
+            except queue.Empty:
+                conn = None
+
+            if conn is not None:
+                if self._esta_sana(conn):
+                    with self._lock:
+                        self._metricas["aciertos"] += 1
+                    return conn
+                self._descartar(conn)
+                continue
+
+            with self._lock:
+                puede_crear = self._abiertas < self.tamano
+                if puede_crear:
+                    self._abiertas += 1
+
+            if puede_crear:
+                try:
+                    conn = self._conectar()
+                except Exception:
+                    with self._lock:
+                        self._abiertas -= 1
+                    raise
+                with self._lock:
+                    self._metricas["creadas"] += 1
+                return conn
+
+            inicio = time.perf_counter()
+            try:
+                conn = self._libres.get(timeout=self.timeout)
+            except queue.Empty:
+                raise PoolAgotadoError(
+                    f"No hay conexiones libres tras esperar {self.timeout}s"
+                ) from None
+            finally:
+                with self._lock:
+                    self._metricas["esperas"] += 1
+                    self._metricas["tiempo_espera_total_ms"] += (
+                        time.perf_counter() - inicio
+                    ) * 1000
+
+            if self._esta_sana(conn):
+                return conn
+            self._descartar(conn)
+
+    def _devolver(self, conn: sqlite3.Connection):
+        """Devuelve una conexión al pool, deshaciendo cualquier transacción abierta"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._descartar(conn)
+            return
+        self._libres.put(conn)
+
+    @contextmanager
+    def conexion(self) -> Iterator[sqlite3.Connection]:
+        """
+        Presta una conexión del pool durante el bloque `with`.
+
+        Returns:
+            Conexión SQLite que vuelve al pool al salir del bloque
+        """
+        conn = self._obtener()
+        try:
+            yield conn
+        finally:
+            self._devolver(conn)
+
+    def metricas(self) -> Dict[str, Any]:
+        """
+        Devuelve los contadores de uso del pool.
+
+        Returns:
+            Diccionario con aciertos, conexiones creadas, esperas y tiempos
+        """
+        with self._lock:
+            metricas = dict(self._metricas)
+            metricas["abiertas"] = self._abiertas
+        metricas["libres"] = self._libres.qsize()
+        metricas["tamano"] = self.tamano
+        entregas = metricas["aciertos"] + metricas["creadas"] + metricas["esperas"]
+        metricas["tasa_aciertos"] = metricas["aciertos"] / entregas if entregas else 0.0
+        metricas["tiempo_espera_promedio_ms"] = (
+            metricas["tiempo_espera_total_ms"] / metricas["esperas"]
+            if metricas["esperas"]
+            else 0.0
+        )
+        return metricas
+
+    def cerrar(self):
+        """Cierra todas las conexiones libres del pool"""
+        while True:
+            try:
+                conn = self._libres.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._abiertas -= 1
@@ -0,0 +1,312 @@
+"""
+Réplica de solo lectura de la base de datos de seguros.
+Las herramientas consultan una copia hecha con la API de backup de SQLite, en un archivo inmutable
+o en memoria, que se renueva cada cierto intervalo sin competir con quien escribe en el original.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+from pool_conexiones import PoolConexiones
+
+MODOS_REPLICA = ("archivo", "memoria")
+
+
+@dataclass(eq=False)
+class _Generacion:
+    """Una copia de la base de datos y el pool que la lee"""
+
+    numero: int
+    pool: PoolConexiones
+    ancla: Optional[sqlite3.Connection] = None
+    ruta: Optional[str] = None
+    en_uso: int = 0
+
+    def cerrar(self):
+        """Cierra las conexiones y libera la copia (borra el archivo o la base en memoria)"""
+        self.pool.cerrar()
+        if self.ancla is not None:
+            self.ancla.close()
+        if self.ruta and os.path.exists(self.ruta):
+            os.remove(self.ruta)
+
+
+class ReplicaLectura:
+    """
+    Sirve las lecturas desde una copia de la base de datos que se renueva periódicamente.
+
+    Tiene la misma interfaz que PoolConexiones (`conexion()`, `metricas()`, `cerrar()`), así que
+    las herramientas no distinguen entre leer el original o la copia. Cada renovación crea una
+    copia nueva con su propio pool; las consultas en curso terminan sobre la anterior, que se
+    libera cuando la última devuelve su conexión.
+
+    - `archivo`: la copia se escribe junto al original y se abre con `immutable=1`, sin bloqueos
+      ni comprobaciones de cambios en cada consulta.
+    - `memoria`: la copia vive en memoria (VFS `memdb`) y la comparten todas las conexiones.
+
+    Antes de copiar se compara `PRAGMA data_version`: si nadie ha escrito desde la última copia
+    la renovación no copia nada. La copia se hace en un solo paso, así que con el perfil clásico
+    (rollback journal) bloquea a los escritores mientras dura; con WAL no los bloquea.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        modo: str = "archivo",
+        intervalo: float = 30.0,
+        tamano: int = 5,
+        pragmas: Optional[Dict[str, Any]] = None,
+        timeout: float = 10.0,
+        directorio: Optional[str] = None,
+    ):
+        """
+        Args:
+            db_path: Ruta del archivo SQLite original
+            modo: "archivo" o "memoria"
+            intervalo: Segundos entre renovaciones; 0 solo renueva al llamar a `refrescar()`
+            tamano: Conexiones máximas del pool de cada copia
+            pragmas: PRAGMAs que se ejecutan al abrir cada conexión a la copia
+            timeout: Segundos máximos de espera por una conexión libre
+            directorio: Dónde se escriben las copias en modo archivo (por defecto junto al original)
+        """
+        if modo not in MODOS_REPLICA:
+            raise ValueError(f"Modo de réplica desconocido: {modo!r}; opciones: {list(MODOS_REPLICA)}")
+        if intervalo < 0:
+            raise ValueError("El intervalo de renovación no puede ser negativo")
+
+        self.db_path = db_path
+        self.modo = modo
+        self.intervalo = intervalo
+        self.tamano = tamano
+        self.pragmas = dict(pragmas or {})
+        self.timeout = timeout
+        self.directorio = directorio or os.path.dirname(os.path.abspath(db_path))
+        # El PID distingue las copias de varios procesos que sirven la misma base de datos
+        base = os.path.splitext(os.path.basename(db_path))[0]
+        self._nombre = f"{base}.replica-{os.getpid()}-{id(self):x}"
+
+        self._lock = threading.Lock()
+        self._lock_copia = threading.Lock()
+        self._origen: Optional[sqlite3.Connection] = None
+        self._version: Optional[int] = None
+        self._actual: Optional[_Generacion] = None
+        self._retiradas: List[_Generacion] = []
+        self._numero = 0
+        self._copiada: Optional[float] = None
+        self._verificada: Optional[float] = None
+        self._hilo: Optional[threading.Thread] = None
+        self._detener = threading.Event()
+        self._metricas = {
+            "copias": 0,
+            "omitidas": 0,
+            "errores": 0,
+            "duracion_copia_total_ms": 0.0,
+            "ultima_copia_ms": 0.0,
+            "ultimo_error": None,
+        }
+
+    def _copiar(self, numero: int) -> _Generacion:
+        """Copia el original con la API de backup y abre un pool sobre la copia"""
+        if self.modo == "memoria":
+            uri = f"file:/{self._nombre}-{numero}?vfs=memdb"
+            # La base en memoria existe mientras quede una conexión abierta: el ancla la mantiene
+            ancla = sqlite3.connect(uri, uri=True, check_same_thread=False, isolation_level=None)
+            try:
+                # memdb solo abre una base en modo WAL con bloqueo exclusivo: así se puede pasar
+                # la copia a DELETE y después compartirla con el pool
+                ancla.execute("PRAGMA locking_mode = EXCLUSIVE")
+                self._origen.backup(ancla)
+                ancla.execute("PRAGMA journal_mode = DELETE")
+                ancla.execute("PRAGMA locking_mode = NORMAL")
+                # El bloqueo exclusivo se suelta en la siguiente lectura
+                ancla.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            except BaseException:
+                ancla.close()
+                raise
+            pool = PoolConexiones(
+                uri, tamano=self.tamano, pragmas=self.pragmas, timeout=self.timeout, uri=f"{uri}&mode=ro"
+            )
+            return _Generacion(numero, pool, ancla=ancla)
+
+        ruta = os.path.join(self.directorio, f"{self._nombre}-{numero}.db")
+        destino = sqlite3.connect(ruta)
+        try:
+            self._origen.backup(destino)
+            # La copia hereda el modo WAL del original; con DELETE se puede abrir como inmutable
+            destino.execute("PRAGMA journal_mode = DELETE")
+        except BaseException:
+            destino.close()
+            os.remove(ruta)
+            raise
+        destino.close()
+        pool = PoolConexiones(
+            ruta,
+            tamano=self.tamano,
+            pragmas=self.pragmas,
+            timeout=self.timeout,
+            uri=f"file:{ruta}?mode=ro&immutable=1",
+        )
+        return _Generacion(numero, pool, ruta=ruta)
+
+    def refrescar(self, forzar: bool = False) -> bool:
+        """
+        Renueva la copia si el original cambió desde la última.
+
+        Args:
+            forzar: Copia aunque `data_version` indique que no hubo escrituras
+
+        Returns:
+            True si se hizo una copia nueva, False si la vigente seguía al día
+
+        Raises:
+            sqlite3.Error: Si no se puede leer el original o escribir la copia
+        """
+        with self._lock_copia:
+            try:
+                if self._origen is None:
+                    self._origen = sqlite3.connect(
+                        f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False
+                    )
+                # Se lee antes de copiar: una escritura concurrente provoca otra copia, nunca se pierde
+                version = self._origen.execute("PRAGMA data_version").fetchone()[0]
+                momento = time.monotonic()
+                if not forzar and self._actual is not None and version == self._version:
+                    with self._lock:
+                        self._metricas["omitidas"] += 1
+                        self._verificada = momento
+                    return False
+
+                inicio = time.perf_counter()
+                generacion = self._copiar(self._numero + 1)
+                duracion_ms = (time.perf_counter() - inicio) * 1000
+            except (sqlite3.Error, OSError) as e:
+                with self._lock:
+                    self._metricas["errores"] += 1
+                    self._metricas["ultimo_error"] = str(e)
+                raise
+
+            self._numero = generacion.numero
+            with self._lock:
+                if self._actual is not None:
+                    self._retiradas.append(self._actual)
+                self._actual = generacion
+                self._version = version
+                self._copiada = self._verificada = momento
+                self._metricas["copias"] += 1
+                self._metricas["duracion_copia_total_ms"] += duracion_ms
+                self._metricas["ultima_copia_ms"] = duracion_ms
+
+            if self.intervalo and self._hilo is None:
+                self._detener.clear()
+                self._hilo = threading.Thread(target=self._renovar, name="replica", daemon=True)
+                self._hilo.start()
+
+        self._recoger()
+        return True
+
+    def _renovar(self):
+        """Bucle del hilo de renovación; un error deja la copia vigente y se reintenta en el siguiente ciclo"""
+        while not self._detener.wait(self.intervalo):
+            try:
+                self.refrescar()
+            except (sqlite3.Error, OSError):
+                pass
+
+    def _recoger(self):
+        """Libera las copias retiradas que ya no tienen consultas en curso"""
+        with self._lock:
+            libres = [g for g in self._retiradas if not g.en_uso]
+            self._retiradas = [g for g in self._retiradas if g.en_uso]
+        for generacion in libres:
+            generacion.cerrar()
+
+    def _tomar(self) -> _Generacion:
+        """Reserva la copia vigente, creando la primera si todavía no existe"""
+        while True:
+            with self._lock:
+                generacion = self._actual
+                if generacion is not None:
+                    generacion.en_uso += 1
+                    return generacion
+            self.refrescar()
+
+    @contextmanager
+    def conexion(self) -> Iterator[sqlite3.Connection]:
+        """
+        Presta una conexión a la copia vigente durante el bloque `with`.
+
+        Returns:
+            Conexión SQLite de solo lectura sobre la copia
+        """
+        generacion = self._tomar()
+        try:
+            with generacion.pool.conexion() as conn:
+                yield conn
+        finally:
+            with self._lock:
+                generacion.en_uso -= 1
+                retirada = generacion is not self._actual
+            if retirada:
+                self._recoger()
+
+    def metricas(self) -> Dict[str, Any]:
+        """
+        Devuelve los contadores del pool de la copia vigente (se reinician con cada copia).
+
+        Returns:
+            Diccionario con aciertos, conexiones creadas, esperas y tiempos
+        """
+        generacion = self._actual
+        if generacion is None:
+            # Todavía no hay copia: un pool sin usar da las mismas claves con los contadores a cero
+            return PoolConexiones(self.db_path, tamano=self.tamano).metricas()
+        return generacion.pool.metricas()
+
+    def metricas_replica(self) -> Dict[str, Any]:
+        """
+        Devuelve el estado de la réplica y su desfase respecto al original.
+
+        `desfase_s` son los segundos desde la última vez que se comprobó que la copia coincidía
+        con el original (al copiar o al ver que no hubo escrituras): es la antigüedad máxima de
+        lo que leen las herramientas. `antiguedad_copia_s` cuenta desde la última copia.
+
+        Returns:
+            Diccionario con modo, intervalo, copias, omitidas, errores, duraciones y desfase
+        """
+        ahora = time.monotonic()
+        with self._lock:
+            metricas = dict(self._metricas)
+            metricas["generacion"] = self._actual.numero if self._actual else 0
+            metricas["retiradas"] = len(self._retiradas)
+            copiada, verificada = self._copiada, self._verificada
+        metricas["modo"] = self.modo
+        metricas["intervalo_s"] = self.intervalo
+        metricas["duracion_copia_promedio_ms"] = (
+            metricas["duracion_copia_total_ms"] / metricas["copias"] if metricas["copias"] else 0.0
+        )
+        metricas["antiguedad_copia_s"] = round(ahora - copiada, 3) if copiada is not None else None
+        metricas["desfase_s"] = round(ahora - verificada, 3) if verificada is not None else None
+        return metricas
+
+    def cerrar(self):
+        """Detiene la renovación y libera las copias; las que están en uso se liberan al devolverlas"""
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join()
+            self._hilo = None
+
+        with self._lock_copia:
+            with self._lock:
+                if self._actual is not None:
+                    self._retiradas.append(self._actual)
+                self._actual = None
+                self._version = None
+            if self._origen is not None:
+                self._origen.close()
+                self._origen = None
+        self._recoger()
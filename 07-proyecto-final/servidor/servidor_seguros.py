@@ -3,19 +3,134 @@ Servidor MCP completo para gestión de aseguradora.
 Expone herramientas para consultar pólizas, productos de seguros y clientes via base de datos SQLite.
 """
 
+import argparse
+import asyncio
+import atexit
+import contextlib
 import sqlite3
 import os
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
-from fastmcp import FastMCP
+import base64
+import io
+import json
+import re
+import sys
+import time
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple
+from datetime import date, datetime, timedelta
+from fastmcp import Context, FastMCP
+from fastmcp.tools import ToolResult
+from mcp.types import TextContent
+from almacenamiento import perfil_desde_entorno
+from cache_resultados import CacheResultados
+from consultas import Catalogo, fila, filas, json_filas, lotes, proyeccion
+from ejecutor_bd import EjecutorBD, EjecutorSaturadoError
+from esquema import migrar_esquema
+from ingesta import LOTE_INGESTA, abrir_conexion, ingerir, leer_registros
+from metricas_trabajadores import MetricasProceso, PublicadorMetricas
+from pool_conexiones import PoolConexiones
+from replica_lectura import ReplicaLectura
 
 app = FastMCP("Aseguradora Server")
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "seguros.db")
+DB_PATH = os.getenv("SEGUROS_DB_PATH", os.path.join(os.path.dirname(__file__), "seguros.db"))
 
-def init_database():
-    """Inicializa la base de datos con estructura y datos de ejemplo"""
-    conn = sqlite3.connect(DB_PATH)
+PERFIL = perfil_desde_entorno()
+
+# Tamaño de página por defecto y máximo de las herramientas paginadas
+LIMITE_POR_DEFECTO = 50
+LIMITE_MAXIMO = 200
+
+# Filas máximas que devuelven los listados completos; el resto se consulta paginando
+LISTADO_MAXIMO = 500
+
+# Filas por notificación de las herramientas que transmiten resultados completos
+LOTE_POR_DEFECTO = 500
+LOTE_MAXIMO = 5000
+
+# Dimensiones por las que se puede agrupar el resumen de la cartera
+DIMENSIONES_RESUMEN = ("tipo", "ciudad", "estado", "mes")
+
+# Campos que se pueden pedir con `campos`: expresión SQL y alias de la tabla unida que requieren.
+# Si ningún campo pedido necesita clientes (c) o productos (ps), la consulta no hace ese JOIN
+CAMPOS_POLIZA: Catalogo = {
+    "id": ("p.id", None),
+    "numero_poliza": ("p.numero_poliza", None),
+    "cliente": ("c.nombre", "c"),
+    "email_cliente": ("c.email", "c"),
+    "producto": ("ps.nombre", "ps"),
+    "tipo": ("ps.tipo", "ps"),
+    "descripcion": ("ps.descripcion", "ps"),
+    "fecha_inicio": ("p.fecha_inicio", None),
+    "fecha_vencimiento": ("p.fecha_vencimiento", None),
+    "prima_mensual": ("p.prima_mensual", None),
+    "monto_cobertura": ("p.monto_cobertura", None),
+    "estado": ("p.estado", None),
+}
+UNIONES_POLIZA = {
+    "c": "JOIN clientes c ON p.cliente_id = c.id",
+    "ps": "JOIN productos_seguros ps ON p.producto_id = ps.id",
+}
+CAMPOS_CLIENTE: Catalogo = {
+    campo: (f"c.{campo}", None) for campo in ("id", "nombre", "email", "telefono", "ciudad", "fecha_nacimiento")
+}
+CAMPOS_PRODUCTO: Catalogo = {
+    campo: (f"ps.{campo}", None) for campo in ("id", "nombre", "tipo", "descripcion", "cobertura_base")
+}
+
+# Campos por defecto de los listados de pólizas
+POLIZA_LISTADO = (
+    "id", "numero_poliza", "cliente", "producto", "tipo", "fecha_inicio",
+    "fecha_vencimiento", "prima_mensual", "monto_cobertura", "estado",
+)
+
+# Pool de solo lectura compartido por todas las herramientas de consulta. Con SEGUROS_REPLICA
+# ("archivo" o "memoria") las herramientas leen una copia renovada cada SEGUROS_REPLICA_INTERVALO segundos
+MODO_REPLICA = os.getenv("SEGUROS_REPLICA", "")
+_configuracion_pool = {
+    "tamano": int(os.getenv("SEGUROS_POOL_TAMANO", "5")),
+    "pragmas": {**PERFIL.pragmas_conexion(), "query_only": "ON"},
+    "timeout": float(os.getenv("SEGUROS_POOL_TIMEOUT", "10")),
+}
+if MODO_REPLICA:
+    pool_lectura = ReplicaLectura(
+        DB_PATH,
+        modo=MODO_REPLICA,
+        intervalo=float(os.getenv("SEGUROS_REPLICA_INTERVALO", "30")),
+        directorio=os.getenv("SEGUROS_REPLICA_DIR"),
+        **_configuracion_pool,
+    )
+    # Borra las copias en disco al terminar el proceso
+    atexit.register(pool_lectura.cerrar)
+else:
+    pool_lectura = PoolConexiones(DB_PATH, solo_lectura=True, **_configuracion_pool)
+
+# Hilos dedicados a SQLite: las herramientas son asíncronas y no bloquean el event loop
+ejecutor_bd = EjecutorBD(
+    hilos=int(os.getenv("SEGUROS_HILOS_BD", str(pool_lectura.tamano))),
+    cola_maxima=int(os.getenv("SEGUROS_COLA_BD", "100")),
+)
+
+# Con SEGUROS_INICIO_DIFERIDO=1 el servidor atiende sin preparar la base de datos: init_database()
+# se ejecuta antes de la primera consulta. Pensado para servidores stdio que un agente lanza en
+# cada sesión, donde cuenta el tiempo hasta la primera respuesta
+INICIO_DIFERIDO = os.getenv("SEGUROS_INICIO_DIFERIDO", "0") == "1"
+
+# Caché de resultados de las herramientas de consulta (SEGUROS_CACHE_TTL=0 la desactiva)
+cache_resultados = CacheResultados(
+    capacidad=int(os.getenv("SEGUROS_CACHE_CAPACIDAD", "1024")),
+    ttl=float(os.getenv("SEGUROS_CACHE_TTL", "300")),
+)
+
+def init_database(db_path: str = DB_PATH):
+    """
+    Inicializa la base de datos con estructura y datos de ejemplo.
+    
+    Args:
+        db_path: Ruta del archivo SQLite (por defecto seguros.db junto al servidor)
+    """
+    conn = sqlite3.connect(db_path)
+    modo = PERFIL.aplicar(conn)
+    print(f"✅ Perfil de almacenamiento '{PERFIL.nombre}' aplicado (journal_mode={modo})")
     cursor = conn.cursor()
     
     cursor.execute("""
@@ -115,359 +230,1056 @@ def init_database():
         print(f"✅ {len(polizas)} pólizas insertadas")
     
     conn.commit()
+    
+    migrar_esquema(conn)
+    conn.execute("PRAGMA optimize")
     conn.close()
+    # Primero se renueva la réplica, para que la caché no vuelva a llenarse con la copia anterior
+    if isinstance(pool_lectura, ReplicaLectura) and pool_lectura.db_path == db_path:
+        pool_lectura.refrescar()
+    cache_resultados.invalidar("productos_seguros", "clientes", "polizas")
+
+def _patron_prefijo(texto: str) -> str:
+    """Convierte un texto en patrón LIKE por prefijo, escapando los comodines"""
+    escapado = texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escapado}%"
+
+def _codificar_cursor(clave: Dict[str, Any]) -> str:
+    """Codifica la clave de la última fila entregada como un cursor opaco"""
+    texto = json.dumps(clave, separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(texto.encode("utf-8")).decode("ascii")
+
+def _decodificar_cursor(cursor: str, campos: List[str]) -> Dict[str, Any]:
+    """Recupera la clave de un cursor generado por `_codificar_cursor`"""
+    try:
+        clave = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise ValueError("Cursor inválido") from None
+    if not isinstance(clave, dict) or set(clave) != set(campos):
+        raise ValueError("Cursor inválido")
+    return clave
+
+def _consulta_fts(texto: str) -> str:
+    """Convierte texto libre en una consulta FTS5: cada palabra entre comillas y como prefijo"""
+    palabras = re.findall(r"\w+", texto)
+    if not palabras:
+        raise ValueError("La búsqueda debe contener al menos una palabra")
+    return " ".join(f'"{palabra}"*' for palabra in palabras)
+
+def _validar_limite(limite: int) -> int:
+    """Verifica que el tamaño de página esté entre 1 y LIMITE_MAXIMO"""
+    if not 1 <= limite <= LIMITE_MAXIMO:
+        raise ValueError(f"El límite debe estar entre 1 y {LIMITE_MAXIMO}")
+    return limite
+
+def _validar_mes(mes: Optional[str]) -> Optional[str]:
+    """Verifica que un mes tenga el formato AAAA-MM"""
+    if mes is not None and not re.fullmatch(r"\d{4}-(0[1-9]|1[0-2])", mes):
+        raise ValueError(f"Mes inválido: {mes!r}, se espera AAAA-MM")
+    return mes
+
+def _validar_fecha(fecha: str) -> str:
+    """Verifica que una fecha tenga el formato AAAA-MM-DD"""
+    try:
+        return date.fromisoformat(fecha).isoformat()
+    except ValueError:
+        raise ValueError(f"Fecha inválida: {fecha!r}, se espera AAAA-MM-DD") from None
+
+def _validar_ids(ids: List[int]) -> List[int]:
+    """Elimina IDs repetidos conservando el orden y verifica que haya entre 1 y LIMITE_MAXIMO"""
+    unicos = list(dict.fromkeys(ids))
+    if not 1 <= len(unicos) <= LIMITE_MAXIMO:
+        raise ValueError(f"Se deben indicar entre 1 y {LIMITE_MAXIMO} IDs distintos")
+    return unicos
+
+def _listado_json(sql: str, parametros: tuple, tope: Optional[Tuple[str, str]] = None) -> ToolResult:
+    """
+    Ejecuta una consulta de listado y devuelve sus filas como un array JSON generado por SQLite.
+    
+    Los listados pueden tener miles de filas: se evita crear un diccionario por fila y
+    serializarlo después, y el texto se entrega tal cual como contenido de la respuesta.
+    
+    Args:
+        sql: Consulta del listado
+        parametros: Parámetros de la consulta
+        tope: Para listados cortados en LISTADO_MAXIMO filas, la consulta de la clave de orden
+              (mismo orden, sin LIMIT) y la herramienta paginada que continúa el recorrido. Si
+              hay más filas se añade un segundo contenido con `truncado` y `siguiente_cursor`
+    """
+    with pool_lectura.conexion() as conn:
+        texto = json_filas(conn, sql, parametros)
+        claves = []
+        if tope:
+            # Clave de la última fila entregada y, si existe, de la siguiente: recorre solo el índice
+            claves = filas(conn.execute(f"{tope[0]} LIMIT 2 OFFSET ?", (LISTADO_MAXIMO - 1,)))
+    
+    contenido = [TextContent(type="text", text=texto)]
+    if len(claves) > 1:
+        aviso = {
+            "truncado": True,
+            "devueltas": LISTADO_MAXIMO,
+            "mensaje": f"Solo se devolvieron las primeras {LISTADO_MAXIMO} filas; "
+                       f"continúa con `{tope[1]}` y este cursor",
+            "siguiente_cursor": _codificar_cursor(claves[0]),
+        }
+        contenido.append(TextContent(type="text", text=json.dumps(aviso, ensure_ascii=False)))
+    return ToolResult(content=contenido)
+
+def _admite_progreso(ctx: Context) -> bool:
+    """Indica si el cliente pidió notificaciones de progreso (envió un progressToken)"""
+    contexto = ctx.request_context
+    meta = contexto.meta if contexto is not None else None
+    return bool(meta) and meta.get("progressToken") is not None
+
+async def _cerrar_en_bd(paso: Optional[asyncio.Future], *cierres: Callable[[], Any]) -> Any:
+    """
+    Cierra lo que usa una herramienta que avanza por pasos en ejecutor_bd (generador, conexión).
+    
+    Si la herramienta se cancela (por ejemplo, por el timeout del agente) con un paso en curso,
+    ese paso sigue en su hilo: cerrar el generador mientras se ejecuta falla con ValueError y
+    deja la conexión tomada, así que primero se espera a que termine. Los cierres corren después
+    en un hilo de base de datos y una segunda cancelación no los interrumpe.
+    
+    Args:
+        paso: Tarea del último paso lanzado (protegida con `asyncio.shield` al esperarla), o None
+        cierres: Funciones que se llaman en orden una vez terminado el paso
+        
+    Returns:
+        Resultado del último paso si terminó bien; None si falló o no llegó a lanzarse
+    """
+    async def cerrar() -> Any:
+        resultado = None
+        if paso is not None:
+            await asyncio.wait([paso])
+            if not paso.cancelled() and paso.exception() is None:
+                resultado = paso.result()
+        for cierre in cierres:
+            try:
+                await ejecutor_bd.ejecutar(cierre)
+            except EjecutorSaturadoError:
+                # Con el paso terminado ya nadie usa el recurso: se cierra en el propio event loop
+                cierre()
+        return resultado
+    
+    return await asyncio.shield(asyncio.ensure_future(cerrar()))
+
+def _resultado_por_ids(ids: List[int], encontrados: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+    """Ordena los resultados según los IDs pedidos e informa de los que no existen"""
+    return {
+        "resultados": {str(i): encontrados[i] for i in ids if i in encontrados},
+        "no_encontrados": [i for i in ids if i not in encontrados],
+    }
 
 @app.tool
-def obtener_todas_polizas() -> List[Dict[str, Any]]:
-    """Obtiene la lista completa de todas las pólizas activas"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+@ejecutor_bd.asincrono
+def obtener_todas_polizas(campos: Optional[List[str]] = None) -> ToolResult:
+    """
+    Obtiene la lista de pólizas ordenada por número de póliza.
     
-    cursor.execute("""
-        SELECT p.id, p.numero_poliza, c.nombre, ps.nombre, ps.tipo,
-               p.fecha_inicio, p.fecha_vencimiento, p.prima_mensual, 
-               p.monto_cobertura, p.estado
+    Devuelve como máximo LISTADO_MAXIMO pólizas. Si hay más, la respuesta incluye un segundo
+    contenido con `truncado` y un `siguiente_cursor` para seguir con `obtener_polizas_paginadas`.
+    
+    Args:
+        campos: Campos a devolver (id, numero_poliza, cliente, email_cliente, producto, tipo,
+                descripcion, fecha_inicio, fecha_vencimiento, prima_mensual, monto_cobertura,
+                estado); omitir para los habituales
+    """
+    columnas, uniones = proyeccion(CAMPOS_POLIZA, UNIONES_POLIZA, campos, POLIZA_LISTADO)
+    return _listado_json(f"""
+        SELECT {columnas}
         FROM polizas p
-        JOIN clientes c ON p.cliente_id = c.id
-        JOIN productos_seguros ps ON p.producto_id = ps.id
+        {uniones}
         ORDER BY p.numero_poliza
-    """)
-    rows = cursor.fetchall()
+        LIMIT ?
+    """, (LISTADO_MAXIMO,), (
+        "SELECT p.numero_poliza AS numero_poliza FROM polizas p ORDER BY p.numero_poliza",
+        "obtener_polizas_paginadas",
+    ))
+
+@app.tool
+@ejecutor_bd.asincrono
+def obtener_polizas_paginadas(
+    limite: int = LIMITE_POR_DEFECTO,
+    cursor: Optional[str] = None,
+    campos: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Recorre las pólizas por páginas ordenadas por número de póliza.
     
-    polizas = [
-        {
-            "id": r[0],
-            "numero_poliza": r[1],
-            "cliente": r[2],
-            "producto": r[3],
-            "tipo": r[4],
-            "fecha_inicio": r[5],
-            "fecha_vencimiento": r[6],
-            "prima_mensual": r[7],
-            "monto_cobertura": r[8],
-            "estado": r[9]
-        }
-        for r in rows
-    ]
+    Args:
+        limite: Pólizas por página (entre 1 y 200)
+        cursor: Valor `siguiente_cursor` de la página anterior; omitir para la primera página
+        campos: Campos a devolver (id, numero_poliza, cliente, email_cliente, producto, tipo,
+                descripcion, fecha_inicio, fecha_vencimiento, prima_mensual, monto_cobertura,
+                estado); omitir para los habituales (numero_poliza se incluye siempre)
+        
+    Returns:
+        Diccionario con la lista `polizas` y `siguiente_cursor` (None en la última página)
+        
+    Raises:
+        ValueError: Si el límite, el cursor o los campos no son válidos
+    """
+    _validar_limite(limite)
+    columnas, uniones = proyeccion(
+        CAMPOS_POLIZA, UNIONES_POLIZA, campos, POLIZA_LISTADO, obligatorios=("numero_poliza",)
+    )
+    desde = _decodificar_cursor(cursor, ["numero_poliza"])["numero_poliza"] if cursor else ""
     
-    conn.close()
-    return polizas
+    with pool_lectura.conexion() as conn:
+        cur = conn.cursor()
+        cur.execute(f"""
+            SELECT {columnas}
+            FROM polizas p
+            {uniones}
+            WHERE p.numero_poliza > ?
+            ORDER BY p.numero_poliza
+            LIMIT ?
+        """, (desde, limite + 1))
+        polizas = filas(cur, limite)
+        hay_mas = cur.fetchone() is not None
+    
+    siguiente = None
+    if hay_mas:
+        siguiente = _codificar_cursor({"numero_poliza": polizas[-1]["numero_poliza"]})
+    
+    return {"polizas": polizas, "siguiente_cursor": siguiente}
+
+def _lotes_polizas(
+    columnas: str, uniones: str, filtros: List[str], parametros: List[Any], lote: int
+) -> Iterator[List[Dict[str, Any]]]:
+    """Recorre las pólizas filtradas en lotes; la conexión del pool se libera al agotar o cerrar el generador"""
+    with pool_lectura.conexion() as conn:
+        # El orden por número de póliza sigue el índice único: la primera fila sale sin ordenar la tabla
+        cursor = conn.execute(f"""
+            SELECT {columnas}
+            FROM polizas p
+            {uniones}
+            {"WHERE " + " AND ".join(filtros) if filtros else ""}
+            ORDER BY p.numero_poliza
+        """, parametros)
+        yield from lotes(cursor, lote)
 
 @app.tool
-def buscar_poliza_por_id(poliza_id: int) -> Optional[Dict[str, Any]]:
+async def exportar_polizas(
+    ctx: Context,
+    tipo: Optional[str] = None,
+    estado: Optional[str] = None,
+    lote: int = LOTE_POR_DEFECTO,
+    campos: Optional[List[str]] = None,
+) -> ToolResult:
+    """
+    Transmite todas las pólizas, sin límite de filas, ordenadas por número de póliza.
+    
+    Cada lote de filas se envía como array JSON en el mensaje de una notificación de
+    progreso a medida que se lee, sin esperar al resultado completo. Si el cliente no
+    pide notificaciones de progreso, cada lote llega como un bloque de contenido.
+    
+    Args:
+        tipo: Filtra por tipo de seguro o su prefijo (Vida, Auto, Hogar, Salud, Accidentes)
+        estado: Filtra por estado de la póliza (Activa, Vencida, Cancelada)
+        lote: Pólizas por notificación (entre 1 y 5000)
+        campos: Campos a devolver (id, numero_poliza, cliente, email_cliente, producto, tipo,
+                descripcion, fecha_inicio, fecha_vencimiento, prima_mensual, monto_cobertura,
+                estado); omitir para los habituales
+        
+    Returns:
+        Resumen con filas y lotes enviados, milisegundos hasta la primera fila y duración total
+        
+    Raises:
+        ValueError: Si el tamaño de lote o los campos no son válidos
+    """
+    if not 1 <= lote <= LOTE_MAXIMO:
+        raise ValueError(f"El lote debe estar entre 1 y {LOTE_MAXIMO}")
+    columnas, uniones = proyeccion(
+        CAMPOS_POLIZA, UNIONES_POLIZA, campos, POLIZA_LISTADO, unir=("ps",) if tipo is not None else ()
+    )
+    
+    filtros: List[str] = []
+    parametros: List[Any] = []
+    if tipo is not None:
+        filtros.append("ps.tipo LIKE ? ESCAPE '\\'")
+        parametros.append(_patron_prefijo(tipo))
+    if estado is not None:
+        filtros.append("p.estado = ?")
+        parametros.append(estado)
+    
+    transmitir = _admite_progreso(ctx)
+    inicio = time.perf_counter()
+    primera_fila_ms = None
+    enviadas = 0
+    enviados_lotes = 0
+    bloques: List[TextContent] = []
+    generador = _lotes_polizas(columnas, uniones, filtros, parametros, lote)
+    paso: Optional[asyncio.Future] = None
+    try:
+        while True:
+            # Cada lote se lee en un hilo de base de datos; entre lotes el event loop envía el anterior.
+            # shield: si se cancela la herramienta, el lote en curso termina antes de cerrar el generador
+            paso = asyncio.ensure_future(ejecutor_bd.ejecutar(next, generador, None))
+            polizas = await asyncio.shield(paso)
+            if polizas is None:
+                break
+            if primera_fila_ms is None:
+                primera_fila_ms = (time.perf_counter() - inicio) * 1000
+            enviadas += len(polizas)
+            enviados_lotes += 1
+            texto = json.dumps(polizas, ensure_ascii=False)
+            if transmitir:
+                await ctx.report_progress(enviadas, None, texto)
+            else:
+                bloques.append(TextContent(type="text", text=texto))
+    finally:
+        await _cerrar_en_bd(paso, generador.close)
+    
+    resumen = {
+        "filas": enviadas,
+        "lotes": enviados_lotes,
+        "transmitido": transmitir,
+        "primera_fila_ms": round(primera_fila_ms, 3) if primera_fila_ms is not None else None,
+        "duracion_ms": round((time.perf_counter() - inicio) * 1000, 3),
+    }
+    return ToolResult(
+        content=[*bloques, TextContent(type="text", text=json.dumps(resumen))],
+        structured_content=resumen,
+    )
+
+@app.tool
+@ejecutor_bd.asincrono
+@cache_resultados.cachear(tablas=("polizas", "clientes", "productos_seguros"))
+def buscar_poliza_por_id(poliza_id: int, campos: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
     """
     Busca una póliza específica por su ID.
     
+    Pedir solo los campos necesarios (por ejemplo ["prima_mensual"]) evita unir clientes
+    y productos y reduce el tamaño de la respuesta.
+    
     Args:
         poliza_id: ID único de la póliza
+        campos: Campos a devolver (id, numero_poliza, cliente, email_cliente, producto, tipo,
+                descripcion, fecha_inicio, fecha_vencimiento, prima_mensual, monto_cobertura,
+                estado); omitir para todos
         
     Returns:
-        Diccionario con información completa de la póliza o None si no existe
+        Diccionario con información de la póliza o None si no existe
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    columnas, uniones = proyeccion(CAMPOS_POLIZA, UNIONES_POLIZA, campos, tuple(CAMPOS_POLIZA))
+    with pool_lectura.conexion() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT {columnas}
+            FROM polizas p
+            {uniones}
+            WHERE p.id = ?
+        """, (poliza_id,))
+        poliza = fila(cursor)
     
-    cursor.execute("""
-        SELECT p.id, p.numero_poliza, c.nombre, c.email, ps.nombre, ps.tipo,
-               ps.descripcion, p.fecha_inicio, p.fecha_vencimiento, 
-               p.prima_mensual, p.monto_cobertura, p.estado
-        FROM polizas p
-        JOIN clientes c ON p.cliente_id = c.id
-        JOIN productos_seguros ps ON p.producto_id = ps.id
-        WHERE p.id = ?
-    """, (poliza_id,))
-    row = cursor.fetchone()
-    
-    if row:
-        poliza = {
-            "id": row[0],
-            "numero_poliza": row[1],
-            "cliente": row[2],
-            "email_cliente": row[3],
-            "producto": row[4],
-            "tipo": row[5],
-            "descripcion": row[6],
-            "fecha_inicio": row[7],
-            "fecha_vencimiento": row[8],
-            "prima_mensual": row[9],
-            "monto_cobertura": row[10],
-            "estado": row[11]
-        }
-    else:
-        poliza = None
-    
-    conn.close()
     return poliza
 
 @app.tool
-def buscar_polizas_por_cliente(cliente_id: int) -> List[Dict[str, Any]]:
+@ejecutor_bd.asincrono
+def buscar_polizas_por_ids(poliza_ids: List[int], campos: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Busca varias pólizas por ID en una sola consulta.
+    
+    Usar en lugar de varias llamadas a buscar_poliza_por_id.
+    
+    Args:
+        poliza_ids: IDs de las pólizas (hasta 200)
+        campos: Campos a devolver (id, numero_poliza, cliente, email_cliente, producto, tipo,
+                descripcion, fecha_inicio, fecha_vencimiento, prima_mensual, monto_cobertura,
+                estado); omitir para todos (id se incluye siempre)
+        
+    Returns:
+        Diccionario con "resultados" (pólizas indexadas por ID) y "no_encontrados" (IDs inexistentes)
+    """
+    ids = _validar_ids(poliza_ids)
+    columnas, uniones = proyeccion(
+        CAMPOS_POLIZA, UNIONES_POLIZA, campos, tuple(CAMPOS_POLIZA), obligatorios=("id",)
+    )
+    
+    with pool_lectura.conexion() as conn:
+        cursor = conn.cursor()
+        # CROSS JOIN fija el orden: se recorre la lista de IDs y cada uno se busca por clave primaria
+        cursor.execute(f"""
+            SELECT {columnas}
+            FROM json_each(?) ids
+            CROSS JOIN polizas p ON p.id = ids.value
+            {uniones}
+        """, (json.dumps(ids),))
+        polizas = {f["id"]: f for f in filas(cursor)}
+    
+    return _resultado_por_ids(ids, polizas)
+
+@app.tool
+@ejecutor_bd.asincrono
+@cache_resultados.cachear(tablas=("polizas", "clientes", "productos_seguros"))
+def buscar_polizas_por_cliente(cliente_id: int, campos: Optional[List[str]] = None) -> List[Dict[str, Any]]:
     """
     Busca todas las pólizas de un cliente específico.
     
     Args:
         cliente_id: ID del cliente
+        campos: Campos a devolver (id, numero_poliza, cliente, email_cliente, producto, tipo,
+                descripcion, fecha_inicio, fecha_vencimiento, prima_mensual, monto_cobertura,
+                estado); omitir para los habituales
         
     Returns:
         Lista de pólizas del cliente
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    columnas, uniones = proyeccion(
+        CAMPOS_POLIZA, UNIONES_POLIZA, campos,
+        ("id", "numero_poliza", "producto", "tipo", "fecha_inicio",
+         "fecha_vencimiento", "prima_mensual", "monto_cobertura", "estado"),
+    )
+    with pool_lectura.conexion() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT {columnas}
+            FROM polizas p
+            {uniones}
+            WHERE p.cliente_id = ?
+            ORDER BY p.fecha_inicio DESC
+        """, (cliente_id,))
+        polizas = filas(cursor)
     
-    cursor.execute("""
-        SELECT p.id, p.numero_poliza, ps.nombre, ps.tipo,
-               p.fecha_inicio, p.fecha_vencimiento, p.prima_mensual, 
-               p.monto_cobertura, p.estado
-        FROM polizas p
-        JOIN productos_seguros ps ON p.producto_id = ps.id
-        WHERE p.cliente_id = ?
-        ORDER BY p.fecha_inicio DESC
-    """, (cliente_id,))
-    rows = cursor.fetchall()
-    
-    polizas = [
-        {
-            "id": r[0],
-            "numero_poliza": r[1],
-            "producto": r[2],
-            "tipo": r[3],
-            "fecha_inicio": r[4],
-            "fecha_vencimiento": r[5],
-            "prima_mensual": r[6],
-            "monto_cobertura": r[7],
-            "estado": r[8]
-        }
-        for r in rows
-    ]
-    
-    conn.close()
     return polizas
 
 @app.tool
-def buscar_polizas_por_tipo(tipo: str) -> List[Dict[str, Any]]:
+@ejecutor_bd.asincrono
+def buscar_polizas_por_tipo(tipo: str, campos: Optional[List[str]] = None) -> ToolResult:
     """
     Busca pólizas por tipo de seguro.
     
     Args:
-        tipo: Tipo de seguro (Vida, Auto, Hogar, Salud, Accidentes)
+        tipo: Tipo de seguro o su prefijo (Vida, Auto, Hogar, Salud, Accidentes)
+        campos: Campos a devolver (id, numero_poliza, cliente, email_cliente, producto, tipo,
+                descripcion, fecha_inicio, fecha_vencimiento, prima_mensual, monto_cobertura,
+                estado); omitir para los habituales
         
     Returns:
         Lista de pólizas de ese tipo
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT p.id, p.numero_poliza, c.nombre, ps.nombre, ps.tipo,
-               p.prima_mensual, p.monto_cobertura, p.estado
+    columnas, uniones = proyeccion(
+        CAMPOS_POLIZA, UNIONES_POLIZA, campos,
+        ("id", "numero_poliza", "cliente", "producto", "tipo", "prima_mensual", "monto_cobertura", "estado"),
+        unir=("ps",),
+    )
+    return _listado_json(f"""
+        SELECT {columnas}
         FROM polizas p
-        JOIN clientes c ON p.cliente_id = c.id
-        JOIN productos_seguros ps ON p.producto_id = ps.id
-        WHERE ps.tipo LIKE ?
+        {uniones}
+        WHERE ps.tipo LIKE ? ESCAPE '\\'
         ORDER BY p.prima_mensual
-    """, (f"%{tipo}%",))
-    rows = cursor.fetchall()
+    """, (_patron_prefijo(tipo),))
+
+@app.tool
+@ejecutor_bd.asincrono
+def polizas_por_vencer(
+    desde: Optional[str] = None,
+    hasta: Optional[str] = None,
+    estado: str = "Activa",
+    limite: int = LIMITE_POR_DEFECTO,
+    cursor: Optional[str] = None,
+    campos: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Lista las pólizas cuya fecha de vencimiento cae dentro de un rango, de la más próxima a la más lejana.
     
-    polizas = [
-        {
-            "id": r[0],
-            "numero_poliza": r[1],
-            "cliente": r[2],
-            "producto": r[3],
-            "tipo": r[4],
-            "prima_mensual": r[5],
-            "monto_cobertura": r[6],
-            "estado": r[7]
-        }
-        for r in rows
-    ]
+    Args:
+        desde: Primera fecha de vencimiento incluida (AAAA-MM-DD); por defecto hoy
+        hasta: Última fecha de vencimiento incluida (AAAA-MM-DD); por defecto 30 días después de `desde`
+        estado: Estado de las pólizas (Activa, Vencida, Cancelada)
+        limite: Pólizas por página (entre 1 y 200)
+        cursor: Valor `siguiente_cursor` de la página anterior; omitir para la primera página
+        campos: Campos a devolver (id, numero_poliza, cliente, email_cliente, producto, tipo,
+                descripcion, fecha_inicio, fecha_vencimiento, prima_mensual, monto_cobertura,
+                estado); omitir para los habituales (fecha_vencimiento e id se incluyen siempre)
+        
+    Returns:
+        Diccionario con la lista `polizas` y `siguiente_cursor` (None en la última página)
+        
+    Raises:
+        ValueError: Si las fechas, el límite, el cursor o los campos no son válidos
+    """
+    _validar_limite(limite)
+    columnas, uniones = proyeccion(
+        CAMPOS_POLIZA, UNIONES_POLIZA, campos,
+        ("id", "numero_poliza", "cliente", "email_cliente", "producto", "tipo",
+         "fecha_vencimiento", "prima_mensual", "monto_cobertura", "estado"),
+        obligatorios=("fecha_vencimiento", "id"),
+    )
+    desde = _validar_fecha(desde) if desde else date.today().isoformat()
+    hasta = _validar_fecha(hasta) if hasta else (date.fromisoformat(desde) + timedelta(days=30)).isoformat()
+    if hasta < desde:
+        raise ValueError("`hasta` no puede ser anterior a `desde`")
+    clave = _decodificar_cursor(cursor, ["fecha_vencimiento", "id"]) if cursor else {"fecha_vencimiento": "", "id": 0}
     
-    conn.close()
-    return polizas
+    with pool_lectura.conexion() as conn:
+        cur = conn.cursor()
+        cur.execute(f"""
+            SELECT {columnas}
+            FROM polizas p
+            {uniones}
+            WHERE p.estado = ?
+              AND p.fecha_vencimiento BETWEEN ? AND ?
+              AND (p.fecha_vencimiento, p.id) > (?, ?)
+            ORDER BY p.fecha_vencimiento, p.id
+            LIMIT ?
+        """, (estado, desde, hasta, clave["fecha_vencimiento"], clave["id"], limite + 1))
+        polizas = filas(cur, limite)
+        hay_mas = cur.fetchone() is not None
+    
+    siguiente = None
+    if hay_mas:
+        ultima = polizas[-1]
+        siguiente = _codificar_cursor({"fecha_vencimiento": ultima["fecha_vencimiento"], "id": ultima["id"]})
+    
+    return {"polizas": polizas, "siguiente_cursor": siguiente}
 
 @app.tool
-def obtener_productos_seguros() -> List[Dict[str, Any]]:
-    """Obtiene todos los productos de seguros disponibles"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT id, nombre, tipo, descripcion, cobertura_base
-        FROM productos_seguros
-        ORDER BY tipo, nombre
-    """)
-    rows = cursor.fetchall()
+@ejecutor_bd.asincrono
+@cache_resultados.cachear(tablas=("productos_seguros",))
+def obtener_productos_seguros(campos: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Obtiene todos los productos de seguros disponibles.
     
-    productos = [
-        {
-            "id": r[0],
-            "nombre": r[1],
-            "tipo": r[2],
-            "descripcion": r[3],
-            "cobertura_base": r[4]
-        }
-        for r in rows
-    ]
+    Args:
+        campos: Campos a devolver (id, nombre, tipo, descripcion, cobertura_base); omitir para todos
+    """
+    columnas, _ = proyeccion(CAMPOS_PRODUCTO, {}, campos, tuple(CAMPOS_PRODUCTO))
+    with pool_lectura.conexion() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT {columnas}
+            FROM productos_seguros ps
+            ORDER BY ps.tipo, ps.nombre
+        """)
+        productos = filas(cursor)
     
-    conn.close()
     return productos
 
 @app.tool
-def buscar_producto_seguro(producto_id: int) -> Optional[Dict[str, Any]]:
+@ejecutor_bd.asincrono
+@cache_resultados.cachear(tablas=("productos_seguros",))
+def buscar_producto_seguro(producto_id: int, campos: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
     """
     Busca un producto de seguro específico por su ID.
     
     Args:
         producto_id: ID del producto de seguro
+        campos: Campos a devolver (id, nombre, tipo, descripcion, cobertura_base); omitir para todos
         
     Returns:
         Diccionario con información del producto o None si no existe
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    columnas, _ = proyeccion(CAMPOS_PRODUCTO, {}, campos, tuple(CAMPOS_PRODUCTO))
+    with pool_lectura.conexion() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT {columnas}
+            FROM productos_seguros ps
+            WHERE ps.id = ?
+        """, (producto_id,))
+        producto = fila(cursor)
     
-    cursor.execute("""
-        SELECT id, nombre, tipo, descripcion, cobertura_base
-        FROM productos_seguros
-        WHERE id = ?
-    """, (producto_id,))
-    row = cursor.fetchone()
-    
-    if row:
-        producto = {
-            "id": row[0],
-            "nombre": row[1],
-            "tipo": row[2],
-            "descripcion": row[3],
-            "cobertura_base": row[4]
-        }
-    else:
-        producto = None
-    
-    conn.close()
     return producto
 
 @app.tool
-def obtener_todos_clientes() -> List[Dict[str, Any]]:
-    """Obtiene la lista completa de todos los clientes asegurados"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+@ejecutor_bd.asincrono
+def buscar_productos_por_ids(producto_ids: List[int], campos: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Busca varios productos de seguro por ID en una sola consulta.
     
-    cursor.execute("""
-        SELECT id, nombre, email, telefono, ciudad, fecha_nacimiento
-        FROM clientes
-        ORDER BY nombre
-    """)
-    rows = cursor.fetchall()
+    Args:
+        producto_ids: IDs de los productos (hasta 200)
+        campos: Campos a devolver (id, nombre, tipo, descripcion, cobertura_base); omitir para todos (id se incluye siempre)
+        
+    Returns:
+        Diccionario con "resultados" (productos indexados por ID) y "no_encontrados" (IDs inexistentes)
+    """
+    ids = _validar_ids(producto_ids)
+    columnas, _ = proyeccion(CAMPOS_PRODUCTO, {}, campos, tuple(CAMPOS_PRODUCTO), obligatorios=("id",))
     
-    clientes = [
-        {
-            "id": r[0],
-            "nombre": r[1],
-            "email": r[2],
-            "telefono": r[3],
-            "ciudad": r[4],
-            "fecha_nacimiento": r[5]
-        }
-        for r in rows
-    ]
+    with pool_lectura.conexion() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT {columnas}
+            FROM json_each(?) ids
+            CROSS JOIN productos_seguros ps ON ps.id = ids.value
+        """, (json.dumps(ids),))
+        productos = {f["id"]: f for f in filas(cursor)}
     
-    conn.close()
-    return clientes
+    return _resultado_por_ids(ids, productos)
+
+@app.tool
+@ejecutor_bd.asincrono
+def obtener_todos_clientes(campos: Optional[List[str]] = None) -> ToolResult:
+    """
+    Obtiene la lista de clientes asegurados ordenada por nombre.
+    
+    Devuelve como máximo LISTADO_MAXIMO clientes. Si hay más, la respuesta incluye un segundo
+    contenido con `truncado` y un `siguiente_cursor` para seguir con `obtener_clientes_paginados`.
+    
+    Args:
+        campos: Campos a devolver (id, nombre, email, telefono, ciudad, fecha_nacimiento); omitir para todos
+    """
+    columnas, _ = proyeccion(CAMPOS_CLIENTE, {}, campos, tuple(CAMPOS_CLIENTE))
+    return _listado_json(f"""
+        SELECT {columnas}
+        FROM clientes c
+        ORDER BY c.nombre, c.id
+        LIMIT ?
+    """, (LISTADO_MAXIMO,), (
+        "SELECT c.nombre AS nombre, c.id AS id FROM clientes c ORDER BY c.nombre, c.id",
+        "obtener_clientes_paginados",
+    ))
 
 @app.tool
-def buscar_cliente_por_id(cliente_id: int) -> Optional[Dict[str, Any]]:
+@ejecutor_bd.asincrono
+def obtener_clientes_paginados(
+    limite: int = LIMITE_POR_DEFECTO,
+    cursor: Optional[str] = None,
+    campos: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Recorre los clientes por páginas ordenadas por nombre.
+    
+    Args:
+        limite: Clientes por página (entre 1 y 200)
+        cursor: Valor `siguiente_cursor` de la página anterior; omitir para la primera página
+        campos: Campos a devolver (id, nombre, email, telefono, ciudad, fecha_nacimiento); omitir para todos (nombre e id se incluyen siempre)
+        
+    Returns:
+        Diccionario con la lista `clientes` y `siguiente_cursor` (None en la última página)
+        
+    Raises:
+        ValueError: Si el límite, el cursor o los campos no son válidos
+    """
+    _validar_limite(limite)
+    columnas, _ = proyeccion(CAMPOS_CLIENTE, {}, campos, tuple(CAMPOS_CLIENTE), obligatorios=("nombre", "id"))
+    # Los nombres pueden repetirse: la clave incluye el id para desempatar
+    if cursor:
+        clave = _decodificar_cursor(cursor, ["nombre", "id"])
+        desde = (clave["nombre"], clave["id"])
+    else:
+        desde = ("", 0)
+    
+    with pool_lectura.conexion() as conn:
+        cur = conn.cursor()
+        cur.execute(f"""
+            SELECT {columnas}
+            FROM clientes c
+            WHERE (c.nombre, c.id) > (?, ?)
+            ORDER BY c.nombre, c.id
+            LIMIT ?
+        """, (*desde, limite + 1))
+        clientes = filas(cur, limite)
+        hay_mas = cur.fetchone() is not None
+    
+    siguiente = None
+    if hay_mas:
+        ultimo = clientes[-1]
+        siguiente = _codificar_cursor({"nombre": ultimo["nombre"], "id": ultimo["id"]})
+    
+    return {"clientes": clientes, "siguiente_cursor": siguiente}
+
+@app.tool
+@ejecutor_bd.asincrono
+@cache_resultados.cachear(tablas=("clientes",))
+def buscar_cliente_por_id(cliente_id: int, campos: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
     """
     Busca un cliente específico por su ID.
     
     Args:
         cliente_id: ID único del cliente
+        campos: Campos a devolver (id, nombre, email, telefono, ciudad, fecha_nacimiento); omitir para todos
         
     Returns:
         Diccionario con información del cliente o None si no existe
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    columnas, _ = proyeccion(CAMPOS_CLIENTE, {}, campos, tuple(CAMPOS_CLIENTE))
+    with pool_lectura.conexion() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT {columnas}
+            FROM clientes c
+            WHERE c.id = ?
+        """, (cliente_id,))
+        cliente = fila(cursor)
     
-    cursor.execute("""
-        SELECT id, nombre, email, telefono, ciudad, fecha_nacimiento
-        FROM clientes
-        WHERE id = ?
-    """, (cliente_id,))
-    row = cursor.fetchone()
-    
-    if row:
-        cliente = {
-            "id": row[0],
-            "nombre": row[1],
-            "email": row[2],
-            "telefono": row[3],
-            "ciudad": row[4],
-            "fecha_nacimiento": row[5]
-        }
-    else:
-        cliente = None
-    
-    conn.close()
     return cliente
 
 @app.tool
-def buscar_clientes_por_ciudad(ciudad: str) -> List[Dict[str, Any]]:
+@ejecutor_bd.asincrono
+def buscar_clientes_por_ids(cliente_ids: List[int], campos: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Busca varios clientes por ID en una sola consulta.
+    
+    Usar en lugar de varias llamadas a buscar_cliente_por_id.
+    
+    Args:
+        cliente_ids: IDs de los clientes (hasta 200)
+        campos: Campos a devolver (id, nombre, email, telefono, ciudad, fecha_nacimiento); omitir para todos (id se incluye siempre)
+        
+    Returns:
+        Diccionario con "resultados" (clientes indexados por ID) y "no_encontrados" (IDs inexistentes)
+    """
+    ids = _validar_ids(cliente_ids)
+    columnas, _ = proyeccion(CAMPOS_CLIENTE, {}, campos, tuple(CAMPOS_CLIENTE), obligatorios=("id",))
+    
+    with pool_lectura.conexion() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT {columnas}
+            FROM json_each(?) ids
+            CROSS JOIN clientes c ON c.id = ids.value
+        """, (json.dumps(ids),))
+        clientes = {f["id"]: f for f in filas(cursor)}
+    
+    return _resultado_por_ids(ids, clientes)
+
+@app.tool
+@ejecutor_bd.asincrono
+def buscar_clientes_por_ciudad(ciudad: str, campos: Optional[List[str]] = None) -> ToolResult:
     """
     Busca clientes por ciudad.
     
     Args:
-        ciudad: Nombre de la ciudad
+        ciudad: Nombre de la ciudad o su prefijo
+        campos: Campos a devolver (id, nombre, email, telefono, ciudad, fecha_nacimiento); omitir para todos
         
     Returns:
         Lista de clientes en esa ciudad
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    columnas, _ = proyeccion(CAMPOS_CLIENTE, {}, campos, tuple(CAMPOS_CLIENTE))
+    return _listado_json(f"""
+        SELECT {columnas}
+        FROM clientes c
+        WHERE c.ciudad LIKE ? ESCAPE '\\'
+        ORDER BY c.nombre
+    """, (_patron_prefijo(ciudad),))
+
+@app.tool
+@ejecutor_bd.asincrono
+def buscar_clientes_texto(
+    texto: str, limite: int = 20, campos: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Búsqueda de texto libre sobre nombre, email y ciudad de los clientes.
     
-    cursor.execute("""
-        SELECT id, nombre, email, telefono, ciudad, fecha_nacimiento
-        FROM clientes
-        WHERE ciudad LIKE ?
-        ORDER BY nombre
-    """, (f"%{ciudad}%",))
-    rows = cursor.fetchall()
-    
-    clientes = [
+    Cada palabra se busca como prefijo e ignorando tildes ("bogota" encuentra Bogotá).
+    Los resultados se ordenan por relevancia (bm25, la columna `rank` de FTS5).
+    
+    Args:
+        texto: Palabras a buscar, por ejemplo "maria medellin"
+        limite: Número máximo de resultados (entre 1 y 200)
+        campos: Campos a devolver (id, nombre, email, telefono, ciudad, fecha_nacimiento); omitir para todos (relevancia se incluye siempre)
+        
+    Returns:
+        Lista de clientes ordenada de mayor a menor relevancia
+    """
+    _validar_limite(limite)
+    columnas, _ = proyeccion(CAMPOS_CLIENTE, {}, campos, tuple(CAMPOS_CLIENTE))
+    
+    with pool_lectura.conexion() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT {columnas},
+                   ROUND(-clientes_fts.rank, 4) AS relevancia
+            FROM clientes_fts
+            JOIN clientes c ON c.id = clientes_fts.rowid
+            WHERE clientes_fts MATCH ?
+            ORDER BY rank
+            LIMIT ?
+        """, (_consulta_fts(texto), limite))
+        clientes = filas(cursor)
+    
+    return clientes
+
+@app.tool
+@ejecutor_bd.asincrono
+@cache_resultados.cachear(tablas=("productos_seguros",))
+def buscar_productos_texto(
+    texto: str, limite: int = 20, campos: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Búsqueda de texto libre sobre nombre, tipo y descripción de los productos de seguros.
+    
+    Args:
+        texto: Palabras a buscar, por ejemplo "robo auto" o "familia"
+        limite: Número máximo de resultados (entre 1 y 200)
+        campos: Campos a devolver (id, nombre, tipo, descripcion, cobertura_base); omitir para todos (relevancia se incluye siempre)
+        
+    Returns:
+        Lista de productos ordenada de mayor a menor relevancia
+    """
+    _validar_limite(limite)
+    columnas, _ = proyeccion(CAMPOS_PRODUCTO, {}, campos, tuple(CAMPOS_PRODUCTO))
+    
+    with pool_lectura.conexion() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT {columnas},
+                   ROUND(-productos_seguros_fts.rank, 4) AS relevancia
+            FROM productos_seguros_fts
+            JOIN productos_seguros ps ON ps.id = productos_seguros_fts.rowid
+            WHERE productos_seguros_fts MATCH ?
+            ORDER BY rank
+            LIMIT ?
+        """, (_consulta_fts(texto), limite))
+        productos = filas(cursor)
+    
+    return productos
+
+@app.tool
+@ejecutor_bd.asincrono
+def resumen_cartera(
+    agrupar_por: Optional[List[str]] = None,
+    tipo: Optional[str] = None,
+    ciudad: Optional[str] = None,
+    estado: Optional[str] = None,
+    desde_mes: Optional[str] = None,
+    hasta_mes: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Cuenta pólizas y calcula totales y promedios de prima mensual y cobertura.
+    
+    Usar para preguntas como "¿cuántas pólizas activas hay?" o "prima total por tipo"
+    en lugar de descargar las pólizas y sumarlas. Lee la tabla de resumen, cuyo tamaño
+    no depende del número de pólizas.
+    
+    Args:
+        agrupar_por: Dimensiones de agrupación entre "tipo", "ciudad", "estado" y "mes"
+                     (AAAA-MM de inicio); sin dimensiones devuelve el total de la cartera
+        tipo: Filtra por tipo de seguro (Vida, Auto, Hogar, Salud, Accidentes)
+        ciudad: Filtra por ciudad del cliente
+        estado: Filtra por estado de la póliza (Activa, Vencida, Cancelada)
+        desde_mes: Primer mes de inicio incluido (AAAA-MM)
+        hasta_mes: Último mes de inicio incluido (AAAA-MM)
+        
+    Returns:
+        Una fila por grupo con polizas, prima_total, prima_promedio, cobertura_total y cobertura_promedio
+    """
+    dimensiones = list(dict.fromkeys(agrupar_por or []))
+    desconocidas = [d for d in dimensiones if d not in DIMENSIONES_RESUMEN]
+    if desconocidas:
+        raise ValueError(f"No se puede agrupar por {desconocidas}; opciones: {list(DIMENSIONES_RESUMEN)}")
+    
+    filtros = []
+    parametros: List[Any] = []
+    for columna, valor in (("tipo", tipo), ("ciudad", ciudad), ("estado", estado)):
+        if valor is not None:
+            filtros.append(f"{columna} = ? COLLATE NOCASE")
+            parametros.append(valor)
+    if desde_mes is not None:
+        filtros.append("mes >= ?")
+        parametros.append(_validar_mes(desde_mes))
+    if hasta_mes is not None:
+        filtros.append("mes <= ?")
+        parametros.append(_validar_mes(hasta_mes))
+    
+    # Las columnas salen de DIMENSIONES_RESUMEN, nunca del texto recibido
+    columnas = ", ".join(dimensiones)
+    with pool_lectura.conexion() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT {columnas + ", " if columnas else ""}
+                   SUM(polizas), SUM(prima_total), SUM(cobertura_total)
+            FROM resumen_polizas
+            {"WHERE " + " AND ".join(filtros) if filtros else ""}
+            {"GROUP BY " + columnas + " ORDER BY " + columnas if columnas else ""}
+        """, parametros)
+        rows = cursor.fetchall()
+    
+    n = len(dimensiones)
+    resumen = [
         {
-            "id": r[0],
-            "nombre": r[1],
-            "email": r[2],
-            "telefono": r[3],
-            "ciudad": r[4],
-            "fecha_nacimiento": r[5]
+            **dict(zip(dimensiones, r[:n])),
+            "polizas": r[n],
+            "prima_total": round(r[n + 1], 2),
+            "prima_promedio": round(r[n + 1] / r[n], 2),
+            "cobertura_total": round(r[n + 2], 2),
+            "cobertura_promedio": round(r[n + 2] / r[n], 2)
         }
         for r in rows
+        if r[n]
     ]
     
-    conn.close()
-    return clientes
+    return resumen
 
-if __name__ == "__main__":
-    print("=" * 60)
-    print("Inicializando Base de Datos de Seguros")
-    print("=" * 60 + "\n")
-    init_database()
+@app.tool
+async def ingerir_polizas(
+    ctx: Context,
+    contenido: str,
+    formato: str = "csv",
+    lote: int = LOTE_INGESTA,
+) -> Dict[str, Any]:
+    """
+    Inserta pólizas nuevas en bloque a partir de un archivo CSV o JSONL de un socio.
+    
+    Las filas se validan y se insertan en transacciones de `lote` filas. Una fila inválida
+    (formato, fechas, importes, estado, cliente o producto inexistente, número de póliza
+    repetido) se rechaza sola y el resto de su lote se inserta. Tras cada lote se envía una
+    notificación de progreso con el avance.
     
+    Args:
+        contenido: Texto CSV con cabecera o JSONL con un objeto por línea, con los campos
+                   numero_poliza, cliente_id, producto_id, fecha_inicio, fecha_vencimiento,
+                   prima_mensual, monto_cobertura y estado
+        formato: "csv" o "jsonl"
+        lote: Filas por transacción (entre 1 y 100000)
+        
+    Returns:
+        Filas leídas, insertadas y rechazadas, lotes, duración, filas por segundo y el detalle
+        de los primeros rechazos (línea, numero_poliza y motivo)
+        
+    Raises:
+        ValueError: Si el formato o el tamaño de lote no son válidos o faltan columnas en el CSV
+    """
+    conn = await ejecutor_bd.ejecutar(abrir_conexion, DB_PATH, PERFIL.pragmas_conexion())
+    generador = ingerir(conn, leer_registros(io.StringIO(contenido.lstrip("\ufeff")), formato), lote)
+    resultado: Dict[str, Any] = {}
+    paso: Optional[asyncio.Future] = None
+    try:
+        while True:
+            # Cada lote se valida e inserta en un hilo de base de datos; si se cancela la herramienta,
+            # el lote en curso se confirma o deshace antes de cerrar el generador y la conexión
+            paso = asyncio.ensure_future(ejecutor_bd.ejecutar(next, generador, None))
+            avance = await asyncio.shield(paso)
+            if avance is None:
+                break
+            resultado = avance
+            await ctx.report_progress(
+                avance["leidas"],
+                None,
+                f"{avance['insertadas']} insertadas, {avance['rechazadas']} rechazadas "
+                f"({avance['filas_por_segundo']:.0f} filas/s)",
+            )
+    finally:
+        resultado = await _cerrar_en_bd(paso, generador.close, conn.close) or resultado
+        if resultado.get("insertadas"):
+            # Igual que en init_database: primero la réplica, después la caché
+            if isinstance(pool_lectura, ReplicaLectura):
+                await ejecutor_bd.ejecutar(pool_lectura.refrescar)
+            cache_resultados.invalidar("polizas")
+    
+    return resultado
+
+@app.resource("metricas://pool")
+def metricas_pool() -> Dict[str, Any]:
+    """Métricas del pool de conexiones: aciertos, conexiones creadas y esperas"""
+    return pool_lectura.metricas()
+
+@app.resource("metricas://cache")
+def metricas_cache() -> Dict[str, Any]:
+    """Métricas de la caché de resultados: aciertos, fallos, expulsiones, invalidaciones y descartadas"""
+    return cache_resultados.metricas()
+
+@app.resource("metricas://replica")
+def metricas_replica() -> Dict[str, Any]:
+    """Estado de la réplica de lectura: copias, renovaciones omitidas, errores y desfase en segundos"""
+    if isinstance(pool_lectura, ReplicaLectura):
+        return pool_lectura.metricas_replica()
+    return {"modo": "directo", "desfase_s": 0.0}
+
+@app.resource("metricas://ejecutor")
+def metricas_ejecutor() -> Dict[str, Any]:
+    """Métricas del ejecutor de base de datos: consultas en curso, en cola y rechazadas"""
+    return ejecutor_bd.metricas()
+
+# Con el lanzador cada trabajador publica sus métricas para que cualquiera pueda sumarlas
+publicador_metricas: Optional[PublicadorMetricas] = None
+
+def metricas_proceso() -> MetricasProceso:
+    """Métricas de este proceso agrupadas por componente"""
+    return {
+        "pool": pool_lectura.metricas(),
+        "cache": cache_resultados.metricas(),
+        "ejecutor": ejecutor_bd.metricas(),
+        "replica": metricas_replica(),
+    }
+
+def publicar_metricas(directorio: str, intervalo: float = 2.0):
+    """
+    Publica periódicamente las métricas de este proceso en un directorio compartido.
+    
+    Args:
+        directorio: Directorio común a todos los trabajadores del lanzador
+        intervalo: Segundos entre publicaciones
+    """
+    global publicador_metricas
+    publicador_metricas = PublicadorMetricas(directorio, metricas_proceso, intervalo)
+    publicador_metricas.iniciar()
+    atexit.register(publicador_metricas.cerrar)
+
+@app.resource("metricas://trabajadores")
+def metricas_trabajadores() -> Dict[str, Any]:
+    """Métricas de todos los procesos del lanzador, por PID y sumadas; sin lanzador, las de este proceso"""
+    if publicador_metricas is None:
+        por_trabajador = {str(os.getpid()): metricas_proceso()}
+        return {"trabajadores": por_trabajador, "totales": por_trabajador[str(os.getpid())]}
+    publicador_metricas.publicar()
+    return publicador_metricas.leer()
+
+def mostrar_banner(direccion: str):
+    """Imprime las herramientas y recursos que expone el servidor"""
     print("\n" + "=" * 60)
     print("Servidor MCP - Aseguradora")
     print("=" * 60)
-    print("\n🚀 Iniciando servidor en http://localhost:8200")
+    print(f"\n🚀 Iniciando servidor en {direccion}")
     print("\n📋 Herramientas disponibles:")
     print("   • obtener_todas_polizas")
+    print("   • obtener_polizas_paginadas")
+    print("   • exportar_polizas")
     print("   • buscar_poliza_por_id")
+    print("   • buscar_polizas_por_ids")
     print("   • buscar_polizas_por_cliente")
     print("   • buscar_polizas_por_tipo")
+    print("   • polizas_por_vencer")
     print("   • obtener_productos_seguros")
     print("   • buscar_producto_seguro")
+    print("   • buscar_productos_por_ids")
     print("   • obtener_todos_clientes")
+    print("   • obtener_clientes_paginados")
     print("   • buscar_cliente_por_id")
+    print("   • buscar_clientes_por_ids")
     print("   • buscar_clientes_por_ciudad")
+    print("   • buscar_clientes_texto")
+    print("   • buscar_productos_texto")
+    print("   • resumen_cartera")
+    print("   • ingerir_polizas")
+    print("\n📊 Recursos:")
+    print("   • metricas://pool")
+    print("   • metricas://cache")
+    print("   • metricas://ejecutor")
+    print("   • metricas://replica")
+    print("   • metricas://trabajadores")
     print("\n💡 Presiona Ctrl+C para detener el servidor\n")
     print("=" * 60 + "\n")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor MCP de la aseguradora")
+    parser.add_argument(
+        "--transporte", choices=("streamable-http", "stdio"), default="streamable-http",
+        help="stdio para que un agente lance el servidor como subproceso",
+    )
+    parser.add_argument("--puerto", type=int, default=8200)
+    args = parser.parse_args()
+    
+    # Con stdio, stdout es el canal del protocolo: los mensajes de arranque van a stderr
+    with contextlib.redirect_stdout(sys.stderr if args.transporte == "stdio" else sys.stdout):
+        if INICIO_DIFERIDO:
+            ejecutor_bd.al_primer_uso(init_database)
+        else:
+            print("=" * 60)
+            print("Inicializando Base de Datos de Seguros")
+            print("=" * 60 + "\n")
+            init_database()
+        
+        mostrar_banner("stdio" if args.transporte == "stdio" else f"http://localhost:{args.puerto}")
     
-    app.run(transport="streamable-http", host="0.0.0.0", port=8200)
+    # El banner de FastMCP importa rich y consulta en PyPI si hay una versión nueva (hasta 2 s sin red)
+    if args.transporte == "stdio":
+        app.run(transport="stdio", show_banner=not INICIO_DIFERIDO)
+    else:
+        app.run(transport="streamable-http", host="0.0.0.0", port=args.puerto, show_banner=not INICIO_DIFERIDO)
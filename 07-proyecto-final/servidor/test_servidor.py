@@ -0,0 +1,1338 @@
+"""
+Tests del servidor MCP de seguros sobre una base de datos sintética grande.
+Invoca cada herramienta con el cliente en memoria de FastMCP y verifica los planes de consulta.
+
+Uso:
+    python test_servidor.py
+"""
+
+import asyncio
+import json
+import os
+import re
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import date, timedelta
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from fastmcp import Client
+from fastmcp.client.transports import StdioTransport
+
+import generar_datos
+import ingesta
+import servidor_seguros
+from cache_resultados import CacheResultados
+from consultas import CONSULTAS_JSON_MAXIMAS, _consultas_json, fila, filas, json_filas
+from ejecutor_bd import EjecutorBD, EjecutorSaturadoError
+from esquema import objetos_derivados
+from generar_datos import generar
+from ingesta import COLUMNAS
+from metricas_trabajadores import sumar
+from pool_conexiones import PoolConexiones
+from replica_lectura import ReplicaLectura
+
+# Argumentos de ejemplo para cada herramienta; toda herramienta nueva debe añadirse aquí
+ARGUMENTOS_HERRAMIENTAS: Dict[str, Dict[str, Any]] = {
+    "obtener_todas_polizas": {},
+    "obtener_polizas_paginadas": {"limite": 50},
+    "exportar_polizas": {"tipo": "Accidentes", "lote": 200},
+    "buscar_poliza_por_id": {"poliza_id": 1},
+    "buscar_polizas_por_ids": {"poliza_ids": [1, 50, 99999]},
+    "buscar_polizas_por_cliente": {"cliente_id": 1},
+    "buscar_polizas_por_tipo": {"tipo": "Vida"},
+    "polizas_por_vencer": {"limite": 50},
+    "obtener_productos_seguros": {},
+    "buscar_producto_seguro": {"producto_id": 1},
+    "buscar_productos_por_ids": {"producto_ids": [1, 2, 3]},
+    "obtener_todos_clientes": {},
+    "obtener_clientes_paginados": {"limite": 50},
+    "buscar_cliente_por_id": {"cliente_id": 1},
+    "buscar_clientes_por_ids": {"cliente_ids": [1, 2, 500]},
+    "buscar_clientes_por_ciudad": {"ciudad": "Bogotá"},
+    "buscar_clientes_texto": {"texto": "maria medellin"},
+    "buscar_productos_texto": {"texto": "familia"},
+    "resumen_cartera": {"agrupar_por": ["tipo", "estado"], "ciudad": "Bogotá"},
+    "ingerir_polizas": {
+        "contenido": json.dumps({
+            "numero_poliza": "POL-TEST-0001", "cliente_id": 1, "producto_id": 1, "fecha_inicio": "2025-01-01",
+            "fecha_vencimiento": "2026-01-01", "prima_mensual": 100, "monto_cobertura": 100000, "estado": "Activa",
+        }),
+        "formato": "jsonl",
+    },
+}
+
+# Herramientas que por diseño recorren la tabla completa
+RECORRIDOS_PERMITIDOS = {
+    "obtener_todas_polizas",
+    "exportar_polizas",
+    "obtener_productos_seguros",
+    "obtener_todos_clientes",
+    # Recorre la tabla de resumen, acotada por el número de grupos y no por el de pólizas
+    "resumen_cartera",
+}
+
+def print_test_header(test_name: str):
+    """Imprime encabezado para cada test"""
+    print(f"\n{'=' * 60}")
+    print(f"Test: {test_name}")
+    print('=' * 60)
+
+
+def crear_base_sintetica(db_path: str, clientes: int = 20000, polizas: int = 100000):
+    """Crea la base de datos del servidor y la llena con datos sintéticos reproducibles"""
+    generar(db_path, clientes, polizas, semilla=42)
+
+
+async def capturar_consultas(db_path: str) -> Dict[str, List[str]]:
+    """Ejecuta cada herramienta y registra las sentencias SQL que lanza"""
+    pool = PoolConexiones(db_path, tamano=1)
+    sentencias: List[str] = []
+    with pool.conexion() as conn:
+        conn.set_trace_callback(sentencias.append)
+    servidor_seguros.pool_lectura = pool
+    # La herramienta de ingesta escribe con su propia conexión sobre DB_PATH
+    servidor_seguros.DB_PATH = db_path
+
+    consultas: Dict[str, List[str]] = {}
+    async with Client(servidor_seguros.app) as client:
+        herramientas = {tool.name for tool in await client.list_tools()}
+        sin_argumentos = herramientas - set(ARGUMENTOS_HERRAMIENTAS)
+        if sin_argumentos:
+            raise AssertionError(f"Herramientas sin argumentos de prueba: {sorted(sin_argumentos)}")
+
+        for nombre in sorted(herramientas):
+            sentencias.clear()
+            await client.call_tool(nombre, ARGUMENTOS_HERRAMIENTAS[nombre])
+            # Se descarta el `SELECT 1` con el que el pool verifica la conexión
+            consultas[nombre] = [
+                s for s in sentencias
+                if s.lstrip().upper().startswith("SELECT") and s.strip() != "SELECT 1"
+            ]
+    return consultas
+
+
+def es_recorrido(paso: str) -> bool:
+    """Indica si un paso del plan recorre una tabla completa"""
+    if not paso.startswith("SCAN"):
+        return False
+    # FTS5 resuelve MATCH con su propio índice (idxStr con "M") y lee su tabla de configuración
+    if re.search(r"VIRTUAL TABLE INDEX \d+:M", paso) or re.match(r"SCAN main\.\w+_fts_config", paso):
+        return False
+    # json_each recorre la lista de IDs recibida como argumento, no una tabla
+    if re.match(r"SCAN (json_each|ids) VIRTUAL TABLE", paso):
+        return False
+    # Las filas de una subconsulta (por ejemplo la que envuelve `json_filas`) ya salieron de su propio plan
+    if re.match(r"SCAN \(subquery-\d+\)", paso):
+        return False
+    return True
+
+
+def test_planes_consulta(db_path: str, consultas: Dict[str, List[str]]) -> bool:
+    """Verifica que ninguna consulta de búsqueda haga un recorrido completo (SCAN)"""
+    print_test_header("EXPLAIN QUERY PLAN de cada herramienta")
+
+    conn = sqlite3.connect(db_path)
+    exito = True
+    for nombre, sentencias in consultas.items():
+        for sentencia in sentencias:
+            plan = [fila[3] for fila in conn.execute(f"EXPLAIN QUERY PLAN {sentencia}")]
+            recorridos = [paso for paso in plan if es_recorrido(paso)]
+            if recorridos and nombre not in RECORRIDOS_PERMITIDOS:
+                exito = False
+                print(f"❌ {nombre}: {'; '.join(plan)}")
+            else:
+                print(f"✅ {nombre}: {'; '.join(plan)}")
+    conn.close()
+    return exito
+
+
+def test_busquedas_por_prefijo(consultas: Dict[str, List[str]]) -> bool:
+    """Verifica que las búsquedas por texto no usen comodines iniciales"""
+    print_test_header("Búsquedas por prefijo")
+
+    exito = True
+    for nombre in ("buscar_polizas_por_tipo", "buscar_clientes_por_ciudad"):
+        if any("LIKE '%" in sentencia for sentencia in consultas[nombre]):
+            print(f"❌ {nombre} usa LIKE con comodín inicial")
+            exito = False
+        else:
+            print(f"✅ {nombre} usa LIKE por prefijo")
+    return exito
+
+
+async def test_paginacion(db_path: str) -> bool:
+    """Recorre todas las páginas y verifica que no se repitan ni se pierdan filas"""
+    print_test_header("Paginación por cursor")
+
+    conn = sqlite3.connect(db_path)
+    totales = {
+        "obtener_polizas_paginadas": conn.execute("SELECT COUNT(*) FROM polizas").fetchone()[0],
+        "obtener_clientes_paginados": conn.execute("SELECT COUNT(*) FROM clientes").fetchone()[0],
+    }
+    conn.close()
+
+    exito = True
+    async with Client(servidor_seguros.app) as client:
+        for herramienta, clave in (("obtener_polizas_paginadas", "polizas"), ("obtener_clientes_paginados", "clientes")):
+            vistos = set()
+            paginas = 0
+            cursor = None
+            while True:
+                argumentos = {"limite": servidor_seguros.LIMITE_MAXIMO}
+                if cursor:
+                    argumentos["cursor"] = cursor
+                pagina = (await client.call_tool(herramienta, argumentos)).data
+                if len(pagina[clave]) > servidor_seguros.LIMITE_MAXIMO:
+                    exito = False
+                vistos.update(fila["id"] for fila in pagina[clave])
+                paginas += 1
+                cursor = pagina["siguiente_cursor"]
+                if cursor is None:
+                    break
+
+            if len(vistos) == totales[herramienta]:
+                print(f"✅ {herramienta}: {len(vistos)} filas en {paginas} páginas")
+            else:
+                print(f"❌ {herramienta}: {len(vistos)} filas distintas, se esperaban {totales[herramienta]}")
+                exito = False
+    return exito
+
+
+async def test_polizas_por_vencer(db_path: str) -> bool:
+    """Recorre las páginas de pólizas por vencer y las compara con un filtro directo"""
+    print_test_header("Pólizas por vencer")
+
+    # El generador reparte los vencimientos entre hace dos años y dentro de un año
+    hoy = date.today()
+    desde, hasta = (hoy + timedelta(days=10)).isoformat(), (hoy + timedelta(days=55)).isoformat()
+    conn = sqlite3.connect(db_path)
+    esperadas = [
+        fila[0]
+        for fila in conn.execute(
+            "SELECT id FROM polizas WHERE estado = 'Activa' AND fecha_vencimiento BETWEEN ? AND ? "
+            "ORDER BY fecha_vencimiento, id",
+            (desde, hasta),
+        )
+    ]
+    conn.close()
+
+    obtenidas: List[int] = []
+    paginas = 0
+    async with Client(servidor_seguros.app) as client:
+        cursor = None
+        while True:
+            argumentos = {"desde": desde, "hasta": hasta, "limite": servidor_seguros.LIMITE_MAXIMO}
+            if cursor:
+                argumentos["cursor"] = cursor
+            pagina = (await client.call_tool("polizas_por_vencer", argumentos)).data
+            obtenidas.extend(p["id"] for p in pagina["polizas"])
+            paginas += 1
+            cursor = pagina["siguiente_cursor"]
+            if cursor is None:
+                break
+
+        try:
+            await client.call_tool("polizas_por_vencer", {"desde": "15/01/2026"})
+            print("❌ Se aceptó una fecha con formato inválido")
+            return False
+        except Exception:
+            pass
+
+    if esperadas and obtenidas == esperadas:
+        print(f"✅ {len(obtenidas)} pólizas entre {desde} y {hasta} en {paginas} páginas, en orden de vencimiento")
+        return True
+    print(f"❌ Se obtuvieron {len(obtenidas)} pólizas, se esperaban {len(esperadas)} en ese orden")
+    return False
+
+
+async def test_busqueda_texto(db_path: str) -> bool:
+    """Verifica el ranking y que los triggers mantengan el índice FTS5 sincronizado"""
+    print_test_header("Búsqueda de texto completo (FTS5)")
+
+    exito = True
+    async with Client(servidor_seguros.app) as client:
+        productos = (await client.call_tool("buscar_productos_texto", {"texto": "familia"})).data
+        if productos and productos[0]["nombre"] == "Seguro de Salud Familiar":
+            print("✅ 'familia' devuelve primero el Seguro de Salud Familiar")
+        else:
+            print(f"❌ Resultado inesperado para 'familia': {productos[:1]}")
+            exito = False
+
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "INSERT INTO clientes (nombre, email, ciudad) VALUES ('Xiomara Quintero', 'xiomara@test.com', 'Popayán')"
+        )
+        conn.commit()
+        encontrados = (await client.call_tool("buscar_clientes_texto", {"texto": "xiomara popayan"})).data
+        if len(encontrados) == 1:
+            print("✅ Cliente insertado encontrado sin tildes ('popayan')")
+        else:
+            print(f"❌ Tras INSERT se esperaba 1 resultado, hubo {len(encontrados)}")
+            exito = False
+
+        conn.execute("UPDATE clientes SET ciudad = 'Neiva' WHERE email = 'xiomara@test.com'")
+        conn.commit()
+        antes = (await client.call_tool("buscar_clientes_texto", {"texto": "xiomara popayan"})).data
+        despues = (await client.call_tool("buscar_clientes_texto", {"texto": "xiomara neiva"})).data
+
+        conn.execute("DELETE FROM clientes WHERE email = 'xiomara@test.com'")
+        conn.commit()
+        conn.close()
+        borrado = (await client.call_tool("buscar_clientes_texto", {"texto": "xiomara"})).data
+
+        if not antes and len(despues) == 1 and not borrado:
+            print("✅ UPDATE y DELETE se reflejan en el índice")
+        else:
+            print("❌ El índice FTS5 no refleja UPDATE/DELETE")
+            exito = False
+    return exito
+
+
+async def test_busqueda_por_ids() -> bool:
+    """Verifica que las búsquedas por lote coincidan con las individuales e informen de los IDs inexistentes"""
+    print_test_header("Búsqueda por lote de IDs")
+
+    casos = [
+        ("buscar_polizas_por_ids", "poliza_ids", "buscar_poliza_por_id", "poliza_id"),
+        ("buscar_clientes_por_ids", "cliente_ids", "buscar_cliente_por_id", "cliente_id"),
+        ("buscar_productos_por_ids", "producto_ids", "buscar_producto_seguro", "producto_id"),
+    ]
+    ids = [3, 1, 3, 2, 10_000_000]
+
+    exito = True
+    async with Client(servidor_seguros.app) as client:
+        for lote, parametro_lote, individual, parametro in casos:
+            respuesta = (await client.call_tool(lote, {parametro_lote: ids})).data
+            esperados = {}
+            for i in dict.fromkeys(ids):
+                fila = (await client.call_tool(individual, {parametro: i})).data
+                if fila is not None:
+                    esperados[str(i)] = fila
+
+            if respuesta["resultados"] == esperados and respuesta["no_encontrados"] == [10_000_000]:
+                print(f"✅ {lote}: {len(esperados)} encontrados, no_encontrados={respuesta['no_encontrados']}")
+            else:
+                print(f"❌ {lote} no coincide con {individual}: {respuesta}")
+                exito = False
+
+        try:
+            await client.call_tool("buscar_clientes_por_ids", {"cliente_ids": []})
+            print("❌ Una lista vacía de IDs debería rechazarse")
+            exito = False
+        except Exception:
+            print("✅ Una lista vacía de IDs se rechaza")
+    return exito
+
+
+async def test_listados_json(db_path: str, consultas: Dict[str, List[str]]) -> bool:
+    """Verifica que los listados generados como JSON en SQLite coincidan con las filas de su consulta"""
+    print_test_header("Listados serializados en SQLite")
+
+    listados = ("obtener_todas_polizas", "buscar_polizas_por_tipo", "obtener_todos_clientes", "buscar_clientes_por_ciudad")
+    conn = sqlite3.connect(db_path)
+    exito = True
+    async with Client(servidor_seguros.app) as client:
+        for nombre in listados:
+            respuesta = await client.call_tool(nombre, ARGUMENTOS_HERRAMIENTAS[nombre])
+            obtenidos = json.loads(respuesta.content[0].text)
+            # La consulta envuelta en json_group_array lleva dentro la original: se ejecuta esta
+            envuelta = next(sql for sql in reversed(consultas[nombre]) if "json_group_array" in sql)
+            original = re.search(r"FROM \((.*)\)\s*$", envuelta, re.S).group(1)
+            esperados = filas(conn.execute(original))
+            if obtenidos and obtenidos == esperados:
+                print(f"✅ {nombre}: {len(obtenidos)} filas iguales y en el mismo orden")
+            else:
+                print(f"❌ {nombre}: {len(obtenidos)} filas en JSON, {len(esperados)} en la consulta original")
+                exito = False
+
+        # Los listados cortados en LISTADO_MAXIMO lo avisan con un cursor para la herramienta paginada
+        for nombre, paginada, lista in (
+            ("obtener_todas_polizas", "obtener_polizas_paginadas", "polizas"),
+            ("obtener_todos_clientes", "obtener_clientes_paginados", "clientes"),
+        ):
+            respuesta = await client.call_tool(nombre, {"campos": ["id"]})
+            aviso = json.loads(respuesta.content[1].text) if len(respuesta.content) > 1 else {}
+            orden = "p.numero_poliza" if lista == "polizas" else "c.nombre, c.id"
+            siguiente = conn.execute(
+                f"SELECT id FROM {lista} {lista[0]} ORDER BY {orden} LIMIT 1 OFFSET ?",
+                (servidor_seguros.LISTADO_MAXIMO,),
+            ).fetchone()[0]
+            pagina = {}
+            if aviso.get("truncado"):
+                pagina = (await client.call_tool(paginada, {"limite": 1, "cursor": aviso["siguiente_cursor"]})).data
+            if pagina and pagina[lista][0]["id"] == siguiente:
+                print(f"✅ {nombre} avisa del corte y {paginada} sigue en la fila {servidor_seguros.LISTADO_MAXIMO + 1}")
+            else:
+                print(f"❌ {nombre}: aviso de corte {aviso}, página siguiente {pagina}")
+                exito = False
+
+        respuesta = await client.call_tool(
+            "buscar_clientes_por_ciudad", ARGUMENTOS_HERRAMIENTAS["buscar_clientes_por_ciudad"]
+        )
+        if len(respuesta.content) == 1:
+            print("✅ Los listados sin tope responden solo con el array JSON")
+        else:
+            print(f"❌ buscar_clientes_por_ciudad devolvió {len(respuesta.content)} contenidos")
+            exito = False
+
+    if fila(conn.execute("SELECT id FROM clientes WHERE id = -1")) is None:
+        print("✅ fila() devuelve None si no hay resultados")
+    else:
+        print("❌ fila() debería devolver None sin resultados")
+        exito = False
+    conn.close()
+
+    # Varios hilos llenando y vaciando a la vez la caché de consultas JSON
+    errores: List[BaseException] = []
+
+    def consultar(hilo: int):
+        conn_hilo = sqlite3.connect(db_path)
+        try:
+            for i in range(CONSULTAS_JSON_MAXIMAS // 2):
+                sql = f"SELECT id AS id, {hilo * 1000 + i} AS n FROM clientes WHERE id = ?"
+                texto = json_filas(conn_hilo, sql, (1,))
+                if json.loads(texto) != [{"id": 1, "n": hilo * 1000 + i}]:
+                    raise AssertionError(texto)
+        except BaseException as e:
+            errores.append(e)
+        finally:
+            conn_hilo.close()
+
+    hilos = [threading.Thread(target=consultar, args=(hilo,)) for hilo in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    if not errores and len(_consultas_json) <= CONSULTAS_JSON_MAXIMAS:
+        print(f"✅ json_filas desde 8 hilos con descartes: sin errores, {len(_consultas_json)} consultas en caché")
+    else:
+        print(f"❌ json_filas concurrente: {errores[:1]}, {len(_consultas_json)} consultas en caché")
+        exito = False
+    return exito
+
+
+async def test_exportar_polizas(db_path: str) -> bool:
+    """Verifica que la exportación transmita todas las filas por lotes con memoria acotada"""
+    print_test_header("Exportación de pólizas por lotes")
+
+    conn = sqlite3.connect(db_path)
+    esperados = [
+        fila[0] for fila in conn.execute("""
+            SELECT p.id FROM polizas p JOIN productos_seguros ps ON ps.id = p.producto_id
+            WHERE ps.tipo = 'Vida' ORDER BY p.numero_poliza
+        """)
+    ]
+    conn.close()
+
+    recibidos: List[int] = []
+    bytes_recibidos = 0
+
+    async def recibir_lote(progreso: float, total: Any, mensaje: str):
+        nonlocal bytes_recibidos
+        bytes_recibidos += len(mensaje)
+        recibidos.extend(poliza["id"] for poliza in json.loads(mensaje))
+
+    exito = True
+    async with Client(servidor_seguros.app, progress_handler=recibir_lote) as client:
+        tracemalloc.start()
+        try:
+            resumen = (await client.call_tool("exportar_polizas", {"tipo": "Vida", "lote": 200})).data
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        if recibidos == esperados and resumen["filas"] == len(esperados) and resumen["transmitido"]:
+            print(f"✅ {resumen['filas']} pólizas en {resumen['lotes']} lotes, primera fila en {resumen['primera_fila_ms']:.1f}ms")
+        else:
+            print(f"❌ Se recibieron {len(recibidos)} pólizas de {len(esperados)}: {resumen}")
+            exito = False
+
+        # El pico incluye el cliente en memoria; sin transmisión superaría el tamaño del JSON completo
+        if pico < bytes_recibidos / 4:
+            print(f"✅ Pico de memoria {pico / 1e6:.1f} MB para {bytes_recibidos / 1e6:.1f} MB transmitidos")
+        else:
+            print(f"❌ Pico de memoria {pico / 1e6:.1f} MB para {bytes_recibidos / 1e6:.1f} MB transmitidos")
+            exito = False
+
+        # Sin progressToken cada lote llega como bloque de contenido, seguido del resumen
+        sin_progreso = await client.session.call_tool("exportar_polizas", {"tipo": "Accidentes", "estado": "Activa", "lote": 1000})
+        resumen = json.loads(sin_progreso.content[-1].text)
+        bloques = [json.loads(bloque.text) for bloque in sin_progreso.content[:-1]]
+        if not resumen["transmitido"] and len(bloques) == resumen["lotes"] and sum(map(len, bloques)) == resumen["filas"] > 0:
+            print(f"✅ Sin notificaciones de progreso: {resumen['lotes']} bloques de contenido")
+        else:
+            print(f"❌ Respuesta sin notificaciones de progreso incorrecta: {resumen}")
+            exito = False
+
+    # Cancelación con un lote leyéndose en un hilo (el timeout del agente cancela la llamada): el lote
+    # termina, después se cierra el generador y la conexión vuelve al pool
+    lotes_originales = servidor_seguros._lotes_polizas
+    generadores = []
+
+    def lotes_lentos(*args):
+        lotes = lotes_originales(*args)
+        try:
+            for polizas in lotes:
+                time.sleep(0.3)
+                yield polizas
+        finally:
+            lotes.close()
+
+    def registrar(*args):
+        generadores.append(lotes_lentos(*args))
+        return generadores[-1]
+
+    servidor_seguros._lotes_polizas = registrar
+    try:
+        sin_progreso = SimpleNamespace(request_context=None)
+        tarea = asyncio.create_task(servidor_seguros.exportar_polizas(sin_progreso, lote=100))
+        await asyncio.sleep(0.1)
+        tarea.cancel()
+        error = None
+        try:
+            await tarea
+        except BaseException as e:
+            error = e
+    finally:
+        servidor_seguros._lotes_polizas = lotes_originales
+    pool = servidor_seguros.pool_lectura.metricas()
+    tomadas = pool["abiertas"] - pool["libres"]
+    if isinstance(error, asyncio.CancelledError) and generadores[0].gi_frame is None and tomadas == 0:
+        print("✅ Exportación cancelada a mitad de lote: CancelledError, generador cerrado y conexión devuelta")
+    else:
+        print(f"❌ Exportación cancelada: {error!r}, conexiones tomadas {tomadas}")
+        exito = False
+    return exito
+
+
+async def test_proyeccion_campos() -> bool:
+    """Verifica que `campos` limite las columnas devueltas y omita los JOIN que no se necesitan"""
+    print_test_header("Proyección de campos")
+
+    sentencias: List[str] = []
+    with servidor_seguros.pool_lectura.conexion() as conn:
+        conn.set_trace_callback(sentencias.append)
+
+    exito = True
+    async with Client(servidor_seguros.app) as client:
+        casos = [
+            ("buscar_poliza_por_id", {"poliza_id": 5, "campos": ["prima_mensual"]}, {"prima_mensual"}, []),
+            ("buscar_poliza_por_id", {"poliza_id": 5, "campos": ["estado", "tipo"]}, {"estado", "tipo"}, ["productos_seguros"]),
+            ("buscar_poliza_por_id", {"poliza_id": 5, "campos": ["cliente"]}, {"cliente"}, ["clientes"]),
+            ("buscar_cliente_por_id", {"cliente_id": 5, "campos": ["email"]}, {"email"}, []),
+        ]
+        for herramienta, argumentos, esperados, uniones in casos:
+            sentencias.clear()
+            resultado = (await client.call_tool(herramienta, argumentos)).data
+            unidas = sorted(set(re.findall(r"JOIN (\w+)", " ".join(sentencias))))
+            if set(resultado) == esperados and unidas == uniones:
+                print(f"✅ {herramienta}{argumentos['campos']}: {sorted(resultado)}, JOIN {unidas or 'ninguno'}")
+            else:
+                print(f"❌ {herramienta}{argumentos['campos']}: {sorted(resultado)}, JOIN {unidas}")
+                exito = False
+
+        completa = (await client.call_tool("buscar_poliza_por_id", {"poliza_id": 5})).data
+        reducida = (await client.call_tool("buscar_poliza_por_id", {"poliza_id": 5, "campos": ["prima_mensual"]})).data
+        if reducida["prima_mensual"] == completa["prima_mensual"] and len(completa) == 12:
+            print("✅ El valor proyectado coincide con el de la póliza completa")
+        else:
+            print(f"❌ {reducida} no coincide con {completa}")
+            exito = False
+
+        # Las claves del cursor y de los lotes por ID se añaden aunque no se pidan
+        pagina = (await client.call_tool("polizas_por_vencer", {"limite": 5, "campos": ["prima_mensual"]})).data
+        siguiente = (await client.call_tool(
+            "polizas_por_vencer", {"limite": 5, "campos": ["prima_mensual"], "cursor": pagina["siguiente_cursor"]}
+        )).data
+        lote = (await client.call_tool("buscar_polizas_por_ids", {"poliza_ids": [1, 2], "campos": ["estado"]})).data
+        listado = json.loads((await client.call_tool(
+            "buscar_polizas_por_tipo", {"tipo": "Hogar", "campos": ["prima_mensual"]}
+        )).content[0].text)
+        if (
+            set(pagina["polizas"][0]) == {"id", "fecha_vencimiento", "prima_mensual"}
+            and siguiente["polizas"][0]["id"] not in {p["id"] for p in pagina["polizas"]}
+            and all(set(poliza) == {"id", "estado"} for poliza in lote["resultados"].values())
+            and listado and all(set(poliza) == {"prima_mensual"} for poliza in listado)
+        ):
+            print("✅ Paginación, lotes por ID y listados funcionan con campos reducidos")
+        else:
+            print(f"❌ Proyección incorrecta: {pagina['polizas'][:1]} {lote} {listado[:1]}")
+            exito = False
+
+        for argumentos in ({"poliza_id": 5, "campos": ["saldo"]}, {"poliza_id": 5, "campos": []}):
+            try:
+                await client.call_tool("buscar_poliza_por_id", argumentos)
+                print(f"❌ campos={argumentos['campos']} debería rechazarse")
+                exito = False
+            except Exception:
+                print(f"✅ campos={argumentos['campos']} se rechaza")
+
+    with servidor_seguros.pool_lectura.conexion() as conn:
+        conn.set_trace_callback(None)
+    return exito
+
+
+async def test_resumen_cartera(db_path: str, consultas: Dict[str, List[str]]) -> bool:
+    """Compara el resumen mantenido por triggers con una agregación directa de las pólizas"""
+    print_test_header("Resumen de la cartera")
+
+    agregacion_directa = """
+        SELECT ps.tipo, p.estado, COUNT(*), ROUND(SUM(p.prima_mensual), 2), ROUND(SUM(p.monto_cobertura), 2)
+        FROM polizas p
+        JOIN productos_seguros ps ON ps.id = p.producto_id
+        JOIN clientes c ON c.id = p.cliente_id
+        WHERE c.ciudad = 'Bogotá'
+        GROUP BY 1, 2 ORDER BY 1, 2
+    """
+    argumentos = ARGUMENTOS_HERRAMIENTAS["resumen_cartera"]
+
+    exito = True
+    tablas = {tabla for s in consultas["resumen_cartera"] for tabla in re.findall(r"FROM (\w+)", s)}
+    if tablas == {"resumen_polizas"}:
+        print("✅ resumen_cartera solo lee la tabla de resumen")
+    else:
+        print(f"❌ resumen_cartera lee {sorted(tablas)}")
+        exito = False
+
+    conn = sqlite3.connect(db_path)
+    async with Client(servidor_seguros.app) as client:
+        async def comparar(etapa: str) -> bool:
+            esperado = [tuple(fila) for fila in conn.execute(agregacion_directa)]
+            obtenido = [
+                (f["tipo"], f["estado"], f["polizas"], f["prima_total"], f["cobertura_total"])
+                for f in (await client.call_tool("resumen_cartera", argumentos)).data
+            ]
+            if obtenido == esperado:
+                print(f"✅ Coincide con la agregación directa {etapa} ({len(obtenido)} grupos)")
+                return True
+            print(f"❌ Difiere de la agregación directa {etapa}")
+            return False
+
+        exito = await comparar("tras la carga") and exito
+
+        conn.execute(
+            "INSERT INTO polizas (numero_poliza, cliente_id, producto_id, fecha_inicio, fecha_vencimiento, "
+            "prima_mensual, monto_cobertura, estado) VALUES ('POL-TEST-1', 7, 2, '2025-01-15', '2026-01-15', 99.5, 5000, 'Activa')"
+        )
+        conn.execute("UPDATE clientes SET ciudad = 'Bogotá' WHERE id IN (SELECT cliente_id FROM polizas LIMIT 3)")
+        conn.execute("UPDATE polizas SET estado = 'Cancelada' WHERE id IN (SELECT id FROM polizas LIMIT 5)")
+        conn.execute("DELETE FROM polizas WHERE id IN (SELECT id FROM polizas ORDER BY id DESC LIMIT 5)")
+        conn.commit()
+
+        exito = await comparar("tras INSERT/UPDATE/DELETE") and exito
+
+        try:
+            await client.call_tool("resumen_cartera", {"agrupar_por": ["prima_mensual"]})
+            print("❌ Se aceptó una dimensión de agrupación no permitida")
+            exito = False
+        except Exception:
+            print("✅ Las dimensiones de agrupación se validan")
+    conn.close()
+    return exito
+
+
+async def test_cache_resultados(db_path: str) -> bool:
+    """Verifica que un acierto no ejecute SQL y que invalidar una tabla descarte sus entradas"""
+    print_test_header("Caché de resultados")
+
+    cache = servidor_seguros.cache_resultados
+    cache.limpiar()
+    sentencias: List[str] = []
+    with servidor_seguros.pool_lectura.conexion() as conn:
+        conn.set_trace_callback(sentencias.append)
+
+    exito = True
+    async with Client(servidor_seguros.app) as client:
+        antes = cache.metricas()
+        primero = (await client.call_tool("buscar_cliente_por_id", {"cliente_id": 7})).data
+        ejecutadas = len(sentencias)
+        segundo = (await client.call_tool("buscar_cliente_por_id", {"cliente_id": 7})).data
+        despues = cache.metricas()
+
+        if segundo == primero and len(sentencias) == ejecutadas and despues["aciertos"] == antes["aciertos"] + 1:
+            print("✅ La segunda llamada se sirve desde la caché sin consultar la base de datos")
+        else:
+            print(f"❌ Se esperaba un acierto sin SQL: {despues}")
+            exito = False
+
+        # Las pólizas de un cliente pueden proyectar su nombre y email: también dependen de clientes
+        argumentos_polizas = {"cliente_id": 7, "campos": ["numero_poliza", "email_cliente"]}
+        await client.call_tool("buscar_polizas_por_cliente", argumentos_polizas)
+
+        conn = sqlite3.connect(db_path)
+        conn.execute("UPDATE clientes SET ciudad = 'Tunja', email = 'cliente7.nuevo@example.com' WHERE id = 7")
+        conn.commit()
+        conn.close()
+        eliminadas = cache.invalidar("clientes")
+        actualizado = (await client.call_tool("buscar_cliente_por_id", {"cliente_id": 7})).data
+        polizas = (await client.call_tool("buscar_polizas_por_cliente", argumentos_polizas)).data
+
+        if eliminadas >= 2 and actualizado["ciudad"] == "Tunja":
+            print(f"✅ invalidar('clientes') descartó {eliminadas} entradas y se lee el dato nuevo")
+        else:
+            print(f"❌ Tras invalidar se leyó {actualizado}")
+            exito = False
+        if polizas and all(p["email_cliente"] == "cliente7.nuevo@example.com" for p in polizas):
+            print("✅ buscar_polizas_por_cliente deja de servir el email anterior del cliente")
+        else:
+            print(f"❌ buscar_polizas_por_cliente siguió en caché tras cambiar el cliente: {polizas[:1]}")
+            exito = False
+
+        metricas = json.loads((await client.read_resource("metricas://cache"))[0].text)
+        if metricas["invalidaciones"] >= eliminadas and 0 < metricas["tasa_aciertos"] < 1:
+            print(f"✅ metricas://cache: {metricas}")
+        else:
+            print(f"❌ Métricas inesperadas: {metricas}")
+            exito = False
+
+    with servidor_seguros.pool_lectura.conexion() as conn:
+        conn.set_trace_callback(None)
+
+    # Una invalidación mientras la consulta se ejecuta (ingesta desde otro hilo) gana al guardado tardío
+    aislada = CacheResultados(capacidad=10, ttl=60)
+    ejecuciones = []
+
+    @aislada.cachear(["polizas"])
+    def contar_polizas():
+        ejecuciones.append(1)
+        if len(ejecuciones) == 1:
+            aislada.invalidar("polizas")
+            return "antes de la ingesta"
+        return "después de la ingesta"
+
+    contar_polizas()
+    segundo = contar_polizas()
+    if segundo == "después de la ingesta" and aislada.metricas()["descartadas"] == 1:
+        print("✅ Un resultado invalidado durante su consulta no se guarda en la caché")
+    else:
+        print(f"❌ Se sirvió un resultado anterior a la invalidación: {segundo!r}")
+        exito = False
+    return exito
+
+
+async def test_ingesta(db_path: str) -> bool:
+    """Verifica que la ingesta inserte por lotes, rechace filas sueltas sin abortar su lote e invalide la caché"""
+    print_test_header("Ingesta de pólizas")
+
+    conn = sqlite3.connect(db_path)
+    existente = conn.execute("SELECT numero_poliza FROM polizas ORDER BY id DESC LIMIT 1").fetchone()[0]
+    conn.close()
+    contenido = "\n".join([
+        ",".join(COLUMNAS),
+        "POL-ING-0001,1,1,2025-01-01,2026-01-01,120.5,50000,Activa",
+        "POL-ING-0002,2,3,2025-02-01,2025-01-01,90,40000,Activa",
+        "POL-ING-0003,999999999,2,2025-03-01,2026-03-01,80,30000,Activa",
+        "POL-ING-0004,3,2,2025-04-01,2026-04-01,75,30000,Activa",
+        f"{existente},4,2,2025-04-01,2026-04-01,75,30000,Activa",
+        "POL-ING-0004,5,2,2025-05-01,2026-05-01,60,20000,Activa",
+        "POL-ING-0005,5,99,2025-05-01,2026-05-01,60,20000,Activa",
+        "POL-ING-0006,6,4,2025-06-01,2026-06-01,-10,20000,Vencida",
+        "POL-ING-0007,6,4,2025-06-01,2026-06-01,110,20000,Suspendida",
+        "POL-ING-0008,7,5,2025-07-01,2026-07-01,130,150000,Cancelada",
+    ])
+    avances: List[float] = []
+
+    async def recibir_avance(progreso: float, total: Any, mensaje: str):
+        avances.append(progreso)
+
+    exito = True
+    async with Client(servidor_seguros.app, progress_handler=recibir_avance) as client:
+        antes = (await client.call_tool("buscar_polizas_por_cliente", {"cliente_id": 7})).data
+        resultado = (await client.call_tool("ingerir_polizas", {"contenido": contenido, "lote": 4})).data
+
+        # Líneas 3-4 y 6-10: fechas, cliente, duplicada en la base y en el archivo, producto, prima y estado
+        lineas = [rechazo["linea"] for rechazo in resultado["rechazos"]]
+        if resultado["insertadas"] == 3 and lineas == [3, 4, 6, 7, 8, 9, 10] and resultado["lotes"] == 3:
+            print(f"✅ 3 pólizas insertadas y 7 rechazadas en 3 lotes ({resultado['filas_por_segundo']:.0f} filas/s)")
+        else:
+            print(f"❌ Resultado inesperado: {resultado}")
+            exito = False
+        if avances == [4, 8, 10]:
+            print("✅ Una notificación de progreso por lote")
+        else:
+            print(f"❌ Notificaciones de progreso: {avances}")
+            exito = False
+
+        despues = (await client.call_tool("buscar_polizas_por_cliente", {"cliente_id": 7})).data
+        nuevas = {p["numero_poliza"] for p in despues} - {p["numero_poliza"] for p in antes}
+        if nuevas == {"POL-ING-0008"}:
+            print("✅ Las pólizas ingeridas invalidan la caché y aparecen en las consultas")
+        else:
+            print(f"❌ Pólizas nuevas del cliente 7: {nuevas}")
+            exito = False
+
+        jsonl = "\n".join([
+            json.dumps({
+                "numero_poliza": "POL-ING-0101", "cliente_id": 8, "producto_id": 6, "fecha_inicio": "2025-08-01",
+                "fecha_vencimiento": "2026-08-01", "prima_mensual": 95.0, "monto_cobertura": 80000, "estado": "Activa",
+            }),
+            "{roto",
+            "[1, 2]",
+        ])
+        resultado = (await client.call_tool("ingerir_polizas", {"contenido": jsonl, "formato": "jsonl"})).data
+        if resultado["insertadas"] == 1 and [r["linea"] for r in resultado["rechazos"]] == [2, 3]:
+            print("✅ JSONL: las líneas ilegibles se rechazan una a una")
+        else:
+            print(f"❌ Resultado JSONL inesperado: {resultado}")
+            exito = False
+
+        try:
+            await client.call_tool("ingerir_polizas", {"contenido": "numero_poliza,cliente_id\nPOL-X,1"})
+            print("❌ Se aceptó un CSV sin todas las columnas")
+            exito = False
+        except Exception:
+            print("✅ Un CSV sin todas las columnas se rechaza entero")
+
+        # Cancelación con un lote dentro de su transacción (el timeout del agente cancela la llamada):
+        # el lote se confirma en su hilo, después se cierran generador y conexión y se invalida la caché
+        antes = (await client.call_tool("buscar_polizas_por_cliente", {"cliente_id": 11})).data
+        existentes_originales = ingesta._existentes
+
+        def existentes_lentos(*args):
+            time.sleep(0.3)
+            return existentes_originales(*args)
+
+        async def informar(*args):
+            pass
+
+        cancelable = "\n".join([
+            ",".join(COLUMNAS),
+            "POL-ING-0301,11,1,2025-03-01,2026-03-01,70,30000,Activa",
+            "POL-ING-0302,11,2,2025-03-01,2026-03-01,70,30000,Activa",
+        ])
+        ingesta._existentes = existentes_lentos
+        try:
+            tarea = asyncio.create_task(servidor_seguros.ingerir_polizas(
+                SimpleNamespace(report_progress=informar), cancelable, lote=1
+            ))
+            await asyncio.sleep(0.1)
+            tarea.cancel()
+            error = None
+            try:
+                await tarea
+            except BaseException as e:
+                error = e
+        finally:
+            ingesta._existentes = existentes_originales
+
+        conn = sqlite3.connect(db_path, timeout=0)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("ROLLBACK")
+            escritura_libre = True
+        except sqlite3.OperationalError:
+            escritura_libre = False
+        ingeridas = [numero for (numero,) in conn.execute(
+            "SELECT numero_poliza FROM polizas WHERE numero_poliza LIKE 'POL-ING-03%'"
+        )]
+        conn.close()
+        despues = (await client.call_tool("buscar_polizas_por_cliente", {"cliente_id": 11})).data
+        if (
+            isinstance(error, asyncio.CancelledError) and escritura_libre and ingeridas == ["POL-ING-0301"]
+            and len(despues) == len(antes) + 1
+        ):
+            print("✅ Ingesta cancelada a mitad de lote: el lote se confirma, la conexión se cierra y la caché se invalida")
+        else:
+            print(
+                f"❌ Ingesta cancelada: {error!r}, escritura libre {escritura_libre}, ingeridas {ingeridas}, "
+                f"pólizas del cliente {len(antes)} → {len(despues)}"
+            )
+            exito = False
+
+    with tempfile.TemporaryDirectory() as directorio:
+        archivo = os.path.join(directorio, "polizas.csv")
+        rechazos = os.path.join(directorio, "rechazos.jsonl")
+        with open(archivo, "w", encoding="utf-8") as f:
+            f.write("\n".join([
+                ",".join(COLUMNAS),
+                "POL-ING-0201,9,7,2025-09-01,2026-09-01,210,200000,Activa",
+                "POL-ING-0202,9,7,2025-09-01,fecha,210,200000,Activa",
+                "POL-ING-0203,10,8,2025-10-01,2026-10-01,40,75000,Activa",
+            ]))
+        proceso = subprocess.run(
+            [sys.executable, "ingesta.py", archivo, "--db", db_path, "--lote", "2", "--rechazos", rechazos],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+        )
+        rechazados: List[str] = []
+        if os.path.exists(rechazos):
+            with open(rechazos, encoding="utf-8") as f:
+                rechazados = [json.loads(linea)["numero_poliza"] for linea in f]
+        conn = sqlite3.connect(db_path)
+        insertadas = conn.execute(
+            "SELECT COUNT(*) FROM polizas WHERE numero_poliza IN ('POL-ING-0201', 'POL-ING-0203')"
+        ).fetchone()[0]
+        conn.close()
+        if proceso.returncode == 0 and insertadas == 2 and rechazados == ["POL-ING-0202"]:
+            print("✅ CLI: 2 pólizas insertadas y el rechazo guardado en JSONL")
+        else:
+            print(f"❌ CLI (código {proceso.returncode}): {proceso.stdout[-500:]}{proceso.stderr[-500:]}")
+            exito = False
+    return exito
+
+
+def _ciudad(conn: sqlite3.Connection, cliente_id: int) -> str:
+    return conn.execute("SELECT ciudad FROM clientes WHERE id = ?", (cliente_id,)).fetchone()[0]
+
+
+async def test_replica_lectura(db_path: str) -> bool:
+    """Verifica que la réplica sirva una copia, la renueve solo si hay escrituras y libere las retiradas"""
+    print_test_header("Réplica de lectura")
+
+    exito = True
+    original = sqlite3.connect(db_path)
+    ciudad_inicial = _ciudad(original, 3)
+
+    for modo in ("archivo", "memoria"):
+        with tempfile.TemporaryDirectory() as directorio:
+            replica = ReplicaLectura(
+                db_path, modo=modo, intervalo=0, tamano=2, pragmas={"query_only": "ON"}, directorio=directorio
+            )
+            with replica.conexion() as conn:
+                leida = _ciudad(conn, 3)
+
+            original.execute("UPDATE clientes SET ciudad = 'Pasto' WHERE id = 3")
+            original.commit()
+            with replica.conexion() as vieja:
+                desactualizada = _ciudad(vieja, 3)
+                copiada = replica.refrescar()
+                # La consulta en curso sigue sobre la copia anterior; las nuevas ven la escritura
+                sigue_vieja = _ciudad(vieja, 3)
+                with replica.conexion() as nueva:
+                    actualizada = _ciudad(nueva, 3)
+                retenidas = replica.metricas_replica()["retiradas"]
+
+            if (leida, desactualizada, sigue_vieja) == (ciudad_inicial,) * 3 and copiada and actualizada == "Pasto":
+                print(f"✅ {modo}: la copia no ve la escritura hasta refrescar y las consultas en curso no cambian")
+            else:
+                print(f"❌ {modo}: {leida=}, {desactualizada=}, {sigue_vieja=}, {copiada=}, {actualizada=}")
+                exito = False
+
+            metricas = replica.metricas_replica()
+            if retenidas == 1 and metricas["retiradas"] == 0:
+                print(f"✅ {modo}: la copia anterior se liberó al devolver su última conexión")
+            else:
+                print(f"❌ {modo}: retiradas {retenidas} con la conexión prestada, {metricas['retiradas']} después")
+                exito = False
+
+            if not replica.refrescar() and replica.metricas_replica()["omitidas"] == 1:
+                print(f"✅ {modo}: sin escrituras nuevas la renovación no copia (data_version igual)")
+            else:
+                print(f"❌ {modo}: se copió sin cambios: {replica.metricas_replica()}")
+                exito = False
+
+            try:
+                with replica.conexion() as conn:
+                    conn.execute("DELETE FROM clientes WHERE id = 3")
+                print(f"❌ {modo}: la copia aceptó una escritura")
+                exito = False
+            except sqlite3.OperationalError:
+                print(f"✅ {modo}: la copia es de solo lectura")
+
+            replica.cerrar()
+            restos = os.listdir(directorio)
+            if not restos:
+                print(f"✅ {modo}: cerrar() no deja copias en disco ({metricas['copias']} copias)")
+            else:
+                print(f"❌ {modo}: quedaron archivos {restos}")
+                exito = False
+
+            original.execute("UPDATE clientes SET ciudad = ? WHERE id = 3", (ciudad_inicial,))
+            original.commit()
+
+    # Renovación periódica y recurso de métricas con la réplica conectada al servidor
+    replica = ReplicaLectura(db_path, modo="memoria", intervalo=0.2, tamano=2, pragmas={"query_only": "ON"})
+    pool_anterior = servidor_seguros.pool_lectura
+    servidor_seguros.pool_lectura = replica
+    servidor_seguros.cache_resultados.limpiar()
+    try:
+        async with Client(servidor_seguros.app) as client:
+            antes = (await client.call_tool("buscar_cliente_por_id", {"cliente_id": 3})).data
+            original.execute("UPDATE clientes SET ciudad = 'Pasto' WHERE id = 3")
+            original.commit()
+            await asyncio.sleep(0.6)
+            servidor_seguros.cache_resultados.limpiar()
+            despues = (await client.call_tool("buscar_cliente_por_id", {"cliente_id": 3})).data
+            metricas = json.loads((await client.read_resource("metricas://replica"))[0].text)
+    finally:
+        servidor_seguros.pool_lectura = pool_anterior
+        replica.cerrar()
+        original.execute("UPDATE clientes SET ciudad = ? WHERE id = 3", (ciudad_inicial,))
+        original.commit()
+        original.close()
+        servidor_seguros.cache_resultados.limpiar()
+
+    if antes["ciudad"] == ciudad_inicial and despues["ciudad"] == "Pasto":
+        print("✅ El hilo de renovación recoge la escritura sin llamar a refrescar()")
+    else:
+        print(f"❌ La réplica no se renovó: {antes} -> {despues}")
+        exito = False
+
+    if metricas["copias"] == 2 and metricas["omitidas"] >= 1 and metricas["desfase_s"] < 1.0:
+        print(f"✅ metricas://replica: {metricas}")
+    else:
+        print(f"❌ Métricas inesperadas: {metricas}")
+        exito = False
+    return exito
+
+
+async def esperar_puerto(puerto: int, proceso: subprocess.Popen, segundos: float = 60) -> bool:
+    """Espera a que el proceso acepte conexiones en el puerto"""
+    limite = time.monotonic() + segundos
+    while time.monotonic() < limite and proceso.poll() is None:
+        try:
+            with socket.create_connection(("127.0.0.1", puerto), timeout=0.5):
+                return True
+        except OSError:
+            await asyncio.sleep(0.2)
+    return False
+
+
+async def leer_trabajadores(url: str) -> Dict[str, Any]:
+    async with Client(url) as client:
+        return json.loads((await client.read_resource("metricas://trabajadores"))[0].text)
+
+
+async def test_lanzador(db_path: str) -> bool:
+    """Verifica que varios trabajadores sirvan el mismo puerto, sumen sus métricas y se reinicien al caer"""
+    print_test_header("Lanzador multiproceso")
+
+    exito = True
+    totales = sumar({
+        "1": {"cache": {"aciertos": 3, "fallos": 1, "ttl_segundos": 300, "tasa_aciertos": 0.75}},
+        "2": {"cache": {"aciertos": 0, "fallos": 4, "ttl_segundos": 300, "tasa_aciertos": 0.0}},
+    })["cache"]
+    if totales == {"aciertos": 3, "fallos": 5, "ttl_segundos": 300, "tasa_aciertos": 3 / 8}:
+        print("✅ sumar() suma contadores y recalcula las tasas con los totales")
+    else:
+        print(f"❌ Totales inesperados: {totales}")
+        exito = False
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        puerto = s.getsockname()[1]
+    url = f"http://127.0.0.1:{puerto}/mcp"
+    proceso = subprocess.Popen(
+        [sys.executable, "lanzador.py", "--trabajadores", "2", "--host", "127.0.0.1", "--puerto", str(puerto),
+         "--intervalo-metricas", "0.5"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env={**os.environ, "SEGUROS_DB_PATH": db_path},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        if not await esperar_puerto(puerto, proceso):
+            print("❌ El lanzador no aceptó conexiones")
+            return False
+        # El puerto responde en cuanto arranca el primer trabajador; se da tiempo al segundo
+        await asyncio.sleep(2)
+
+        lotes: List[str] = []
+
+        async def recibir_lote(progreso, total, mensaje):
+            lotes.append(mensaje)
+
+        # Cada cliente abre su propia conexión, que el kernel asigna a uno de los trabajadores
+        clientes = 0
+        for indice in range(8):
+            async with Client(url, progress_handler=recibir_lote) as client:
+                await client.call_tool("buscar_polizas_por_cliente", {"cliente_id": indice + 1})
+                await client.call_tool("exportar_polizas", {"tipo": "Accidentes", "lote": 2000})
+                clientes += 1
+
+        metricas = await leer_trabajadores(url)
+        pids = sorted(metricas["trabajadores"])
+        completadas = {pid: m["ejecutor"]["completadas"] for pid, m in metricas["trabajadores"].items()}
+        if clientes == 8 and len(pids) == 2 and metricas["totales"]["ejecutor"]["completadas"] == sum(completadas.values()):
+            print(f"✅ 2 trabajadores atienden el puerto {puerto}; consultas por trabajador: {completadas}")
+        else:
+            print(f"❌ Métricas inesperadas: {metricas}")
+            exito = False
+
+        if lotes and all(json.loads(lote) for lote in lotes):
+            print(f"✅ Sin sesiones en memoria, exportar_polizas sigue enviando lotes por progreso ({len(lotes)} lotes)")
+        else:
+            print("❌ No llegaron lotes de exportar_polizas")
+            exito = False
+
+        os.kill(int(pids[0]), signal.SIGKILL)
+        nuevos = pids
+        limite = time.monotonic() + 30
+        while time.monotonic() < limite and (pids[0] in nuevos or len(nuevos) != 2):
+            await asyncio.sleep(0.5)
+            try:
+                nuevos = sorted((await leer_trabajadores(url))["trabajadores"])
+            except Exception:
+                continue
+        if pids[0] not in nuevos and len(nuevos) == 2:
+            print(f"✅ El trabajador {pids[0]} se reinició como {set(nuevos) - set(pids)}")
+        else:
+            print(f"❌ Trabajadores tras matar {pids[0]}: {nuevos}")
+            exito = False
+    finally:
+        proceso.send_signal(signal.SIGTERM)
+        try:
+            codigo = proceso.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proceso.kill()
+            codigo = None
+
+    if codigo == 0:
+        print("✅ SIGTERM detiene el lanzador y sus trabajadores")
+    else:
+        print(f"❌ El lanzador terminó con código {codigo}")
+        exito = False
+    return exito
+
+
+async def test_ejecutor_bd() -> bool:
+    """Verifica que las consultas corran en paralelo, sin bloquear el loop, y que la cola esté acotada"""
+    print_test_header("Ejecutor de base de datos")
+
+    ejecutor = EjecutorBD(hilos=2, cola_maxima=1)
+    latidos = 0
+
+    async def latido():
+        nonlocal latidos
+        while True:
+            await asyncio.sleep(0.01)
+            latidos += 1
+
+    pulso = asyncio.create_task(latido())
+    inicio = time.perf_counter()
+    resultados = await asyncio.gather(
+        *(ejecutor.ejecutar(time.sleep, 0.3) for _ in range(4)), return_exceptions=True
+    )
+    duracion = time.perf_counter() - inicio
+    pulso.cancel()
+    ejecutor.cerrar()
+
+    exito = True
+    rechazadas = [r for r in resultados if isinstance(r, EjecutorSaturadoError)]
+    if len(rechazadas) == 1:
+        print("✅ Con 2 hilos y cola de 1, la cuarta consulta se rechaza")
+    else:
+        print(f"❌ Se esperaba 1 rechazo, hubo {len(rechazadas)}: {resultados}")
+        exito = False
+
+    # 3 consultas de 0.3s en 2 hilos: ~0.6s en paralelo frente a 0.9s en serie
+    if duracion < 0.85:
+        print(f"✅ Las consultas corren en paralelo ({duracion:.2f}s)")
+    else:
+        print(f"❌ Las consultas se serializaron ({duracion:.2f}s)")
+        exito = False
+
+    if latidos >= 20:
+        print(f"✅ El event loop siguió respondiendo ({latidos} latidos de 10ms)")
+    else:
+        print(f"❌ El event loop estuvo bloqueado ({latidos} latidos)")
+        exito = False
+
+    # Consultas canceladas mientras esperan en cola (cliente desconectado) devuelven su cupo
+    ejecutor = EjecutorBD(hilos=1, cola_maxima=2)
+    bloqueo = threading.Event()
+    ocupada = asyncio.create_task(ejecutor.ejecutar(bloqueo.wait, 5))
+    await asyncio.sleep(0.05)
+    for _ in range(3):
+        en_cola = [asyncio.create_task(ejecutor.ejecutar(time.sleep, 0)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        for tarea in en_cola:
+            tarea.cancel()
+        await asyncio.gather(*en_cola, return_exceptions=True)
+    bloqueo.set()
+    await ocupada
+    resultados = await asyncio.gather(
+        *(ejecutor.ejecutar(time.sleep, 0.05) for _ in range(3)), return_exceptions=True
+    )
+    metricas = ejecutor.metricas()
+    ejecutor.cerrar()
+    if not any(isinstance(r, Exception) for r in resultados) and metricas["canceladas"] == 6 and metricas["en_cola"] == 0:
+        print("✅ Las consultas canceladas en cola devuelven su cupo (6 canceladas, sin rechazos después)")
+    else:
+        print(f"❌ Cupos perdidos tras cancelar consultas en cola: {resultados} {metricas}")
+        exito = False
+    return exito
+
+
+def test_generar_datos(directorio: str) -> bool:
+    """Verifica que la carga masiva no deje la base sin índices ni triggers y que no toque una base en uso"""
+    print_test_header("Generador de datos sintéticos")
+
+    db_path = os.path.join(directorio, "generada.db")
+    generar(db_path, 200, 1000, semilla=1)
+    conn = sqlite3.connect(db_path)
+    derivados = sorted(nombre for _, nombre, _ in objetos_derivados(conn))
+    conn.close()
+
+    exito = True
+    # Una lectura en curso (el servidor atendiendo una consulta) bloquea la carga
+    lector = sqlite3.connect(db_path)
+    lector.execute("BEGIN")
+    lector.execute("SELECT COUNT(*) FROM polizas").fetchone()
+    try:
+        generar(db_path, 10, 10, semilla=2)
+        print("❌ Se generaron datos sobre una base de datos en uso")
+        exito = False
+    except RuntimeError as e:
+        print(f"✅ Con la base de datos en uso, la carga se rechaza: {e}")
+    finally:
+        lector.close()
+
+    # Un error a mitad de la carga (como un Ctrl-C) no deja la base sin índices, FTS ni resúmenes
+    filas_originales = generar_datos._filas_polizas
+
+    def filas_interrumpidas(*args):
+        for i, fila in enumerate(filas_originales(*args)):
+            if i == 300:
+                raise KeyboardInterrupt
+            yield fila
+
+    generar_datos._filas_polizas = filas_interrumpidas
+    try:
+        generar(db_path, 10, 1000, semilla=3, lote=100)
+        print("❌ La carga interrumpida no propagó la interrupción")
+        exito = False
+    except KeyboardInterrupt:
+        pass
+    finally:
+        generar_datos._filas_polizas = filas_originales
+
+    conn = sqlite3.connect(db_path)
+    restaurados = sorted(nombre for _, nombre, _ in objetos_derivados(conn))
+    integridad = conn.execute("PRAGMA integrity_check").fetchone()[0]
+    modo = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    polizas = conn.execute("SELECT COUNT(*) FROM polizas").fetchone()[0]
+    conn.close()
+    if restaurados == derivados and integridad == "ok" and modo == servidor_seguros.PERFIL.journal_mode.lower():
+        print(f"✅ Tras interrumpir la carga se recrean {len(restaurados)} índices y triggers ({polizas} pólizas)")
+    else:
+        print(f"❌ Base de datos incompleta tras la interrupción: {integridad}, {modo}, faltan {set(derivados) - set(restaurados)}")
+        exito = False
+    return exito
+
+
+async def test_inicio_diferido(directorio: str) -> bool:
+    """Verifica que en modo diferido la base de datos se prepare una sola vez, antes de la primera consulta"""
+    print_test_header("Inicio diferido")
+
+    exito = True
+    ejecutor = EjecutorBD(hilos=3)
+    llamadas = []
+
+    def preparar():
+        llamadas.append(time.perf_counter())
+        time.sleep(0.1)
+
+    ejecutor.al_primer_uso(preparar)
+    pendiente = ejecutor.metricas()["primer_uso_pendiente"]
+    resultados = await asyncio.gather(*(ejecutor.ejecutar(time.perf_counter) for _ in range(3)))
+    if pendiente and len(llamadas) == 1 and min(resultados) > llamadas[0]:
+        print("✅ La preparación corre una vez y antes de las tareas concurrentes")
+    else:
+        print(f"❌ La preparación corrió {len(llamadas)} veces o después de alguna tarea")
+        exito = False
+    if not ejecutor.metricas()["primer_uso_pendiente"]:
+        print("✅ Las métricas reflejan que ya no hay preparación pendiente")
+    else:
+        print("❌ primer_uso_pendiente sigue activo tras la primera tarea")
+        exito = False
+
+    intentos = []
+
+    def fallar_una_vez():
+        intentos.append(1)
+        if len(intentos) == 1:
+            raise sqlite3.OperationalError("database is locked")
+
+    ejecutor.al_primer_uso(fallar_una_vez)
+    try:
+        await ejecutor.ejecutar(int, 1)
+        print("❌ El error de la preparación no llegó a la tarea")
+        exito = False
+    except sqlite3.OperationalError:
+        if await ejecutor.ejecutar(int, 2) == 2 and len(intentos) == 2:
+            print("✅ Si la preparación falla, la siguiente tarea la reintenta")
+        else:
+            print(f"❌ La preparación no se reintentó ({len(intentos)} intentos)")
+            exito = False
+    ejecutor.cerrar()
+
+    # El servidor real por stdio: responde a initialize sin haber creado la base de datos
+    db_path = os.path.join(directorio, "diferido.db")
+    transporte = StdioTransport(
+        sys.executable,
+        ["servidor_seguros.py", "--transporte", "stdio"],
+        env={**os.environ, "SEGUROS_DB_PATH": db_path, "SEGUROS_INICIO_DIFERIDO": "1"},
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    async with Client(transporte) as client:
+        herramientas = await client.list_tools()
+        creada_antes = os.path.exists(db_path)
+        poliza = (await client.call_tool("buscar_poliza_por_id", {"poliza_id": 1})).data
+
+    if herramientas and not creada_antes:
+        print(f"✅ {len(herramientas)} herramientas listadas sin tocar la base de datos")
+    else:
+        print("❌ La base de datos se creó antes de la primera consulta")
+        exito = False
+    if poliza and poliza.get("id") == 1 and os.path.exists(db_path):
+        print("✅ La primera consulta inicializa la base de datos y responde")
+    else:
+        print(f"❌ La primera consulta no devolvió la póliza 1: {poliza}")
+        exito = False
+    return exito
+
+
+async def run_all_tests():
+    """Ejecuta todos los tests"""
+    print("\n" + "=" * 60)
+    print("Suite de Testing - Servidor MCP de Seguros")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as directorio:
+        db_path = os.path.join(directorio, "seguros.db")
+        print("\nGenerando base de datos sintética...")
+        crear_base_sintetica(db_path)
+
+        consultas = await capturar_consultas(db_path)
+        resultados = {
+            "planes_consulta": test_planes_consulta(db_path, consultas),
+            "busquedas_por_prefijo": test_busquedas_por_prefijo(consultas),
+            "paginacion": await test_paginacion(db_path),
+            "polizas_por_vencer": await test_polizas_por_vencer(db_path),
+            "busqueda_texto": await test_busqueda_texto(db_path),
+            "busqueda_por_ids": await test_busqueda_por_ids(),
+            "listados_json": await test_listados_json(db_path, consultas),
+            "exportar_polizas": await test_exportar_polizas(db_path),
+            "proyeccion_campos": await test_proyeccion_campos(),
+            "resumen_cartera": await test_resumen_cartera(db_path, consultas),
+            "cache_resultados": await test_cache_resultados(db_path),
+            "ingesta": await test_ingesta(db_path),
+            "replica_lectura": await test_replica_lectura(db_path),
+            "lanzador": await test_lanzador(db_path),
+            "ejecutor_bd": await test_ejecutor_bd(),
+            "inicio_diferido": await test_inicio_diferido(directorio),
+            "generar_datos": test_generar_datos(directorio),
+        }
+        servidor_seguros.pool_lectura.cerrar()
+
+    print("\n" + "=" * 60)
+    for nombre, resultado in resultados.items():
+        print(f"{'✅' if resultado else '❌'} {nombre}")
+    print("=" * 60 + "\n")
+
+    if not all(resultados.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(run_all_tests())